@@ -0,0 +1,226 @@
+import json
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# ----------------------------
+# OpenAI
+# ----------------------------
+# .env is read once, here; every module takes its settings from this module (or after importing it).
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# One keep-alive connection pool shared by every chat model and the embeddings client
+# (services/llm_clients.py): connections / TLS sessions are reused across questions.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))          # idle connections kept open
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))   # seconds an idle connection is kept
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+
+# ----------------------------
+# Paths
+# ----------------------------
+# agent/ (this file lives in agent/app/config.py)
+AGENT_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = Path(os.getenv("AGENT_DATA_DIR", str(AGENT_DIR / "data")))
+VECTOR_STORE_DIR = Path(os.getenv("VECTOR_STORE_DIR", str(DATA_DIR / "vector_store")))
+
+SOURCE_PATH = os.getenv("KB_SOURCE_PATH", str(AGENT_DIR.parent / "newsapi.json"))
+INDEX_PATH = os.getenv("KB_INDEX_PATH", str(VECTOR_STORE_DIR / "events.faiss"))
+# Fused texts + structured fields by FAISS id (and the builder's event id -> id/hash map)
+DOCSTORE_PATH = os.getenv("KB_DOCSTORE_PATH", str(VECTOR_STORE_DIR / "events.sqlite"))
+# BM25 posting lists over the same documents (rebuilt from the doc store on every build)
+BM25_PATH = os.getenv("KB_BM25_PATH", str(VECTOR_STORE_DIR / "events.bm25.npz"))
+# Country / city / category bitmaps and event dates by FAISS id, for filtered search
+FILTERS_PATH = os.getenv("KB_FILTERS_PATH", str(VECTOR_STORE_DIR / "events.filters.npz"))
+
+
+# ----------------------------
+# Embeddings
+# ----------------------------
+EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-large")  # or -small for cheaper
+DIM = int(os.getenv("EMBED_DIM", "3072"))                          # 3072 for -large, 1536 for -small
+
+
+# ----------------------------
+# Retriever
+# ----------------------------
+# Memory-map the index instead of reading it fully into RAM.
+INDEX_MMAP = os.getenv("KB_INDEX_MMAP", "0") == "1"
+# Seconds between checks for a rebuilt index on disk (0 = check on every search, <0 = never).
+INDEX_RELOAD_INTERVAL = float(os.getenv("KB_RELOAD_INTERVAL", "5"))
+
+
+# ----------------------------
+# Embedding cache
+# ----------------------------
+# SQLite file for the on-disk level; set EMBED_CACHE_PATH="" to keep the cache in memory only.
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", str(DATA_DIR / "embedding_cache.sqlite"))
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "2048"))
+EMBED_CACHE_DISK_ITEMS = int(os.getenv("EMBED_CACHE_DISK_ITEMS", "100000"))  # ~12 KB each at 3072 dims
+
+
+# ----------------------------
+# Price store
+# ----------------------------
+PRICE_STORE_PATH = os.getenv("PRICE_STORE_PATH", str(DATA_DIR / "prices.sqlite"))
+# Today's bar is still moving: refetch it after this many seconds.
+PRICE_STORE_TODAY_TTL = float(os.getenv("PRICE_STORE_TODAY_TTL", "300"))
+# On a miss for a past date, fetch this many days before it (and up to 30 after) in one call.
+PRICE_STORE_FETCH_DAYS = int(os.getenv("PRICE_STORE_FETCH_DAYS", "365"))
+
+
+# ----------------------------
+# Embedding requests
+# ----------------------------
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+# Batches in flight at once when embedding many texts (KB builds)
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# Events the KB builder parses, diffs, embeds and adds to the index per step; bounds peak memory.
+CHUNK_SIZE = int(os.getenv("KB_CHUNK_SIZE", "1024"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+
+
+# ----------------------------
+# Index type
+# ----------------------------
+# FAISS factory string for the vectors behind the id map, e.g. "Flat", "HNSW32",
+# "IVF1024,Flat", "IVF1024,PQ64", "SQfp16", "SQ8". Changing it (or KB_INDEX_DIM) triggers
+# a full rebuild (embeddings come from the cache).
+INDEX_FACTORY = os.getenv("KB_INDEX_FACTORY", "Flat")
+# Matryoshka truncation: store only the first KB_INDEX_DIM components of every embedding
+# (re-normalized), e.g. 256 / 512 / 1024 of text-embedding-3-large's 3072; queries are cut
+# to the loaded index's width. 0 = full EMBED_DIM. Combine with "SQfp16" / "SQ8" / "PQ64"
+# above for quantized storage; compare them with scripts/benchmark_index.py --dims.
+INDEX_DIM = min(int(os.getenv("KB_INDEX_DIM", "0")) or DIM, DIM)
+# Vectors collected to train IVF/PQ indexes before anything is added.
+INDEX_TRAIN_SIZE = int(os.getenv("KB_TRAIN_SIZE", "50000"))
+# Query-time knobs; unset = FAISS defaults. Ignored by index types they do not apply to.
+SEARCH_NPROBE = int(os.getenv("KB_NPROBE", "0")) or None
+SEARCH_EF = int(os.getenv("KB_EF_SEARCH", "0")) or None
+
+
+# ----------------------------
+# Hybrid retrieval
+# ----------------------------
+# Fuse BM25 keyword hits with the dense hits (needs the BM25 file; otherwise dense only).
+HYBRID_SEARCH = os.getenv("KB_HYBRID", "1") == "1"
+# Candidates taken from each retriever before fusion.
+HYBRID_CANDIDATES = int(os.getenv("KB_HYBRID_CANDIDATES", "50"))
+# Reciprocal rank fusion constant: score = sum 1 / (RRF_K + rank).
+RRF_K = int(os.getenv("KB_RRF_K", "60"))
+# Filtered searches with at most this many eligible documents score them all exactly
+# (from stored vectors, ~12 KB each at 3072 dims) instead of searching the whole index
+# through an id selector, where a selective filter can starve HNSW / IVF.
+FILTER_EXACT_MAX = int(os.getenv("KB_FILTER_EXACT_MAX", "2048"))
+
+
+# ----------------------------
+# Answer cache
+# ----------------------------
+# Serve repeated /chat questions from memory: exact (normalized) question first, then, for
+# knowledge answers, the nearest cached question by embedding similarity.
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_ITEMS = int(os.getenv("ANSWER_CACHE_ITEMS", "1024"))
+# Cosine similarity a cached question needs to answer a different wording (1 = exact only).
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+# Knowledge answers live this long (and are dropped when the index is rebuilt).
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+# Finance answers quoting today's (still moving) bar; other quotes live until midnight,
+# since "yesterday" / "today" in the question mean another date tomorrow.
+ANSWER_CACHE_FINANCE_TTL = float(os.getenv("ANSWER_CACHE_FINANCE_TTL", "300"))
+
+
+# ----------------------------
+# Batch questions
+# ----------------------------
+# Questions graded / answered at once by /chat/batch and main.run_batch (routing and
+# retrieval are batched across all of them).
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+
+
+# ----------------------------
+# Query routing
+# ----------------------------
+# "separate": route, then extract symbol/date in extract_ticker (two LLM calls for a finance
+# question); "combined": one call returns the route and, for price questions, symbol/date too.
+ROUTER_MODE = os.getenv("ROUTER_MODE", "combined")
+# Local pre-router in front of the LLM router: keyword rules decide clear-cut questions.
+PRE_ROUTER_ENABLED = os.getenv("PRE_ROUTER_ENABLED", "1") == "1"
+# Nearest-centroid tier over (cached) question embeddings; costs one embedding call on a cache miss.
+PRE_ROUTER_CENTROIDS = os.getenv("PRE_ROUTER_CENTROIDS", "0") == "1"
+# Minimum cosine gap between the two centroids before the centroid tier decides.
+PRE_ROUTER_MARGIN = float(os.getenv("PRE_ROUTER_MARGIN", "0.08"))
+
+
+# ----------------------------
+# Speculative retrieval
+# ----------------------------
+# While the LLM router decides, already embed the question and search the index; the result
+# is used for knowledge questions and cancelled / discarded for price questions.
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "1") == "1"
+
+
+# ----------------------------
+# Document grading
+# ----------------------------
+# "concurrent": one LLM call per document, run in parallel; "joint": one call grades all documents.
+RETRIEVAL_EVAL_MODE = os.getenv("RETRIEVAL_EVAL_MODE", "concurrent")
+RETRIEVAL_EVAL_CONCURRENCY = int(os.getenv("RETRIEVAL_EVAL_CONCURRENCY", "5"))
+
+
+# ----------------------------
+# Similarity-banded grading
+# ----------------------------
+# Retrieved documents with cosine >= accept count as relevant, below reject as irrelevant,
+# without an LLM call; only the band in between goes to the grader. The thresholds are fitted
+# by scripts/calibrate_grader.py into GRADE_CALIBRATION_PATH (GRADE_ACCEPT / GRADE_REJECT
+# override it); with neither, every document is graded by the LLM as before.
+GRADE_BANDS = os.getenv("GRADE_BANDS", "1") == "1"
+GRADE_CALIBRATION_PATH = os.getenv("GRADE_CALIBRATION_PATH", str(DATA_DIR / "grader_calibration.json"))
+GRADE_ACCEPT = os.getenv("GRADE_ACCEPT")
+GRADE_REJECT = os.getenv("GRADE_REJECT")
+# Append every LLM grader verdict (question, document id, cosine, verdict) to this JSONL
+# file: the calibration data for scripts/calibrate_grader.py.
+GRADE_VERDICT_LOG = os.getenv("GRADE_VERDICT_LOG", "")
+
+
+# ----------------------------
+# Context assembly
+# ----------------------------
+# Before generation, graded documents are deduplicated, diversified (MMR) and packed into a
+# token budget as plain text (services/context_builder.py); 0 passes them through as before.
+CONTEXT_ASSEMBLY = os.getenv("CONTEXT_ASSEMBLY", "1") == "1"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_MAX_DOCS = int(os.getenv("CONTEXT_MAX_DOCS", "6"))
+# Documents whose stored vectors are at least this similar to a kept one are dropped.
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.95"))
+# MMR trade-off: 1 = relevance order only, lower = prefer documents unlike those already picked.
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# tiktoken encoding used to count tokens; loaded (downloaded once) in a background thread on
+# first use, never on the request path. Tokens are estimated as chars / 4 until then or offline.
+CONTEXT_ENCODING = os.getenv("CONTEXT_ENCODING", "o200k_base")
+
+
+# ----------------------------
+# Observability
+# ----------------------------
+# Pretty-print the full graph state after every node (slow with large documents).
+DEBUG_STATE = os.getenv("DEBUG_STATE", "0") == "1"
+# Log one line per node / LLM / embedding / yfinance call with the request's trace id.
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"
+# USD per 1M tokens as [input, output], used for the cost metric; extend/override with
+# LLM_PRICES='{"gpt-5": [1.25, 10.0]}'.
+LLM_PRICES = {
+    "gpt-5": [1.25, 10.0],
+    "gpt-5-mini": [0.25, 2.0],
+    "gpt-5-nano": [0.05, 0.4],
+    "gpt-4o": [2.5, 10.0],
+    "gpt-4o-mini": [0.15, 0.6],
+    "text-embedding-3-large": [0.13, 0.0],
+    "text-embedding-3-small": [0.02, 0.0],
+    **json.loads(os.getenv("LLM_PRICES", "{}")),
+}
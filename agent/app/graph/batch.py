@@ -0,0 +1,73 @@
+import asyncio
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import RunnableLambda
+
+from agent.app.config import BATCH_CONCURRENCY
+from agent.app.metrics import llm_metrics
+from agent.app.nodes.evaluate_query import aquery_evaluate, KNOWLEDGE_ROUTE
+from agent.app.services.retrieve_docs import aretrieve_docs_batch
+
+
+async def arun_batch(
+    graph,
+    questions: List[str],
+    filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+    max_concurrency: int = BATCH_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    Answer many questions with the compiled graph (build_app), batching the shared steps:
+      1. route every question (at most `max_concurrency` router calls in flight); in combined
+         router mode finance questions come back with their ticker already extracted
+      2. retrieve for all knowledge questions with one embedding call and one FAISS search
+      3. run the rest of the graph per question (grading / ticker lookup, generation),
+         `max_concurrency` questions at a time
+    Returns [{"answer": str | None, "error": str | None}, ...] in input order; one failing
+    question does not fail the others.
+    """
+    if not questions:
+        return []
+    filters = list(filters) if filters is not None else [None] * len(questions)
+    config = {"callbacks": [llm_metrics], "max_concurrency": max_concurrency}
+
+    # no speculative retrieval: knowledge questions are retrieved together in step 2
+    router = RunnableLambda(partial(aquery_evaluate, speculative=False), name="query_evaluate")
+    routed = await router.abatch([{"question": q} for q in questions], config=config, return_exceptions=True)
+    routes = [r if isinstance(r, Exception) else r["route"] for r in routed]
+
+    knowledge = [i for i, r in enumerate(routes) if r == KNOWLEDGE_ROUTE]
+    retrieved: Dict[int, List[Dict[str, Any]]] = {}
+    if knowledge:
+        print(f"---BATCH RETRIEVE: {len(knowledge)} QUESTIONS---")
+        docs = await aretrieve_docs_batch([questions[i] for i in knowledge], filters=[filters[i] for i in knowledge])
+        retrieved = dict(zip(knowledge, docs))
+
+    inputs, pending = [], []
+    for i, (question, route) in enumerate(zip(questions, routes)):
+        if isinstance(route, Exception):
+            continue
+        state: Dict[str, Any] = {"question": question, "route": route}
+        if filters[i]:
+            state["filters"] = filters[i]
+        if i in retrieved:
+            state["documents"] = retrieved[i]
+        elif "documents" in routed[i]:  # ticker from the combined router
+            state["documents"] = routed[i]["documents"]
+        inputs.append(state)
+        pending.append(i)
+
+    outs = await graph.abatch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+    results = [{"answer": None, "error": f"{type(r).__name__}: {r}"} if isinstance(r, Exception) else None
+               for r in routes]
+    for i, out in zip(pending, outs):
+        if isinstance(out, Exception):
+            results[i] = {"answer": None, "error": f"{type(out).__name__}: {out}"}
+        else:
+            results[i] = {"answer": out.get("generation"), "error": None}
+    return results
+
+
+def run_batch(graph, questions: List[str], filters=None, max_concurrency: int = BATCH_CONCURRENCY):
+    """Blocking arun_batch, for scripts."""
+    return asyncio.run(arun_batch(graph, questions, filters, max_concurrency))
@@ -1,49 +1,66 @@
+from functools import partial
 from langgraph.graph import END, StateGraph, START
-from agent import app
+from langchain_core.runnables import RunnableLambda
 from agent.app.graph.graph_chain import GraphState
-from agent.app.nodes.evaluate_query import query_evaluate
-from pprint import pprint
-from agent.app.nodes.extract_state import extract_ticker
-from agent.app.nodes.yahoo_finance_state import yahoo_search
-from agent.app.nodes.retrieve import retrieve
-from agent.app.nodes.evaluate_documents import evaluate_documents
-from agent.app.nodes.generate import generate
-from IPython.display import Image, display
+from agent.app.nodes.evaluate_query import query_evaluate, aquery_evaluate, next_node
+from agent.app.nodes.extract_state import extract_ticker, aextract_ticker
+from agent.app.nodes.yahoo_finance_state import yahoo_search, ayahoo_search
+from agent.app.nodes.retrieve import retrieve, aretrieve
+from agent.app.nodes.evaluate_documents import evaluate_documents, aevaluate_documents
+from agent.app.nodes.generate import generate, agenerate
+from agent.app.config import SPECULATIVE_RETRIEVAL
+from agent.app.metrics import instrument_node, llm_metrics
 
 
-def build_app():
+def _node(func, afunc, name=None):
+    # graph.stream/invoke run `func`; graph.astream/ainvoke run the non-blocking `afunc`;
+    # both are timed under the node's name (GET /metrics)
+    name = name or func.__name__
+    return RunnableLambda(instrument_node(name, func), afunc=instrument_node(name, afunc), name=name)
+
+
+def build_app(speculative_retrieval: bool = SPECULATIVE_RETRIEVAL):
+    """
+    speculative_retrieval: retrieve while the LLM router runs; knowledge questions then reach
+    `retrieve` with their documents already fetched (see nodes/evaluate_query.py).
+    """
     workflow = StateGraph(GraphState)
     # Define the nodes
+    # route {"route": route} (+ "documents": the ticker when the combined router extracted it,
+    # or the speculatively retrieved documents of a knowledge question)
+    workflow.add_node("query_evaluate", _node(partial(query_evaluate, speculative=speculative_retrieval),
+                                              partial(aquery_evaluate, speculative=speculative_retrieval),
+                                              name="query_evaluate"))
+
     # retrieve {"documents": documents, "question": question}
-    workflow.add_node("retrieve", retrieve)  
+    workflow.add_node("retrieve", _node(retrieve, aretrieve))
 
     # evaluate documents {"documents": filtered_docs, "question": question, "web_search": web_search}
-    workflow.add_node("evaluate_documents", evaluate_documents)  
+    workflow.add_node("evaluate_documents", _node(evaluate_documents, aevaluate_documents))
 
     # generate {"documents": documents, "question": question, "generation": generation}
-    workflow.add_node("generate", generate) 
+    workflow.add_node("generate", _node(generate, agenerate))
 
     # web search {"documents": documents, "question": question}
-    workflow.add_node("extract_ticker", extract_ticker)  
+    workflow.add_node("extract_ticker", _node(extract_ticker, aextract_ticker))
 
-    workflow.add_node("yahoo_search", yahoo_search)
+    workflow.add_node("yahoo_search", _node(yahoo_search, ayahoo_search))
 
 
     # Build graph
+    workflow.add_edge(START, "query_evaluate")
+    # finance questions whose ticker the router already extracted go straight to yahoo_search
     workflow.add_conditional_edges(
-                        START, 
-                        query_evaluate,
-                        {
-                            "IS ABOUT TICKER": "extract_ticker",
-                            "IS NOT ABOUT TICKER": "retrieve",
-                        },)
+                        "query_evaluate",
+                        next_node,
+                        ["retrieve", "extract_ticker", "yahoo_search"],)
     workflow.add_edge("retrieve", "evaluate_documents")
     workflow.add_edge("evaluate_documents", "generate")
     workflow.add_edge("extract_ticker", "yahoo_search")
     workflow.add_edge("yahoo_search", "generate")
     workflow.add_edge("generate", END)
-    # Compile
-    return workflow.compile()
+    # Compile; the callback records latency / tokens / cost of every LLM call in the graph
+    return workflow.compile().with_config(callbacks=[llm_metrics])
 
 
 
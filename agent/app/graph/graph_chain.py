@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List
 from typing_extensions import TypedDict
 
 
@@ -11,8 +11,17 @@ class GraphState(TypedDict):
         generation: LLM generation
         web_search: whether to add search
         documents: list of documents
+        filters: optional metadata filters for retrieval (country, city, category, date_from, date_to)
+        route: routing decision, written by query_evaluate (or set up front by batch requests,
+               which skips the router)
+        grading_report: grader LLM calls made / saved by the similarity bands
+        context_report: token report of the context sent to the answer LLM (docs / tokens in, out, saved)
     """
     question: str
     generation: str
     yahoo_search: str
-    documents: List[str]
\ No newline at end of file
+    documents: List[str]
+    filters: Dict[str, Any]
+    route: str
+    grading_report: Dict[str, int]
+    context_report: Dict[str, int]
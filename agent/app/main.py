@@ -1,17 +1,27 @@
 from pprint import pprint
+from agent.app.config import DEBUG_STATE
 from agent.app.graph.build import build_app
+from agent.app.graph.batch import run_batch as _run_batch
 
 def run_once(question: str):
     graph = build_app()
     last = {}
     for output in graph.stream({"question": question}):
         for node, state in output.items():
-            print(f"Node '{node}':")
-            pprint(state, indent=2, width=100)
+            if DEBUG_STATE:
+                print(f"Node '{node}':")
+                pprint(state, indent=2, width=100)
             last = state
         print("\\n---\\n")
     print(last.get("generation"))
 
+def run_batch(questions, filters=None):
+    """Answer many questions in one pass (batched routing / retrieval); answers in input order."""
+    results = _run_batch(build_app(), questions, filters)
+    for question, res in zip(questions, results):
+        print(f"Q: {question}\nA: {res['answer'] if res['error'] is None else 'ERROR ' + res['error']}\n")
+    return results
+
 if __name__ == "__main__":
     run_once("What is the city of Zurich like?")
 
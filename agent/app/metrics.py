@@ -0,0 +1,328 @@
+"""
+In-process metrics (Prometheus text format on GET /metrics) and per-request trace ids.
+
+    node latency / errors      instrument_node() around every graph node (graph/build.py)
+    call latency / errors      observe("embedding" | "yfinance", target) around external calls
+    LLM latency / tokens / $   LLMMetricsHandler, a LangChain callback attached to the graph
+    HTTP requests              the middleware in server.py
+
+Set TRACE_LOG=1 to also log one line per node / call, tagged with the request's trace id.
+"""
+import contextvars
+import inspect
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import TRACE_LOG, LLM_PRICES
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    """Bucketed for /metrics; also keeps the last `max_samples` values per label set for exact percentiles."""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS,
+                 max_samples: int = 4096):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, tuple(buckets)
+        self.max_samples = max_samples
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+        self._samples: Dict[Tuple[str, ...], deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            v = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    v[i] += 1
+            v[-2] += value
+            v[-1] += 1
+            self._samples.setdefault(key, deque(maxlen=self.max_samples)).append(value)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._samples.clear()
+
+    def samples(self) -> Dict[Tuple[str, ...], List[float]]:
+        """{label values: recent observations} (at most max_samples each)."""
+        with self._lock:
+            return {k: list(v) for k, v in self._samples.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        les = [f'le="{b:g}"' for b in self.buckets] + ['le="+Inf"']
+        for key, v in items:
+            for le, n in zip(les, v[:len(self.buckets)] + [v[-1]]):
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {v[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {v[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        m = Counter(name, help, labelnames)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(m)
+        return m
+
+    def clear(self):
+        """Reset every metric (e.g. between benchmark runs)."""
+        for m in self._metrics:
+            m.clear()
+
+    def add_collector(self, fn: Callable[[], List[str]]):
+        """fn() returns extra exposition lines, read at scrape time (e.g. cache stats)."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines += m.render()
+        for fn in self._collectors:
+            try:
+                lines += fn()
+            except Exception as e:  # a broken collector must not break the scrape
+                lines.append(f"# collector {getattr(fn, '__name__', fn)} failed: {e!r}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+NODE_LATENCY = REGISTRY.histogram("rag_node_duration_seconds", "Graph node latency.", ("node",))
+NODE_ERRORS = REGISTRY.counter("rag_node_errors_total", "Graph node failures.", ("node", "error"))
+CALL_LATENCY = REGISTRY.histogram("rag_call_duration_seconds", "External call latency.", ("kind", "target"))
+CALL_ERRORS = REGISTRY.counter("rag_call_errors_total", "External call failures.", ("kind", "target", "error"))
+TOKENS = REGISTRY.counter("rag_tokens_total", "Tokens used.", ("kind", "model", "direction"))
+COST = REGISTRY.counter("rag_cost_usd_total", "Estimated spend in USD (see LLM_PRICES).", ("kind", "model"))
+HTTP_REQUESTS = REGISTRY.counter("rag_http_requests_total", "HTTP requests.", ("path", "status"))
+HTTP_LATENCY = REGISTRY.histogram("rag_http_request_duration_seconds", "HTTP latency until the response starts.", ("path",))
+SINGLEFLIGHT = REGISTRY.counter(
+    "rag_singleflight_calls_total", "Coalesced calls: led (ran) or shared (joined an identical in-flight call).",
+    ("group", "role"))
+SPECULATIVE = REGISTRY.counter(
+    "rag_speculative_retrievals_total", "Retrievals started alongside the router: used, discarded or failed.",
+    ("outcome",))
+GRADER_DOCS = REGISTRY.counter(
+    "rag_grader_documents_total", "Graded documents by decision: accepted / rejected by score, or llm.",
+    ("decision",))
+GRADER_CALLS_SAVED = REGISTRY.counter(
+    "rag_grader_calls_saved_total", "Grader LLM calls avoided by the similarity bands.")
+CONTEXT_TOKENS = REGISTRY.counter(
+    "rag_context_tokens_total", "Generation context tokens: raw (documents as retrieved) or packed (sent).",
+    ("stage",))
+CONTEXT_DROPPED = REGISTRY.counter(
+    "rag_context_docs_dropped_total", "Documents left out of the generation context.", ("reason",))
+
+
+# ----------------------------
+# Trace ids + logging
+# ----------------------------
+trace_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class _TraceFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id_var.get() or "-"
+        return True
+
+
+logger = logging.getLogger("agent.trace")
+if TRACE_LOG and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s trace=%(trace_id)s %(message)s"))
+    _handler.addFilter(_TraceFilter())
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _log(msg: str):
+    if TRACE_LOG:
+        logger.info(msg)
+
+
+# ----------------------------
+# Instrumentation
+# ----------------------------
+def record_usage(kind: str, model: str, input_tokens: int = 0, output_tokens: int = 0):
+    """Count tokens and their estimated cost (USD per 1M tokens from LLM_PRICES)."""
+    if input_tokens:
+        TOKENS.inc(input_tokens, kind=kind, model=model, direction="input")
+    if output_tokens:
+        TOKENS.inc(output_tokens, kind=kind, model=model, direction="output")
+    price_in, price_out = (list(LLM_PRICES.get(model, ())) + [0.0, 0.0])[:2]
+    cost = (input_tokens * price_in + output_tokens * price_out) / 1e6
+    if cost:
+        COST.inc(cost, kind=kind, model=model)
+
+
+@contextmanager
+def observe(kind: str, target: str):
+    """Time an external call and count its failures: `with observe("yfinance", symbol): ...`"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        CALL_ERRORS.inc(kind=kind, target=target, error=type(e).__name__)
+        _log(f"{kind} {target} failed: {e!r}")
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        CALL_LATENCY.observe(dt, kind=kind, target=target)
+        _log(f"{kind} {target} {dt * 1e3:.1f}ms")
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node (sync or async) with latency / error metrics."""
+    def done(t0: float, error: Optional[BaseException] = None):
+        dt = time.perf_counter() - t0
+        NODE_LATENCY.observe(dt, node=name)
+        if error is not None:
+            NODE_ERRORS.inc(node=name, error=type(error).__name__)
+            _log(f"node {name} failed after {dt * 1e3:.1f}ms: {error!r}")
+        else:
+            _log(f"node {name} {dt * 1e3:.1f}ms")
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def awrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                out = await func(*args, **kwargs)
+            except BaseException as e:
+                done(t0, e)
+                raise
+            done(t0)
+            return out
+        return awrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            out = func(*args, **kwargs)
+        except BaseException as e:
+            done(t0, e)
+            raise
+        done(t0)
+        return out
+    return wrapper
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback: latency, token usage, cost and errors of every chat-model call."""
+
+    run_inline = True  # cheap bookkeeping: no thread hop for async runs
+
+    def __init__(self):
+        self._runs: Dict[Any, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        with self._lock:
+            self._runs[run_id] = (model, time.perf_counter())
+
+    def _finish(self, run_id) -> Tuple[str, float]:
+        with self._lock:
+            model, t0 = self._runs.pop(run_id, ("unknown", time.perf_counter()))
+        dt = time.perf_counter() - t0
+        CALL_LATENCY.observe(dt, kind="llm", target=model)
+        return model, dt
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, dt = self._finish(run_id)
+        input_tokens = output_tokens = 0
+        for gens in response.generations:
+            for g in gens:
+                usage = getattr(getattr(g, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        if not (input_tokens or output_tokens):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens, output_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        record_usage("llm", model, input_tokens, output_tokens)
+        _log(f"llm {model} {dt * 1e3:.1f}ms in={input_tokens} out={output_tokens}")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model, dt = self._finish(run_id)
+        CALL_ERRORS.inc(kind="llm", target=model, error=type(error).__name__)
+        _log(f"llm {model} failed after {dt * 1e3:.1f}ms: {error!r}")
+
+
+llm_metrics = LLMMetricsHandler()
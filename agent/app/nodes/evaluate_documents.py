@@ -1,6 +1,34 @@
-from ..services.retrieval_evaluator_class import RetrievalEvaluatorService
+from ..services.grade_bands import get_grade_bands, grading_report, record_verdicts
+from ..services.registry import get_service
+from ..config import RETRIEVAL_EVAL_MODE
 
 
+def _get_service():
+    # RetrievalEvaluatorService, built on first use
+    return get_service("retrieval_evaluator")
+
+
+def _band(documents):
+    # verdict decided by the retrieval cosine alone ('yes' / 'no'), None = ask the LLM grader
+    bands = get_grade_bands()
+    return [bands.decide(d.get("score"), d.get("dense", True)) for d in documents]
+
+
+def _filter(question, documents, decided, llm_grades):
+    """Merge score-decided and LLM verdicts (input order) and keep the relevant documents."""
+    asked = [d for d, v in zip(documents, decided) if v is None]
+    record_verdicts(question, asked, llm_grades)
+    llm_grades = iter(llm_grades)
+    filtered_docs = []
+    for d, v in zip(documents, decided):
+        grade = v if v is not None else next(llm_grades)
+        if grade == "yes":
+            print("---GRADE: DOCUMENT RELEVANT---")
+            filtered_docs.append(d)
+        else:
+            print("---GRADE: DOCUMENT NOT RELEVANT---")
+    report = grading_report(decided, RETRIEVAL_EVAL_MODE)
+    return {"documents": filtered_docs, "question": question, "grading_report": report}
 
 
 def evaluate_documents(state):
@@ -12,20 +40,21 @@ def evaluate_documents(state):
         state (dict): Updates documents key with only filtered relevant documents
     """
     print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
-    retrieval_grader = RetrievalEvaluatorService()
     question = state["question"]
     documents = state["documents"]
-    # Score each doc
-    filtered_docs = []
-    for d in documents:
-        # RetrievalEvaluatorService.evaluate(document, question) returns a structured output
-        score = retrieval_grader.evaluate(d["text"], question)
-        grade = score.binary_score
-        if grade == "yes":
-            print("---GRADE: DOCUMENT RELEVANT---")
-            filtered_docs.append(d)
-        else:
-            print("---GRADE: DOCUMENT NOT RELEVANT---")
-            continue
+    decided = _band(documents)
+    # Only the ambiguous band goes to the LLM (concurrent calls or one joint call), in input order
+    asked = [d["text"] for d, v in zip(documents, decided) if v is None]
+    grades = _get_service().grade(asked, question) if asked else []
+    return _filter(question, documents, decided, grades)
+
 
-    return {"documents": filtered_docs, "question": question}
\ No newline at end of file
+async def aevaluate_documents(state):
+    """Async evaluate_documents: grading calls run concurrently without blocking the event loop."""
+    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    question = state["question"]
+    documents = state["documents"]
+    decided = _band(documents)
+    asked = [d["text"] for d, v in zip(documents, decided) if v is None]
+    grades = await _get_service().agrade(asked, question) if asked else []
+    return _filter(question, documents, decided, grades)
@@ -1,21 +1,152 @@
-from ..services.query_evaluator import QueryEvaluatorService
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-_svc: QueryEvaluatorService | None = None
+from ..config import PRE_ROUTER_ENABLED, ROUTER_MODE, SPECULATIVE_RETRIEVAL
+from ..metrics import SPECULATIVE
+from ..services.pre_router import get_pre_router
+from ..services.registry import get_service
+from ..services.retrieve_docs import retrieve_docs, aretrieve_docs
 
-def _get_service() -> QueryEvaluatorService:
-    global _svc
-    if _svc is None:
-        _svc = QueryEvaluatorService()
-    return _svc
+FINANCE_ROUTE = "IS ABOUT TICKER"
+KNOWLEDGE_ROUTE = "IS NOT ABOUT TICKER"
 
 
-def query_evaluate(state):
-    question = state["question"]
-    svc = _get_service()
-    eva_res = svc.score(question)
-    if eva_res == "yes":            
+def _get_service():
+    # QueryEvaluatorService, built on first use
+    return get_service("query_evaluator")
+
+
+def _to_route(eva_res: str) -> str:
+    if eva_res == "yes":
         print("---GRADE: QUESTION IS ABOUT TICKER PRICE---")
-        return "IS ABOUT TICKER"
+        return FINANCE_ROUTE
     else:
         print("---GRADE: QUESTION IS NOT ABOUT TICKER PRICE---")
-        return "IS NOT ABOUT TICKER"
+        return KNOWLEDGE_ROUTE
+
+
+def _update(eva_res: str, ticker) -> dict:
+    update = {"route": _to_route(eva_res)}
+    if ticker:  # combined mode: extract_ticker is skipped
+        print("---ROUTER EXTRACTED TICKER---")
+        update["documents"] = ticker
+    return update
+
+
+def _llm_route(question: str):
+    """('yes' | 'no', ticker | None) from the LLM router (ticker only in combined mode)."""
+    if ROUTER_MODE == "combined":
+        return get_service("query_router_extractor").route(question)
+    return _get_service().score(question), None
+
+
+async def _allm_route(question: str):
+    if ROUTER_MODE == "combined":
+        return await get_service("query_router_extractor").aroute(question)
+    return await _get_service().ascore(question), None
+
+
+# ----------------------------
+# Speculative retrieval
+# ----------------------------
+# Embedding + search do not depend on the route: start them while the LLM router runs and
+# keep the documents if the question turns out to be a knowledge question.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieve")
+    return _pool
+
+
+def _outcome(update: dict, docs=None, error=None) -> dict:
+    # documents for the retrieve node (which then skips its own search), or nothing
+    if update["route"] != KNOWLEDGE_ROUTE:
+        print("---SPECULATIVE RETRIEVAL DISCARDED---")
+        SPECULATIVE.inc(outcome="discarded")
+        return update
+    if error is not None:
+        print(f"---SPECULATIVE RETRIEVAL FAILED ({type(error).__name__}), RETRIEVING AGAIN---")
+        SPECULATIVE.inc(outcome="failed")
+        return update
+    print("---SPECULATIVE RETRIEVAL USED---")
+    SPECULATIVE.inc(outcome="used")
+    return {**update, "documents": docs}
+
+
+def query_evaluate(state, speculative: bool = SPECULATIVE_RETRIEVAL):
+    """
+    Route the question: {"route": ...}, plus "documents" = {symbol, date, display_name}
+    when the combined router already extracted the ticker, or the retrieved documents
+    when a speculative retrieval ran alongside the router for a knowledge question.
+    """
+    question = state["question"]
+    if state.get("route"):  # already routed (batch requests route every question up front)
+        return {}
+    # Local rules/centroids first; the LLM router only sees questions they are unsure about
+    eva_res = get_pre_router().decide(question) if PRE_ROUTER_ENABLED else None
+    if eva_res is not None:
+        print("---PRE-ROUTER DECIDED---")
+        return _update(eva_res, None)
+    if not speculative or state.get("documents") is not None:
+        return _update(*_llm_route(question))
+
+    ctx = contextvars.copy_context()  # trace id for the worker thread's logs
+    future = _executor().submit(ctx.run, retrieve_docs, question, filters=state.get("filters"))
+    try:
+        update = _update(*_llm_route(question))
+    except BaseException:
+        future.cancel()
+        raise
+    if update["route"] != KNOWLEDGE_ROUTE:
+        future.cancel()  # not started yet: never runs; otherwise its result is dropped
+        return _outcome(update)
+    try:
+        return _outcome(update, docs=future.result())
+    except Exception as e:
+        return _outcome(update, error=e)
+
+
+async def aquery_evaluate(state, speculative: bool = SPECULATIVE_RETRIEVAL):
+    question = state["question"]
+    if state.get("route"):
+        return {}
+    eva_res = await get_pre_router().adecide(question) if PRE_ROUTER_ENABLED else None
+    if eva_res is not None:
+        print("---PRE-ROUTER DECIDED---")
+        return _update(eva_res, None)
+    if not speculative or state.get("documents") is not None:
+        return _update(*await _allm_route(question))
+
+    task = asyncio.create_task(aretrieve_docs(question, filters=state.get("filters")))
+    # a failure is handled below or irrelevant (discarded): never "exception was never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    try:
+        update = _update(*await _allm_route(question))
+    except BaseException:
+        task.cancel()
+        raise
+    if update["route"] != KNOWLEDGE_ROUTE:
+        task.cancel()  # shared embedding calls are shielded (singleflight) and keep running for others
+        return _outcome(update)
+    try:
+        return _outcome(update, docs=await task)
+    except Exception as e:
+        return _outcome(update, error=e)
+
+
+def next_node(state) -> str:
+    """Edge after query_evaluate: retrieve, extract_ticker, or straight to yahoo_search."""
+    if state["route"] != FINANCE_ROUTE:
+        return "retrieve"
+    ticker = state.get("documents")
+    if isinstance(ticker, dict) and ticker.get("symbol") and ticker.get("date"):
+        return "yahoo_search"
+    return "extract_ticker"
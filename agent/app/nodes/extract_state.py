@@ -1,8 +1,8 @@
-from ..services.extract_finance_info import FinanceQueryExtractor
+from ..services.registry import get_service
 
 def extract_ticker(state):
     question = state["question"]
-    extractor = FinanceQueryExtractor()
+    extractor = get_service("finance_extractor")  # one shared extractor (and LLM client)
     ticker = extractor.extract(question)
     if ticker:
         print(f"---EXTRACTED TICKER: ---")
@@ -10,3 +10,15 @@ def extract_ticker(state):
     else:
         print("---NO TICKER FOUND---")
         return {"question": question, "documents": None}
+
+
+async def aextract_ticker(state):
+    question = state["question"]
+    extractor = get_service("finance_extractor")
+    ticker = await extractor.aextract(question)
+    if ticker:
+        print(f"---EXTRACTED TICKER: ---")
+        return {"question": question, "documents": ticker}
+    else:
+        print("---NO TICKER FOUND---")
+        return {"question": question, "documents": None}
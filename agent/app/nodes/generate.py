@@ -1,4 +1,15 @@
-from ..services.rag_chain import rag_chain
+import asyncio
+
+from ..config import CONTEXT_ASSEMBLY
+from ..services.context_builder import assemble_context
+from ..services.registry import get_service
+
+
+def _context(documents):
+    # dedup + MMR + token budget (services/context_builder.py); raw documents when disabled
+    if not CONTEXT_ASSEMBLY:
+        return documents, None
+    return assemble_context(documents)
 
 
 def generate(state):
@@ -12,6 +23,18 @@ def generate(state):
     print("---GENERATE---")
     question = state["question"]
     documents = state["documents"]
+    context, report = _context(documents)
     # RAG generation
-    generation = rag_chain.invoke({"context": documents, "question": question})
-    return {"documents": documents, "question": question, "generation": generation}
\ No newline at end of file
+    generation = get_service("rag_chain").invoke({"context": context, "question": question})
+    return {"documents": documents, "question": question, "generation": generation, "context_report": report}
+
+
+async def agenerate(state):
+    """Async generate: awaits the RAG chain instead of blocking the event loop."""
+    print("---GENERATE---")
+    question = state["question"]
+    documents = state["documents"]
+    # reads index vectors back for dedup / MMR: keep it off the event loop
+    context, report = await asyncio.to_thread(_context, documents)
+    generation = await get_service("rag_chain").ainvoke({"context": context, "question": question})
+    return {"documents": documents, "question": question, "generation": generation, "context_report": report}
@@ -1,5 +1,5 @@
 from langchain.schema import Document
-from ..services.retrieve_docs import retrieve_docs
+from ..services.retrieve_docs import retrieve_docs, aretrieve_docs
 
 
 
@@ -13,6 +13,18 @@ def retrieve(state):
     """
     print("---RETRIEVE---")
     question = state["question"]
-    # Retrieval
-    documents = retrieve_docs(question)
-    return {"documents": documents, "question": question}
\ No newline at end of file
+    documents = state.get("documents")
+    if documents is None:  # batch requests retrieve for all questions up front
+        # Retrieval, restricted to the request's metadata filters (if any)
+        documents = retrieve_docs(question, filters=state.get("filters"))
+    return {"documents": documents, "question": question}
+
+
+async def aretrieve(state):
+    """Async retrieve: non-blocking embedding call, FAISS search in a worker thread."""
+    print("---RETRIEVE---")
+    question = state["question"]
+    documents = state.get("documents")
+    if documents is None:
+        documents = await aretrieve_docs(question, filters=state.get("filters"))
+    return {"documents": documents, "question": question}
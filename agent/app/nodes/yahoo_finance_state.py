@@ -1,3 +1,4 @@
+import asyncio
 from ..tools.yahoo_finance_api import get_yahoo_finance_price
 
 
@@ -9,4 +10,15 @@ def yahoo_search(state):
     date = docs["date"]
     ticker_name = docs["display_name"]
     price = get_yahoo_finance_price(ticker, date, ticker_name)
-    return {"documents": price, "question": query}
\ No newline at end of file
+    return {"documents": price, "question": query}
+
+
+async def ayahoo_search(state):
+    """Async yahoo_search: yfinance is blocking, so run it in a worker thread."""
+    docs = state["documents"]
+    query = state["question"]
+    ticker = docs["symbol"]
+    date = docs["date"]
+    ticker_name = docs["display_name"]
+    price = await asyncio.to_thread(get_yahoo_finance_price, ticker, date, ticker_name)
+    return {"documents": price, "question": query}
@@ -1,12 +1,23 @@
 # server.py
+import asyncio
+import json
+import time
 from pathlib import Path
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import Any, Dict
+from datetime import date
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
 from pprint import pprint
+from agent.app.config import DEBUG_STATE, ANSWER_CACHE, BATCH_MAX_QUESTIONS
 from agent.app.graph.build import build_app
+from agent.app.graph.batch import arun_batch
+from agent.app.metrics import REGISTRY, HTTP_REQUESTS, HTTP_LATENCY, trace_id_var, new_trace_id
+from agent.app.tools.embedding_cache import get_embedding_cache
+from agent.app.services.answer_cache import AnswerCache, Probe, answer_kind, get_answer_cache
+from agent.app.tools.singleflight import SingleFlight
+from agent.app.services.llm_clients import pool_stats
 
 app = FastAPI(title="Agentic RAG Demo")
 graph = build_app()  # compile LangGraph once
@@ -19,26 +30,235 @@ STATIC_DIR.mkdir(exist_ok=True)
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Per-request trace id (X-Request-ID in and out) + request count / latency metrics."""
+    trace_id = request.headers.get("x-request-id") or new_trace_id()
+    token = trace_id_var.set(trace_id)
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = trace_id
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "other"  # route template: bounded label values
+        HTTP_REQUESTS.inc(path=path, status=status)
+        HTTP_LATENCY.observe(time.perf_counter() - t0, path=path)
+        trace_id_var.reset(token)
+
+
+def _cache_metrics():
+    stats = get_embedding_cache().stats()
+    answers = get_answer_cache().stats()
+    return [
+        "# TYPE rag_embedding_cache_hits_total counter",
+        f'rag_embedding_cache_hits_total{{level="memory"}} {stats["memory_hits"]}',
+        f'rag_embedding_cache_hits_total{{level="disk"}} {stats["disk_hits"]}',
+        "# TYPE rag_embedding_cache_misses_total counter",
+        f'rag_embedding_cache_misses_total {stats["misses"]}',
+        "# TYPE rag_answer_cache_total counter",
+        f'rag_answer_cache_total{{result="exact"}} {answers["exact_hits"]}',
+        f'rag_answer_cache_total{{result="semantic"}} {answers["semantic_hits"]}',
+        f'rag_answer_cache_total{{result="miss"}} {answers["misses"]}',
+        "# TYPE rag_answer_cache_items gauge",
+        f'rag_answer_cache_items {answers["items"]}',
+    ]
+
+
+def _pool_metrics():
+    stats = pool_stats()
+    lines = []
+    for metric, key, kind in [
+        ("rag_llm_http_requests_total", "requests", "counter"),
+        ("rag_llm_tcp_connects_total", "tcp_connects", "counter"),
+        ("rag_llm_tls_handshakes_total", "tls_handshakes", "counter"),
+        ("rag_llm_open_connections", "open_connections", "gauge"),
+        ("rag_llm_idle_connections", "idle_connections", "gauge"),
+    ]:
+        lines.append(f"# TYPE {metric} {kind}")
+        lines += [f'{metric}{{pool="{pool}"}} {stats[pool][key]}' for pool in ("sync", "async")]
+    return lines
+
+REGISTRY.add_collector(_cache_metrics)
+REGISTRY.add_collector(_pool_metrics)
+
+
+class SearchFilters(BaseModel):
+    """Restrict knowledge-base retrieval to matching events (values OR-ed, fields AND-ed)."""
+    model_config = ConfigDict(extra="forbid")
+    country: Optional[Union[str, List[str]]] = None
+    city: Optional[Union[str, List[str]]] = None
+    category: Optional[Union[str, List[str]]] = None   # "news/Business" also matches its sub-categories
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
 class ChatRequest(BaseModel):
     question: str
+    filters: Optional[SearchFilters] = None
+
+    def graph_input(self) -> Dict[str, Any]:
+        inputs: Dict[str, Any] = {"question": self.question}
+        if self.filters:
+            inputs["filters"] = self.filters.model_dump(mode="json", exclude_none=True)
+        return inputs
+
+
+async def _probe_cache(req: ChatRequest) -> Optional[Probe]:
+    """Answer-cache lookup; None when the cache is off or the lookup failed (answer normally)."""
+    if not ANSWER_CACHE:
+        return None
+    try:
+        return await get_answer_cache().aprobe(req.question, req.graph_input().get("filters"))
+    except Exception as e:
+        print(f"---ANSWER CACHE LOOKUP FAILED: {e!r}---")
+        return None
+
+
+def _remember(probe: Optional[Probe], updates: Dict[str, Any], answer: Optional[str]):
+    if probe is not None:
+        kind, quote_date = answer_kind(updates)
+        get_answer_cache().put(probe, answer, kind, quote_date)
+
+
+# identical questions (same filters) in flight at once share one graph run
+_chat_flight = SingleFlight("chat")
+
+
+def _flight_key(inputs: Dict[str, Any]) -> str:
+    return AnswerCache.key(inputs["question"], inputs.get("filters"))
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _run_graph(inputs: Dict[str, Any], probe: Optional[Probe],
+                     emit: Optional[Callable[[Optional[str]], None]] = None) -> Optional[str]:
+    """
+    One graph run, returning the answer. With `emit`, node / token SSE events are passed
+    to it as they happen, then None when the run ends.
+    """
+    last, updates = {}, {}
+    # "updates": one chunk per finished node; "messages": LLM tokens as they are produced
+    modes = ["updates", "messages"] if emit else ["updates"]
+    try:
+        # Async nodes: this request awaits its LLM/embedding calls while others run on the same worker
+        async for mode, chunk in graph.astream(inputs, stream_mode=modes):
+            if mode == "updates":
+                for node, state in chunk.items():
+                    if DEBUG_STATE:  # full state dumps are slow with large documents
+                        print(f"Node '{node}':")
+                        pprint(state, indent=2, width=100)
+                    last = state or last
+                    updates[node] = state or {}
+                    if emit:
+                        emit(_sse("node", {"node": node}))
+            else:
+                message, metadata = chunk
+                # only the answer is streamed; router/extractor/grader outputs are structured JSON
+                if metadata.get("langgraph_node") == "generate" and isinstance(message.content, str) and message.content:
+                    emit(_sse("token", {"text": message.content}))
+    finally:
+        if emit:
+            emit(None)
+    answer = last.get("generation")
+    _remember(probe, updates, answer)
+    return answer
+
 
 @app.post("/chat")
-async def chat(req: ChatRequest) -> Dict[str, Any]:
+async def chat(req: ChatRequest, response: Response) -> Dict[str, Any]:
     """
     POST /chat
-    body: {"question": "..."}
+    body: {"question": "...", "filters": {"country": "...", "date_from": "YYYY-MM-DD", ...}}  (filters optional)
     returns: {"answer": "...", "state": {...optional...}}
+    header X-Answer-Cache: exact | semantic | miss
+    Concurrent requests for the same question share one graph run.
     """
-    last = {}
-    # Run the compiled graph synchronously (LangGraph stream is sync)
-    for chunk in graph.stream({"question": req.question}):
-        for node, state in chunk.items():
-            print(f"Node '{node}':")
-            pprint(state, indent=2, width=100)
-            last = state
+    probe = await _probe_cache(req)
+    response.headers["X-Answer-Cache"] = probe.hit if probe else "miss"
+    if probe is not None and probe.answer is not None:
+        return {"answer": probe.answer}
 
-    answer = last.get("generation")
-    return {"answer": answer}
+    inputs = req.graph_input()
+    return {"answer": await _chat_flight.ado(_flight_key(inputs), lambda: _run_graph(inputs, probe))}
+
+
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    filters: Optional[SearchFilters] = None   # applied to every question
+
+
+@app.post("/chat/batch")
+async def chat_batch(req: BatchChatRequest) -> Dict[str, Any]:
+    """
+    POST /chat/batch
+    body: {"questions": ["...", "..."], "filters": {...}}  (filters optional, shared by all questions)
+    returns: {"answers": [{"answer": "...", "error": null}, ...]}  in input order
+    Routing and retrieval run once for the whole batch (one embedding call, one FAISS search);
+    grading and generation run BATCH_CONCURRENCY questions at a time.
+    """
+    filters = req.filters.model_dump(mode="json", exclude_none=True) if req.filters else None
+    return {"answers": await arun_batch(graph, req.questions, [filters] * len(req.questions))}
+
+
+async def _chat_events(inputs: Dict[str, Any], probe: Optional[Probe] = None) -> AsyncIterator[str]:
+    if probe is not None and probe.answer is not None:
+        yield _sse("done", {"answer": probe.answer})
+        return
+    # The run that starts the flight streams its events here; requests that join an
+    # identical run already in flight only get its final answer.
+    events: asyncio.Queue = asyncio.Queue()
+    task, leader = _chat_flight.ashare(_flight_key(inputs), lambda: _run_graph(inputs, probe, events.put_nowait))
+    if leader:
+        while (event := await events.get()) is not None:
+            yield event
+    try:
+        answer = await asyncio.shield(task)
+    except Exception as e:
+        print(f"---STREAM FAILED: {e!r}---")
+        yield _sse("error", {"message": str(e)})
+        return
+    yield _sse("done", {"answer": answer})
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """
+    POST /chat/stream
+    body: {"question": "...", "filters": {...}}  (filters optional, as for /chat)
+    returns: text/event-stream with events
+      node  {"node": "..."}     a graph node finished
+      token {"text": "..."}     next piece of the generated answer
+      done  {"answer": "..."}   full answer (also sent when nothing was streamed)
+      error {"message": "..."}
+    A cached answer is sent as a single done event (header X-Answer-Cache: exact | semantic),
+    as is the answer of an identical question that was already being answered.
+    """
+    probe = await _probe_cache(req)
+    return StreamingResponse(
+        _chat_events(req.graph_input(), probe),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                 "X-Answer-Cache": probe.hit if probe else "miss"},
+    )
+
+
+@app.get("/stats")
+async def stats() -> Dict[str, Any]:
+    """Cache hit/miss counters and the LLM connection pools."""
+    return {"embedding_cache": get_embedding_cache().stats(), "answer_cache": get_answer_cache().stats(),
+            "llm_clients": pool_stats()}
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Prometheus text format: node / call latency histograms, tokens, cost, errors, requests."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
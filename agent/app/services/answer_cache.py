@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..config import (
+    ANSWER_CACHE_ITEMS, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL, ANSWER_CACHE_FINANCE_TTL,
+)
+from ..tools.embed_texts import embed_texts, aembed_texts
+from ..tools.embedding_cache import normalize_text
+from .pre_router import rule_route
+from .retriever import get_retriever
+
+
+_NUMBER = re.compile(r"\d+")
+
+
+def normalize_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form used as the exact key."""
+    return normalize_text(question).casefold().rstrip(" ?!.")
+
+
+def _scope(filters: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+def _end_of_day(now: float) -> float:
+    tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+@dataclass
+class _Entry:
+    answer: str
+    kind: str                      # "knowledge" | "finance"
+    scope: str                     # filters the answer was produced under
+    numbers: Tuple[str, ...]       # digits in the question: "2024" never matches "2025"
+    expires: float
+    slot: Optional[int] = None     # row in the question-vector matrix (knowledge only)
+
+
+@dataclass
+class Probe:
+    """Result of a lookup; pass it back to AnswerCache.put after a miss."""
+    key: str
+    scope: str
+    numbers: Tuple[str, ...]
+    kb_version: Optional[int]
+    answer: Optional[str] = None
+    hit: str = "miss"              # "exact" | "semantic" | "miss"
+    vector: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+class AnswerCache:
+    """
+    Final answers keyed by question + filters, in front of the graph.
+
+    Lookup order:
+      1. exact: normalized question (case, whitespace, trailing punctuation ignored)
+      2. semantic: cosine between question embeddings >= `similarity`, same filters and
+         same numbers in the question; knowledge answers only (a price for "gold" must never
+         answer "silver")
+
+    Knowledge answers expire after `ttl` and are all dropped when the retriever loads a new
+    index version. Finance answers quoting today live `finance_ttl`; older quotes live until
+    midnight. LRU-evicted beyond `max_items`.
+    """
+
+    def __init__(
+        self,
+        max_items: int = ANSWER_CACHE_ITEMS,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        ttl: float = ANSWER_CACHE_TTL,
+        finance_ttl: float = ANSWER_CACHE_FINANCE_TTL,
+        kb_version: Optional[Callable[[], Optional[int]]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_items = max_items
+        self.similarity = similarity
+        self.ttl = ttl
+        self.finance_ttl = finance_ttl
+        self._kb_version_fn = kb_version or _current_kb_version
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Question vectors of knowledge entries, one row per slot; rows of free slots are zero.
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys: list = [None] * max_items
+        self._free = list(range(max_items - 1, -1, -1))
+        self._kb_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._counts = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(question: str, filters: Optional[Dict[str, Any]] = None) -> str:
+        return hashlib.sha256(f"{normalize_question(question)}\x00{_scope(filters)}".encode("utf-8")).hexdigest()
+
+    # -- internals (lock held) --------------------------------------------
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        if entry.slot is not None:
+            self._vectors[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free.append(entry.slot)
+
+    def _check_version(self, version: Optional[int]):
+        if version == self._kb_version:
+            return
+        stale = [k for k, e in self._entries.items() if e.kind == "knowledge"]
+        for k in stale:
+            self._drop(k)
+        if self._kb_version is not None and stale:
+            self._counts["invalidations"] += 1
+            print(f"---ANSWER CACHE: INDEX VERSION {version}, DROPPED {len(stale)} ANSWERS---")
+        self._kb_version = version
+
+    def _get(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= now:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    # -- lookup --------------------------------------------------------------
+    def _probe_exact(self, question: str, filters: Optional[Dict[str, Any]], version: Optional[int]) -> Probe:
+        probe = Probe(key=self.key(question, filters), scope=_scope(filters),
+                      numbers=tuple(_NUMBER.findall(question)), kb_version=version)
+        with self._lock:
+            self._check_version(version)
+            entry = self._get(probe.key, self._clock())
+            if entry is not None:
+                self._counts["exact_hits"] += 1
+                probe.answer, probe.hit = entry.answer, "exact"
+        return probe
+
+    def _wants_vector(self, question: str, probe: Probe) -> bool:
+        # obvious price questions are never answered (or stored) semantically: skip the embedding
+        return probe.hit == "miss" and probe.kb_version is not None and self.similarity < 1.0 \
+            and rule_route(question) != "yes"
+
+    def _probe_similar(self, probe: Probe, vector: np.ndarray) -> Probe:
+        probe.vector = vector
+        with self._lock:
+            if self._vectors is not None and len(self._free) < self.max_items:
+                sims = self._vectors @ vector
+                now = self._clock()
+                for slot in np.argsort(-sims)[:8]:
+                    if sims[slot] < self.similarity:
+                        break
+                    key = self._slot_keys[slot]
+                    entry = self._entries.get(key) if key else None
+                    if entry is None or entry.scope != probe.scope or entry.numbers != probe.numbers:
+                        continue
+                    entry = self._get(key, now)
+                    if entry is not None:
+                        self._counts["semantic_hits"] += 1
+                        probe.answer, probe.hit = entry.answer, "semantic"
+                        return probe
+            self._counts["misses"] += 1
+        return probe
+
+    def _miss(self, probe: Probe) -> Probe:
+        if probe.hit == "miss":
+            with self._lock:
+                self._counts["misses"] += 1
+        return probe
+
+    def probe(self, question: str, filters: Optional[Dict[str, Any]] = None) -> Probe:
+        """Look the question up; `answer` is set on a hit."""
+        probe = self._probe_exact(question, filters, self._kb_version_fn())
+        if self._wants_vector(question, probe):
+            return self._probe_similar(probe, _unit(embed_texts([question])[0]))
+        return self._miss(probe)
+
+    async def aprobe(self, question: str, filters: Optional[Dict[str, Any]] = None) -> Probe:
+        # reading the version may load or reload the index: keep it off the event loop
+        version = await asyncio.to_thread(self._kb_version_fn)
+        probe = self._probe_exact(question, filters, version)
+        if self._wants_vector(question, probe):
+            return self._probe_similar(probe, _unit((await aembed_texts([question]))[0]))
+        return self._miss(probe)
+
+    # -- store ---------------------------------------------------------------
+    def put(self, probe: Probe, answer: Optional[str], kind: str, quote_date: Optional[str] = None):
+        """Cache the graph's answer for a missed probe. kind: "knowledge" | "finance"."""
+        if not answer or probe.hit != "miss" or self.max_items <= 0:
+            return
+        now = self._clock()
+        if kind == "finance":
+            try:
+                moving = quote_date is None or date.fromisoformat(quote_date) >= datetime.fromtimestamp(now).date()
+            except ValueError:
+                moving = True
+            expires = now + self.finance_ttl if moving else _end_of_day(now)
+        else:
+            expires = now + self.ttl
+        with self._lock:
+            if kind == "knowledge" and probe.kb_version != self._kb_version:
+                return  # the index changed while this answer was being produced
+            if probe.key in self._entries:
+                self._drop(probe.key)
+            while len(self._entries) >= self.max_items:
+                self._drop(next(iter(self._entries)))
+            entry = _Entry(answer=answer, kind=kind, scope=probe.scope, numbers=probe.numbers, expires=expires)
+            if kind == "knowledge" and probe.vector is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_items, probe.vector.shape[0]), dtype="float32")
+                entry.slot = self._free.pop()
+                self._vectors[entry.slot] = probe.vector
+                self._slot_keys[entry.slot] = probe.key
+            self._entries[probe.key] = entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counts)
+            stats["hits"] = stats["exact_hits"] + stats["semantic_hits"]
+            stats["items"] = len(self._entries)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    v = np.asarray(v, dtype="float32")
+    return v / (np.linalg.norm(v) + 1e-12)
+
+
+def _current_kb_version() -> Optional[int]:
+    """Loaded index version (None if there is no index yet: finance answers still cache)."""
+    try:
+        return get_retriever().version
+    except Exception:
+        return None
+
+
+def answer_kind(updates: Dict[str, Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+    """("finance", quote date) or ("knowledge", None), from the graph's per-node updates."""
+    if "yahoo_search" in updates or "extract_ticker" in updates:
+        # the ticker comes from extract_ticker, or from the combined router (query_evaluate)
+        ticker = (updates.get("extract_ticker") or updates.get("query_evaluate") or {}).get("documents") or {}
+        return "finance", ticker.get("date") if isinstance(ticker, dict) else None
+    return "knowledge", None
+
+
+_cache: AnswerCache | None = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache used by the server."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
@@ -0,0 +1,210 @@
+"""
+Context assembly between grading and generation.
+
+The answer LLM used to receive the graded documents as a raw list of {"id", "score", "text"}
+dicts (or the raw price dict), so the prompt grew with k and document length. Here they are
+deduplicated, diversified with maximal marginal relevance (on the stored index vectors) and
+packed into CONTEXT_TOKEN_BUDGET tokens as numbered plain text:
+
+    context, report = assemble_context(documents)
+    report  # {"docs_in", "docs_out", "raw_tokens", "context_tokens", "saved_tokens"}
+"""
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import (
+    CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_DOCS, CONTEXT_DEDUP_SIMILARITY, CONTEXT_MMR_LAMBDA, CONTEXT_ENCODING,
+)
+from ..metrics import CONTEXT_TOKENS, CONTEXT_DROPPED
+
+_SPACE = re.compile(r"\s+")
+NO_DOCUMENTS = "(no relevant documents found)"
+
+
+# ----------------------------
+# Token counting
+# ----------------------------
+_encoding_lock = threading.Lock()
+_encoding: Any = None  # tiktoken Encoding once loaded, False when it could not be loaded
+_loader: Optional[threading.Thread] = None
+
+
+def _load_encoding():
+    global _encoding
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(CONTEXT_ENCODING)  # downloads the BPE file on first use
+    except Exception as e:  # not installed, or the BPE file cannot be downloaded
+        print(f"---TIKTOKEN UNAVAILABLE ({type(e).__name__}), ESTIMATING TOKENS AS CHARS/4---")
+        enc = False
+    _encoding = enc
+
+
+def warm_encoding() -> threading.Thread:
+    """Load the encoding in a background thread (once); join it to wait for exact counts."""
+    global _loader
+    with _encoding_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load_encoding, name="tiktoken-load", daemon=True)
+            _loader.start()
+    return _loader
+
+
+def _get_encoding():
+    # never loads on the request path (it may download, or hang offline): start the loader
+    # and estimate as chars / 4 until it is ready
+    if _encoding is None:
+        warm_encoding()
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc:
+        return len(enc.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, n: int) -> str:
+    """The first n tokens of text."""
+    enc = _get_encoding()
+    if enc:
+        return enc.decode(enc.encode(text, disallowed_special=())[:n])
+    return text[: 4 * n]
+
+
+# ----------------------------
+# Selection
+# ----------------------------
+def _compact(text: str) -> str:
+    return _SPACE.sub(" ", str(text)).strip()
+
+
+def dedup(docs: List[Dict[str, Any]], vecs: Optional[np.ndarray],
+          threshold: float = CONTEXT_DEDUP_SIMILARITY) -> List[int]:
+    """
+    Positions of docs to keep, best-ranked first: identical texts (after whitespace / case
+    folding) always count as duplicates, near-identical vectors when `vecs` are given.
+    """
+    seen, keep = set(), []
+    for i, d in enumerate(docs):
+        key = _compact(d["text"]).lower()
+        if key in seen:
+            continue
+        if vecs is not None and keep and float(np.max(vecs[keep] @ vecs[i])) >= threshold:
+            continue
+        seen.add(key)
+        keep.append(i)
+    return keep
+
+
+def mmr(relevance: np.ndarray, vecs: np.ndarray, n: int, lam: float = CONTEXT_MMR_LAMBDA) -> List[int]:
+    """
+    Maximal marginal relevance: repeatedly pick the document maximizing
+    lam * relevance - (1 - lam) * max similarity to the documents already picked.
+    """
+    picked: List[int] = []
+    best_sim = np.full(len(relevance), -np.inf)
+    candidates = list(range(len(relevance)))
+    while candidates and len(picked) < n:
+        penalty = np.where(np.isinf(best_sim[candidates]), 0.0, best_sim[candidates])
+        scores = lam * relevance[candidates] - (1 - lam) * penalty
+        pick = candidates.pop(int(np.argmax(scores)))
+        picked.append(pick)
+        best_sim = np.maximum(best_sim, vecs @ vecs[pick])
+    return picked
+
+
+def _rank_relevance(scores: List[Optional[float]]) -> np.ndarray:
+    """
+    MMR relevance of documents given in retrieval order (RRF-fused when hybrid): the hits'
+    cosines sorted best first and handed out by rank, so a keyword-only hit keeps its place
+    while relevance stays on the cosine scale CONTEXT_MMR_LAMBDA is tuned for.
+    """
+    known = sorted((s for s in scores if s is not None), reverse=True)
+    if not known:
+        return np.linspace(1.0, 0.0, len(scores), endpoint=False, dtype="float32")
+    return np.array(known + [known[-1]] * (len(scores) - len(known)), dtype="float32")
+
+
+def _vectors(docs: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    ids = [d.get("id") for d in docs]
+    if not ids or any(i is None for i in ids):
+        return None
+    from .retriever import get_retriever
+    vecs = get_retriever().vectors(ids)
+    if vecs is None:
+        return None
+    return vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
+
+
+# ----------------------------
+# Formatting
+# ----------------------------
+_SEPARATOR_TOKENS = 4  # "\n\n[n] " in front of every document
+
+
+def _pack(blocks: List[str], budget: int) -> Tuple[List[str], int]:
+    """Greedily keep blocks (in order) that still fit in `budget` tokens; the first is cut to fit."""
+    packed, used = [], 0
+    for block in blocks:
+        n = count_tokens(block) + _SEPARATOR_TOKENS
+        if used + n > budget:
+            if packed:
+                continue  # a later, shorter document may still fit
+            block = truncate_tokens(block, max(budget - _SEPARATOR_TOKENS, 0))
+            n = count_tokens(block) + _SEPARATOR_TOKENS
+        packed.append(block)
+        used += n
+    return packed, used
+
+
+def _format_price(doc: Dict[str, Any]) -> str:
+    return "\n".join(f"{k}: {v}" for k, v in doc.items() if v not in (None, "", "None"))
+
+
+def assemble_context(documents: Any, budget: int = CONTEXT_TOKEN_BUDGET,
+                     max_docs: int = CONTEXT_MAX_DOCS) -> Tuple[str, Dict[str, int]]:
+    """
+    documents: graded knowledge documents (list of {"id", "score", "text"}, best first) or the
+    finance node's price dict. Returns the context text for the RAG prompt and a token report.
+    """
+    raw_tokens = count_tokens(str(documents))  # what the prompt received before assembly
+    if isinstance(documents, dict):
+        docs_in = 1
+        blocks = [_format_price(documents)]
+    else:
+        docs = list(documents or [])
+        docs_in = len(docs)
+        vecs = _vectors(docs) if len(docs) > 1 else None
+        keep = dedup(docs, vecs)
+        CONTEXT_DROPPED.inc(docs_in - len(keep), reason="duplicate")
+        if vecs is not None and len(keep) > 1:
+            relevance = _rank_relevance([docs[i].get("score") for i in keep])
+            order = [keep[i] for i in mmr(relevance, vecs[keep], max_docs)]
+        else:
+            order = keep[:max_docs]
+        CONTEXT_DROPPED.inc(len(keep) - len(order), reason="max_docs")
+        blocks = [_compact(docs[i]["text"]) for i in order]
+
+    packed, _ = _pack(blocks, budget)
+    if not isinstance(documents, dict):
+        CONTEXT_DROPPED.inc(len(blocks) - len(packed), reason="budget")
+        packed = [f"[{n}] {b}" for n, b in enumerate(packed, 1)]
+    context = "\n\n".join(packed) or NO_DOCUMENTS
+    context_tokens = count_tokens(context)
+    report = {
+        "docs_in": docs_in,
+        "docs_out": len(packed),
+        "raw_tokens": raw_tokens,
+        "context_tokens": context_tokens,
+        "saved_tokens": raw_tokens - context_tokens,
+    }
+    CONTEXT_TOKENS.inc(raw_tokens, stage="raw")
+    CONTEXT_TOKENS.inc(context_tokens, stage="packed")
+    print(f"---CONTEXT: {docs_in} -> {len(packed)} DOCS, {raw_tokens} -> {context_tokens} TOKENS "
+          f"(SAVED {report['saved_tokens']})---")
+    return context, report
@@ -1,19 +1,21 @@
-### Retrieval Evaluator
-from dotenv import load_dotenv
-load_dotenv()  
 import os
 from typing import Optional, Dict
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from datetime import datetime
 from pydantic import BaseModel, Field
+from ..config import OPENAI_API_KEY
+from .llm_clients import chat_model
 
 QUERY_EXTRACTOR_MODEL = os.getenv("QUERY_EXTRACTOR_MODEL", "gpt-5")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-today = datetime.today().strftime("%Y-%m-%d")
-
-print(today)
+# Also used by the combined router / extractor (query_evaluator.py)
+TICKER_RULES = """Rules for choosing the ticker:
+- Always prefer stable tickers: futures contracts (like GC=F, CL=F, ZW=F), 
+  major stock indices (like ^GSPC, ^DJI), large-cap stocks (like AAPL, MSFT, TSLA), 
+  or liquid ETFs (like SPY, GLD, SLV).
+- Do NOT use FX spot symbols (e.g. XAUUSD=X, EURUSD=X), as they are unreliable.
+- If unsure, pick the most common futures, index, stock, or ETF ticker.
+"""
 
 class QueryExtractorOutput(BaseModel):
     symbol: str = Field(description="Yahoo Finance ticker, e.g. GC=F or XAUUSD=X")
@@ -33,13 +35,7 @@ for Yahoo Finance search. The JSON must have exactly three fields:
 - "display_name": a short, human-readable name of the ticker 
    (e.g. GC=F → "Gold Futures", ^GSPC → "S&P 500 Index", AAPL → "Apple Inc.")
 
-Rules for choosing the ticker:
-- Always prefer stable tickers: futures contracts (like GC=F, CL=F, ZW=F), 
-  major stock indices (like ^GSPC, ^DJI), large-cap stocks (like AAPL, MSFT, TSLA), 
-  or liquid ETFs (like SPY, GLD, SLV).
-- Do NOT use FX spot symbols (e.g. XAUUSD=X, EURUSD=X), as they are unreliable.
-- If unsure, pick the most common futures, index, stock, or ETF ticker.
-
+""" + TICKER_RULES + """
 Today's date is {today}.
 
 Return ONLY a valid JSON object, with no prose and no code fences. Example:
@@ -63,10 +59,11 @@ Return ONLY a valid JSON object, with no prose and no code fences. Example:
         if not api_key:
             raise RuntimeError(f"OPENAI_API_KEY not set in environment.")
 
-        self.today = today or datetime.today().strftime("%Y-%m-%d")
+        # fixed date for tests / replays; otherwise today's date at each call (the extractor is shared)
+        self.today = today
 
-        self.llm = ChatOpenAI(
-            model=model,
+        self.llm = chat_model(
+            model,
             api_key=api_key,
             temperature=temperature,
             reasoning={"effort": reasoning_effort},
@@ -85,10 +82,15 @@ Return ONLY a valid JSON object, with no prose and no code fences. Example:
 
     def extract(self, question: str, *, today: Optional[str] = None) -> Dict[str, str]:
         """Return {'symbol': ..., 'date': ...}"""
-        _today = today or self.today
+        _today = today or self.today or datetime.today().strftime("%Y-%m-%d")
         out: QueryExtractorOutput = self.chain.invoke({"today": _today, "question": question})
         return out.model_dump()
 
+    async def aextract(self, question: str, *, today: Optional[str] = None) -> Dict[str, str]:
+        _today = today or self.today or datetime.today().strftime("%Y-%m-%d")
+        out: QueryExtractorOutput = await self.chain.ainvoke({"today": _today, "question": question})
+        return out.model_dump()
+
 # ----------------------------
 if __name__ == "__main__":
     extractor = FinanceQueryExtractor()
@@ -0,0 +1,147 @@
+"""
+Similarity bands in front of the document grader (nodes/evaluate_documents.py).
+
+Retrieval already returns each document's cosine similarity to the question. A document
+scoring at least `accept` is taken as relevant, one below `reject` as irrelevant (unless only
+BM25 found it), and only the ambiguous band in between is sent to RetrievalEvaluatorService.
+The thresholds are fitted offline on recorded grader verdicts (scripts/calibrate_grader.py):
+
+    {"accept": 0.62, "reject": 0.31, "embed_model": "text-embedding-3-large", "index_dim": 3072, ...}
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..config import (
+    EMBED_MODEL, INDEX_DIM, GRADE_BANDS, GRADE_CALIBRATION_PATH, GRADE_ACCEPT, GRADE_REJECT,
+    GRADE_VERDICT_LOG,
+)
+from ..metrics import GRADER_DOCS, GRADER_CALLS_SAVED
+
+
+# ----------------------------
+# Bands
+# ----------------------------
+@dataclass(frozen=True)
+class GradeBands:
+    """accept / reject cosine thresholds; None disables that side (the LLM decides)."""
+    accept: Optional[float] = None
+    reject: Optional[float] = None
+
+    def decide(self, score: Optional[float], dense: bool = True) -> Optional[str]:
+        """
+        'yes' / 'no' when the score alone decides, None when the LLM has to grade.
+        dense=False marks a keyword-only (BM25) hit: BM25 matched it despite its cosine, so a
+        low score is no reason to reject it.
+        """
+        if score is None:  # keyword-only hit without a stored vector
+            return None
+        if self.accept is not None and score >= self.accept:
+            return "yes"
+        if self.reject is not None and score < self.reject and dense:
+            return "no"
+        return None
+
+
+def load_bands(path: str = GRADE_CALIBRATION_PATH, embed_model: str = EMBED_MODEL,
+               index_dim: int = INDEX_DIM) -> GradeBands:
+    """
+    Bands from a calibration file; none if it is missing or was fitted on another embedding
+    model or index width (KB_INDEX_DIM).
+    """
+    try:
+        with open(path) as f:
+            cal = json.load(f)
+    except FileNotFoundError:
+        return GradeBands()
+    if cal.get("embed_model") not in (None, embed_model):
+        # cosine scales differ between embedding models: thresholds do not carry over
+        print(f"---GRADER CALIBRATION IS FOR {cal['embed_model']}, NOT {embed_model}: IGNORED---")
+        return GradeBands()
+    if cal.get("index_dim") not in (None, index_dim):
+        # truncated vectors give other cosines than the full ones
+        print(f"---GRADER CALIBRATION IS FOR {cal['index_dim']} DIMS, NOT {index_dim}: IGNORED---")
+        return GradeBands()
+    return GradeBands(accept=cal.get("accept"), reject=cal.get("reject"))
+
+
+_bands: Optional[GradeBands] = None
+_bands_lock = threading.Lock()
+
+
+def get_grade_bands() -> GradeBands:
+    """Process-wide bands: GRADE_ACCEPT / GRADE_REJECT, else the calibration file (read once)."""
+    global _bands
+    if _bands is None:
+        with _bands_lock:
+            if _bands is None:
+                if not GRADE_BANDS:
+                    bands = GradeBands()
+                else:
+                    bands = load_bands()
+                    bands = GradeBands(
+                        accept=float(GRADE_ACCEPT) if GRADE_ACCEPT else bands.accept,
+                        reject=float(GRADE_REJECT) if GRADE_REJECT else bands.reject,
+                    )
+                _bands = bands
+    return _bands
+
+
+def set_grade_bands(bands: Optional[GradeBands]):
+    """Replace the process-wide bands (None = load again on next use); for tools and tests."""
+    global _bands
+    with _bands_lock:
+        _bands = bands
+
+
+# ----------------------------
+# Reporting
+# ----------------------------
+def grading_report(decided: List[Optional[str]], mode: str) -> Dict[str, int]:
+    """
+    decided: the score-decided verdict per document (None = graded by the LLM).
+    Counts grader LLM calls made and saved against grading every document.
+    """
+    docs = len(decided)
+    accepted = sum(1 for v in decided if v == "yes")
+    rejected = sum(1 for v in decided if v == "no")
+    llm = docs - accepted - rejected
+    if mode == "joint":  # one call grades all documents
+        calls, baseline = int(llm > 0), int(docs > 0)
+    else:
+        calls, baseline = llm, docs
+    report = {"docs": docs, "accepted": accepted, "rejected": rejected, "llm_graded": llm,
+              "llm_calls": calls, "saved_calls": baseline - calls}
+    GRADER_DOCS.inc(accepted, decision="accepted")
+    GRADER_DOCS.inc(rejected, decision="rejected")
+    GRADER_DOCS.inc(llm, decision="llm")
+    GRADER_CALLS_SAVED.inc(report["saved_calls"])
+    print(f"---GRADING: {docs} DOCS, {accepted} ACCEPTED / {rejected} REJECTED BY SCORE, "
+          f"{calls} LLM CALLS (SAVED {report['saved_calls']})---")
+    return report
+
+
+# ----------------------------
+# Verdict log
+# ----------------------------
+_log_lock = threading.Lock()
+
+
+def record_verdicts(question: str, documents: List[Dict[str, Any]], verdicts: List[str],
+                    path: str = GRADE_VERDICT_LOG):
+    """Append LLM grader verdicts as JSONL calibration samples (no-op without GRADE_VERDICT_LOG)."""
+    if not path or not documents:
+        return
+    now = time.time()
+    lines = "".join(
+        json.dumps({"ts": now, "question": question, "id": d.get("id"), "score": d.get("score"),
+                    "verdict": v, "embed_model": EMBED_MODEL, "index_dim": INDEX_DIM}) + "\n"
+        for d, v in zip(documents, verdicts)
+    )
+    with _log_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(lines)
@@ -0,0 +1,199 @@
+"""
+Long-lived, connection-pooled clients for every OpenAI call in the process.
+
+All chat models (router, extractor, grader, rag_chain) and the embeddings client send
+their requests through one keep-alive HTTP pool (one sync, one async), so connections and
+TLS sessions are reused across questions instead of being opened per request.
+
+    llm = chat_model("gpt-4o-mini", temperature=0)   # same instance for the same settings
+    pool_stats()  # {"requests", "tcp_connects", "tls_handshakes", "open_connections", "idle_connections"}
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import (
+    OPENAI_API_KEY, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE, LLM_KEEPALIVE_EXPIRY, LLM_TIMEOUT,
+)
+
+
+# ----------------------------
+# Pooled transports
+# ----------------------------
+class _PoolCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0}
+
+    def add(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+    def on_event(self, name: str):
+        # httpcore trace events: a new connection shows up as connect_tcp (+ start_tls for https)
+        if name == "connection.connect_tcp.complete":
+            self.add("tcp_connects")
+        elif name == "connection.start_tls.complete":
+            self.add("tls_handshakes")
+
+
+def _limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _pool_sizes(transport) -> Tuple[int, int]:
+    conns = getattr(getattr(transport, "_pool", None), "connections", [])
+    return len(conns), sum(1 for c in conns if c.is_idle())
+
+
+# httpx only needs handle_request / close from a transport; not subclassing keeps httpx
+# (and openai) out of the startup import path until the first LLM call.
+class _PooledTransport:
+    """httpx's pooled transport, counting requests and new connections."""
+
+    def __init__(self, counters: _PoolCounters):
+        import httpx
+        self.counters = counters
+        self.inner = httpx.HTTPTransport(limits=_limits())
+
+    def _trace(self, name: str, info: Dict[str, Any]):
+        self.counters.on_event(name)
+
+    def handle_request(self, request):
+        self.counters.add("requests")
+        request.extensions["trace"] = self._trace
+        return self.inner.handle_request(request)
+
+    def sizes(self) -> Tuple[int, int]:
+        return _pool_sizes(self.inner)
+
+    def close(self):
+        self.inner.close()
+
+
+class _AsyncPooledTransport:
+    """
+    Async counterpart. Pooled connections belong to the event loop that opened them, so
+    there is one pool per running loop (scripts may call asyncio.run more than once).
+    """
+
+    def __init__(self, counters: _PoolCounters):
+        self.counters = counters
+        self._pools = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncHTTPTransport
+
+    async def _trace(self, name: str, info: Dict[str, Any]):
+        self.counters.on_event(name)
+
+    def _pool(self):
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            import httpx
+            pool = self._pools[loop] = httpx.AsyncHTTPTransport(limits=_limits())
+        return pool
+
+    async def handle_async_request(self, request):
+        self.counters.add("requests")
+        request.extensions["trace"] = self._trace
+        return await self._pool().handle_async_request(request)
+
+    def sizes(self) -> Tuple[int, int]:
+        sizes = [_pool_sizes(p) for p in list(self._pools.values())]
+        return sum(s[0] for s in sizes), sum(s[1] for s in sizes)
+
+    async def aclose(self):
+        try:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        except RuntimeError:
+            pool = None
+        if pool is not None:
+            await pool.aclose()
+
+
+# ----------------------------
+# Clients
+# ----------------------------
+_lock = threading.Lock()
+_counters = {"sync": _PoolCounters(), "async": _PoolCounters()}
+_transports: Dict[str, Any] = {}
+_http: Dict[str, Any] = {}
+_chat_models: Dict[Tuple, Any] = {}
+
+
+def http_client():
+    """The shared sync HTTP client (OpenAI SDK defaults, pooled transport)."""
+    if "sync" not in _http:
+        with _lock:
+            if "sync" not in _http:
+                from openai import DefaultHttpxClient
+                _transports["sync"] = _PooledTransport(_counters["sync"])
+                _http["sync"] = DefaultHttpxClient(transport=_transports["sync"], timeout=LLM_TIMEOUT)
+    return _http["sync"]
+
+
+def http_async_client():
+    if "async" not in _http:
+        with _lock:
+            if "async" not in _http:
+                from openai import DefaultAsyncHttpxClient
+                _transports["async"] = _AsyncPooledTransport(_counters["async"])
+                _http["async"] = DefaultAsyncHttpxClient(transport=_transports["async"], timeout=LLM_TIMEOUT)
+    return _http["async"]
+
+
+def openai_client(api_key: Optional[str] = OPENAI_API_KEY):
+    """openai.OpenAI on the shared pool (embeddings)."""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, http_client=http_client())
+
+
+def async_openai_client(api_key: Optional[str] = OPENAI_API_KEY):
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key, http_client=http_async_client())
+
+
+def chat_model(model: str, api_key: Optional[str] = OPENAI_API_KEY, **params):
+    """
+    ChatOpenAI on the shared pool, one instance per (model, settings): services asking for
+    the same model with the same settings share it, so no service needs its own client.
+    `params` are ChatOpenAI arguments. stream_usage defaults to True so streamed calls
+    also report token usage (the token / cost metrics).
+    """
+    params.setdefault("stream_usage", True)
+    key = (model, api_key, repr(sorted(params.items())))
+    llm = _chat_models.get(key)
+    if llm is None:
+        with _lock:
+            llm = _chat_models.get(key)
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+            llm = ChatOpenAI(model=model, api_key=api_key, http_client=http_client(),
+                             http_async_client=http_async_client(), **params)
+            with _lock:
+                llm = _chat_models.setdefault(key, llm)
+    return llm
+
+
+def reset():
+    """Forget the memoized chat models (the HTTP pools stay); they are rebuilt on next use."""
+    with _lock:
+        _chat_models.clear()
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Per pool: requests sent, new TCP connections / TLS handshakes, connections open / idle now."""
+    out = {}
+    for name, counters in _counters.items():
+        with counters.lock:
+            stats = dict(counters.counts)
+        transport = _transports.get(name)
+        stats["open_connections"], stats["idle_connections"] = transport.sizes() if transport else (0, 0)
+        out[name] = stats
+    out["chat_models"] = {"instances": len(_chat_models)}
+    return out
@@ -0,0 +1,166 @@
+import re
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from ..config import PRE_ROUTER_CENTROIDS, PRE_ROUTER_MARGIN
+
+
+# ----------------------------
+# Rules
+# ----------------------------
+# Yahoo-style symbols: ^GSPC, GC=F, EURUSD=X, BRK-B; plain caps words like AAPL are matched case-sensitively.
+_SYMBOL = re.compile(r"(\^[A-Z]{2,6}\b|\b[A-Z]{1,6}=[FX]\b|\$[A-Z]{1,5}\b|\b[A-Z]{2,5}-[A-Z]\b)")
+_CAPS = re.compile(r"\b[A-Z]{2,5}\b")
+_PRICE = re.compile(
+    r"\b(price[sd]?|quote[sd]?|clos(e|ed|ing)|open(ed|ing)?\s+at|trad(ing|ed)\s+at|"
+    r"how much (is|was|did)|worth|cost(s)?|valued? at|per (ounce|barrel|bushel|share))\b",
+    re.I,
+)
+_INSTRUMENT = re.compile(
+    r"\b(gold|silver|platinum|copper|oil|crude|brent|wti|natural gas|wheat|corn|soy(beans?)?|coffee|"
+    r"sugar|cotton|bitcoin|s&p|s&p 500|dow|nasdaq|russell|index|stock|shares?|etf|futures?|ticker)\b",
+    re.I,
+)
+# Explanatory wording: price may be mentioned, but the user wants prose, not a quote.
+_EXPLAIN = re.compile(
+    r"\b(why|how (did|does|do|will|would)|explain|summari[sz]e|impact|affect(s|ed)?|effect|cause[sd]?|"
+    r"trend|outlook|forecast|situation|news|history|policy|tariffs?|ban|sanctions?|because|earnings|"
+    r"invest\w*|ris(e|es|en|ing)|rose|fall(s|en|ing)?|fell)\b",
+    re.I,
+)
+_WHEN_WORDS = (r"(today|yesterday|now|right now|currently|last (close|friday|monday|tuesday|wednesday|thursday)|"
+               r"on \d{4}-\d{2}-\d{2}|\d{4}-\d{2}-\d{2})")
+# an instrument name of up to four words, optionally a date, and nothing after it
+_NAME_AND_WHEN = r"[\w&^=.$-]+(\s+[\w&^=.$-]+){0,3}?\s*(" + _WHEN_WORDS + r")?\s*\??\s*$"
+# Explicit quote requests; only these skip the LLM router. Anything looser ("Are wheat prices
+# high ...", "Is gold worth ...") is left to it.
+_QUOTE_FORMS = [re.compile(p, re.I) for p in (
+    # What is the (current) price of gold (yesterday)? / What's the close of ^GSPC on 2024-12-31?
+    r"^\s*(what|where)('s|\s+is|\s+was|\s+were)\s+(the\s+)?((current|latest|closing|opening|spot)\s+)?"
+    r"(price|quote|close|value)\s+(of|for)\s+" + _NAME_AND_WHEN,
+    # Price of wheat on 2024-12-31 / Quote for GC=F today / Current price of Tesla stock
+    r"^\s*((current|latest|closing|opening|spot)\s+)?(price|quote|close)\s+(of|for)\s+" + _NAME_AND_WHEN,
+    # What did AAPL close at ... / Where did the S&P 500 close ... / What's SPY trading at?
+    r"^\s*(what|where)('s|\s+(did|does|is|was))\s+.{1,40}?\s+(closed?|trading|traded|opened|settled?)(\s+at)?\s*"
+    r"(\?|$|" + _WHEN_WORDS + r")",
+    # How much is crude oil per barrel today? / How much did corn futures cost last Friday?
+    r"^\s*how much (is|was|are|were)\s+(an?\s+|one\s+)?[\w&^=.$-]+(\s+[\w&^=.$-]+){0,3}?(\s+per\s+\w+)?\s*"
+    r"(" + _WHEN_WORDS + r")?\s*\??\s*$",
+    r"^\s*how much (did|does|do)\s+.{1,40}?\s+cost(\s+" + _WHEN_WORDS + r")?\s*\??\s*$",
+    # Silver price now / Gold quote yesterday?
+    r"^\s*[\w&^=.$ -]{1,30}?\s+(price|quote|close)\s*(" + _WHEN_WORDS + r")?\s*\??\s*$",
+    # ^GSPC on 2024-12-31? / MSFT today
+    r"^\s*[\w^=.$-]{1,12}\s+" + _WHEN_WORDS + r"\s*\??\s*$",
+)]
+# Acronyms that look like tickers but usually are not.
+_NOT_TICKERS = {"EU", "US", "USA", "UK", "UN", "GDP", "CEO", "AI", "WHO", "NATO", "OPEC", "IMF", "ECB", "FED"}
+
+
+def _has_symbol(question: str) -> bool:
+    if _SYMBOL.search(question):
+        return True
+    return any(w not in _NOT_TICKERS for w in _CAPS.findall(question))
+
+
+def rule_route(question: str) -> Optional[str]:
+    """
+    'yes' / 'no' when the wording alone is unambiguous, else None.
+      yes: an explicit quote request (_QUOTE_FORMS) for a named instrument or symbol,
+           without explanatory wording
+      no:  mentions neither a price nor an instrument nor a symbol
+    """
+    price = bool(_PRICE.search(question))
+    instrument = bool(_INSTRUMENT.search(question))
+    symbol = _has_symbol(question)
+
+    if (instrument or symbol) and not _EXPLAIN.search(question) \
+            and any(form.search(question) for form in _QUOTE_FORMS):
+        return "yes"
+    if not (price or instrument or symbol):
+        return "no"
+    return None
+
+
+# ----------------------------
+# Centroids
+# ----------------------------
+PRICE_EXAMPLES: List[str] = [
+    "What is the price of wheat today?",
+    "Gold price yesterday?",
+    "Close of ^GSPC on 2024-12-31?",
+    "How much is a barrel of crude oil right now?",
+    "What did Apple stock close at on Friday?",
+    "Silver quote for 2025-03-14",
+    "Current value of the S&P 500 index",
+    "Where is corn trading today?",
+]
+OTHER_EXAMPLES: List[str] = [
+    "What is the tariff situation EU–US?",
+    "Summarize wheat export bans in 2024.",
+    "Why did oil prices fall last month?",
+    "What happened at the G7 summit?",
+    "What is the city of Zurich like?",
+    "How do sanctions affect Russian gas exports?",
+    "Which countries restricted rice exports?",
+    "Explain the impact of drought on coffee harvests.",
+]
+
+
+class PreRouter:
+    """
+    Cheap local tier in front of QueryEvaluatorService.
+
+    decide(question) returns 'yes'/'no' when a local tier is confident and None
+    otherwise, in which case the caller asks the LLM router.
+    """
+
+    def __init__(self, use_centroids: bool = PRE_ROUTER_CENTROIDS, margin: float = PRE_ROUTER_MARGIN):
+        self.use_centroids = use_centroids
+        self.margin = margin
+        self._centroids: Optional[np.ndarray] = None  # (2, DIM): [price, other]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(x: np.ndarray) -> np.ndarray:
+        return x / (np.linalg.norm(x, axis=-1, keepdims=True) + 1e-12)
+
+    def _get_centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    from ..tools.embed_texts import embed_texts  # cached after the first run
+                    emb = self._normalize(embed_texts(PRICE_EXAMPLES + OTHER_EXAMPLES))
+                    n = len(PRICE_EXAMPLES)
+                    self._centroids = self._normalize(np.stack([emb[:n].mean(0), emb[n:].mean(0)]))
+        return self._centroids
+
+    def centroid_route(self, q_emb: np.ndarray) -> Optional[str]:
+        sims = self._get_centroids() @ self._normalize(np.asarray(q_emb, dtype="float32").reshape(-1))
+        if abs(float(sims[0] - sims[1])) < self.margin:
+            return None
+        return "yes" if sims[0] > sims[1] else "no"
+
+    def decide(self, question: str) -> Optional[str]:
+        label = rule_route(question)
+        if label is None and self.use_centroids:
+            from ..tools.embed_texts import embed_texts
+            label = self.centroid_route(embed_texts([question])[0])
+        return label
+
+    async def adecide(self, question: str) -> Optional[str]:
+        label = rule_route(question)
+        if label is None and self.use_centroids:
+            from ..tools.embed_texts import aembed_texts
+            label = self.centroid_route((await aembed_texts([question]))[0])
+        return label
+
+
+_pre_router: PreRouter | None = None
+
+def get_pre_router() -> PreRouter:
+    global _pre_router
+    if _pre_router is None:
+        _pre_router = PreRouter()
+    return _pre_router
@@ -1,18 +1,43 @@
-from dotenv import load_dotenv
-load_dotenv()
-
 import os
+import re
+from datetime import datetime
 from typing import Literal, Optional, Dict, Any
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from ..config import OPENAI_API_KEY
+from .extract_finance_info import TICKER_RULES
+from .llm_clients import chat_model
 
 
 # ----------------------------
 # Config
 # ----------------------------
 QUERY_EVAL_MODEL = os.getenv("QUERY_EVAL_MODEL", "gpt-5")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+ROUTER_PROMPT = """You are a router that labels questions as price-related or not.
+            Output 'yes' only if the user explicitly asks for a numeric market price/quote (current or for a specific date)
+            for a financial instrument, commodity (e.g., wheat/corn/gold/silver/oil), index, stock, or ETF. Otherwise output 'no'.
+
+            Examples:
+            Q: What is the price of wheat today?      A: yes
+            Q: Gold price yesterday?                  A: yes
+            Q: Close of ^GSPC on 2024-12-31?          A: yes
+            Q: What is the tariff situation EU–US?    A: no
+            Q: Summarize wheat export bans in 2024.   A: no
+            """
+
+# Appended to ROUTER_PROMPT in combined mode ({today} is filled per call).
+EXTRACT_PROMPT = """
+If (and only if) the answer is 'yes', also fill in the Yahoo Finance lookup:
+- "symbol": the Yahoo Finance ticker
+- "date": the date asked about, in YYYY-MM-DD format
+- "display_name": a short, human-readable name of the ticker (e.g. GC=F → "Gold Futures")
+
+""" + TICKER_RULES + """
+Today's date is {today}.
+For 'no', leave symbol, date and display_name empty.
+"""
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
 
 # ----------------------------
@@ -25,6 +50,16 @@ class QueryEvaluatorOutput(BaseModel):
     )
 
 
+class QueryRouteOutput(BaseModel):
+    """Route plus, for price questions, the Yahoo Finance lookup (combined mode)."""
+    binary_score: Literal["yes", "no"] = Field(
+        description="If the question is related to ticker price, output 'yes' or 'no'"
+    )
+    symbol: Optional[str] = Field(default=None, description="Only for 'yes': Yahoo Finance ticker, e.g. GC=F")
+    date: Optional[str] = Field(default=None, description="Only for 'yes': YYYY-MM-DD")
+    display_name: Optional[str] = Field(default=None, description="Only for 'yes': short name of the ticker")
+
+
 # ----------------------------
 # Service
 # ----------------------------
@@ -43,26 +78,14 @@ class QueryEvaluatorService:
             raise RuntimeError(
                 "OPENAI_API_KEY is missing. Set it in your environment."
             )
-        self.model = ChatOpenAI(
-            model=model_name,
+        self.model = chat_model(
+            model_name,
             reasoning={"effort":"low"},
             api_key=api_key,
             temperature=0,
         )
 
-        sys_msg = system_prompt or (
-            """You are a router that labels questions as price-related or not.
-            Output 'yes' only if the user explicitly asks for a numeric market price/quote (current or for a specific date)
-            for a financial instrument, commodity (e.g., wheat/corn/gold/silver/oil), index, stock, or ETF. Otherwise output 'no'.
-
-            Examples:
-            Q: What is the price of wheat today?      A: yes
-            Q: Gold price yesterday?                  A: yes
-            Q: Close of ^GSPC on 2024-12-31?          A: yes
-            Q: What is the tariff situation EU–US?    A: no
-            Q: Summarize wheat export bans in 2024.   A: no
-            """
-        )
+        sys_msg = system_prompt or ROUTER_PROMPT
 
         self.prompt = ChatPromptTemplate.from_messages(
             [
@@ -88,14 +111,66 @@ class QueryEvaluatorService:
     def score(self, question: str) -> str:
         return self.evaluate(question).binary_score
 
+    async def aevaluate(self, question: str) -> QueryEvaluatorOutput:
+        return await self.chain.ainvoke({"question": question})
+
+    async def ascore(self, question: str) -> str:
+        return (await self.aevaluate(question)).binary_score
+
+
+class QueryRouterExtractorService:
+    """
+    Router and ticker extractor in one call: route(question) -> ('yes'|'no', ticker | None).
+    ticker is {symbol, date, display_name} as FinanceQueryExtractor returns it; None for 'no'
+    or when a field is missing / malformed (extract_ticker then runs as in separate mode).
+    """
+
+    def __init__(
+        self,
+        model_name: str = QUERY_EVAL_MODEL,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        today: Optional[str] = None,
+    ):
+        if not api_key:
+            raise RuntimeError(
+                "OPENAI_API_KEY is missing. Set it in your environment."
+            )
+        # fixed date for tests / replays; otherwise today's date at each call
+        self.today = today
+        self.model = chat_model(
+            model_name,
+            reasoning={"effort":"low"},
+            api_key=api_key,
+            temperature=0,
+        )
+        self.prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", ROUTER_PROMPT + EXTRACT_PROMPT),
+                ("human", "User question: {question}"),
+            ]
+        )
+        self.chain = self.prompt | self.model.with_structured_output(QueryRouteOutput)
+
+    @staticmethod
+    def _split(out: QueryRouteOutput):
+        if out.binary_score != "yes" or not out.symbol or not _ISO_DATE.match(out.date or ""):
+            return out.binary_score, None
+        return "yes", {"symbol": out.symbol, "date": out.date, "display_name": out.display_name or out.symbol}
+
+    def _inputs(self, question: str) -> Dict[str, str]:
+        return {"question": question, "today": self.today or datetime.today().strftime("%Y-%m-%d")}
+
+    def route(self, question: str):
+        return self._split(self.chain.invoke(self._inputs(question)))
 
+    async def aroute(self, question: str):
+        return self._split(await self.chain.ainvoke(self._inputs(question)))
 
 
 # ----------------------------
 # CLI demo
 # ----------------------------
 def _demo():
-    load_dotenv()  # read env if present
     svc = QueryEvaluatorService()
 
     q = "How do I look today?"
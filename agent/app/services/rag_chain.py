@@ -1,21 +1,38 @@
 ### Generate
 import os
-from dotenv import load_dotenv
-
-load_dotenv()  
-from langchain import hub
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
+from langchain_core.prompts import ChatPromptTemplate
+from ..config import OPENAI_API_KEY
+
+RAG_MODEL = os.getenv("RAG_MODEL", "gpt-5")
+
+# Prompt: the LangChain hub's "rlm/rag-prompt", bundled so startup needs no network
+rag_prompt = ChatPromptTemplate.from_messages([(
+    "human",
+    "You are an assistant for question-answering tasks. Use the following pieces of retrieved context "
+    "to answer the question. If you don't know the answer, just say that you don't know. Use three "
+    "sentences maximum and keep the answer concise.\nQuestion: {question} \nContext: {context} \nAnswer:",
+)])
+
+
+def build_rag_chain():
+    """prompt | LLM | text. Built on first use (registry "rag_chain"): importing langchain_openai is slow."""
+    from .llm_clients import chat_model
+
+    # LLM
+    rag_llm = chat_model(
+        RAG_MODEL,
+        api_key=OPENAI_API_KEY,
+        reasoning={"effort": "low"},
+        temperature=0,
+    )
+    # Chain
+    return rag_prompt | rag_llm | StrOutputParser()
 
-# Prompt
-rag_prompt = hub.pull("rlm/rag-prompt")
-# LLM
-rag_llm =  ChatOpenAI(
-                    model="gpt-5", 
-                    api_key=os.getenv("OPENAI_API_KEY"),
-                    reasoning={"effort":"low"},
-                    temperature=0
-)
 
-# Chain
-rag_chain = rag_prompt | rag_llm | StrOutputParser()
+def __getattr__(name):
+    # `from agent.app.services.rag_chain import rag_chain` keeps working, built lazily
+    if name == "rag_chain":
+        from .registry import get_service
+        return get_service("rag_chain")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
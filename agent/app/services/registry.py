@@ -0,0 +1,81 @@
+"""
+Process-wide services, built on first use.
+
+Nodes ask the registry for their service instead of importing the service module: the
+LLM client libraries (langchain_openai / openai, slow to import) are only loaded when the
+first request needs them, so importing the app is fast and needs no network.
+
+    from ..services.registry import get_service
+    grader = get_service("retrieval_evaluator")
+"""
+import threading
+from typing import Any, Callable, Dict, List
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.RLock()  # re-entrant: a factory may get other services
+
+
+def register(name: str, factory: Callable[[], Any]):
+    """Add (or replace) a service factory; an instance already built is dropped."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get_service(name: str) -> Any:
+    inst = _instances.get(name)
+    if inst is None:
+        with _lock:
+            inst = _instances.get(name)
+            if inst is None:
+                if name not in _factories:
+                    raise KeyError(f"unknown service {name!r} (registered: {sorted(_factories)})")
+                inst = _instances[name] = _factories[name]()
+    return inst
+
+
+def reset(*names: str):
+    """Forget built instances (all, or the named ones); they are rebuilt on next use."""
+    with _lock:
+        for name in names or list(_instances):
+            _instances.pop(name, None)
+
+
+def built() -> List[str]:
+    return sorted(_instances)
+
+
+# ----------------------------
+# Services
+# ----------------------------
+def _query_evaluator():
+    from .query_evaluator import QueryEvaluatorService
+    return QueryEvaluatorService()
+
+
+def _query_router_extractor():
+    from .query_evaluator import QueryRouterExtractorService
+    return QueryRouterExtractorService()
+
+
+def _retrieval_evaluator():
+    from .retrieval_evaluator_class import RetrievalEvaluatorService
+    return RetrievalEvaluatorService()
+
+
+def _finance_extractor():
+    from .extract_finance_info import FinanceQueryExtractor
+    return FinanceQueryExtractor()
+
+
+def _rag_chain():
+    from .rag_chain import build_rag_chain
+    return build_rag_chain()
+
+
+register("query_evaluator", _query_evaluator)
+register("query_router_extractor", _query_router_extractor)
+register("retrieval_evaluator", _retrieval_evaluator)
+register("finance_extractor", _finance_extractor)
+register("rag_chain", _rag_chain)
@@ -1,18 +1,15 @@
-from dotenv import load_dotenv
-load_dotenv()
-
 import os
-from typing import Literal, Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any, List
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from ..config import OPENAI_API_KEY, RETRIEVAL_EVAL_MODE, RETRIEVAL_EVAL_CONCURRENCY
+from .llm_clients import chat_model
 
 
 # ----------------------------
 # Config
 # ----------------------------
 DEFAULT_MODEL = os.getenv("RETRIEVAL_EVAL_MODEL", "gpt-4o-mini")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 
 # ----------------------------
@@ -25,6 +22,13 @@ class RetrievalEvaluatorOutput(BaseModel):
     )
 
 
+class RetrievalBatchEvaluatorOutput(BaseModel):
+    """One verdict per document, in the order the documents were given."""
+    binary_scores: List[Literal["yes", "no"]] = Field(
+        description="For each numbered document, in order, 'yes' if relevant to the question, else 'no'"
+    )
+
+
 # ----------------------------
 # Service
 # ----------------------------
@@ -44,8 +48,8 @@ class RetrievalEvaluatorService:
             raise RuntimeError(
                 "OPENAI_API_KEY is missing. Set it in your environment."
             )
-        self.model = ChatOpenAI(
-            model=model_name,
+        self.model = chat_model(
+            model_name,
             api_key=api_key,
             temperature=temperature,
         )
@@ -72,6 +76,16 @@ class RetrievalEvaluatorService:
         # Full runnable chain
         self.chain = self.prompt | self.structured_llm
 
+        # Joint grading: all documents in one call, one verdict each
+        self.joint_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", sys_msg + "\nYou will receive several numbered documents. "
+                 "Grade each one independently and return exactly one score per document, in order."),
+                ("human", "Retrieved documents:\n\n{documents}\n\nUser question: {question}"),
+            ]
+        )
+        self.joint_chain = self.joint_prompt | self.model.with_structured_output(RetrievalBatchEvaluatorOutput)
+
     def evaluate(self, document: str, question: str) -> RetrievalEvaluatorOutput:
         """
         Returns RetrievalEvaluatorOutput with binary_score ∈ {'yes','no'}.
@@ -79,6 +93,74 @@ class RetrievalEvaluatorService:
         """
         return self.chain.invoke({"document": document, "question": question})
 
+    def evaluate_many(
+        self,
+        documents: List[str],
+        question: str,
+        max_concurrency: int = RETRIEVAL_EVAL_CONCURRENCY,
+    ) -> List[str]:
+        """
+        Grade every document with its own call, at most `max_concurrency` in flight.
+        Returns 'yes'/'no' per document, in input order.
+        """
+        if not documents:
+            return []
+        outs = self.chain.batch(
+            [{"document": d, "question": question} for d in documents],
+            config={"max_concurrency": max_concurrency},
+        )
+        return [o.binary_score for o in outs]
+
+    def evaluate_jointly(self, documents: List[str], question: str) -> List[str]:
+        """
+        Grade all documents with a single structured call.
+        Falls back to evaluate_many if the model returns the wrong number of verdicts.
+        """
+        if not documents:
+            return []
+        numbered = "\n\n".join(f"[{i + 1}]\n{d}" for i, d in enumerate(documents))
+        out = self.joint_chain.invoke({"documents": numbered, "question": question})
+        if len(out.binary_scores) != len(documents):
+            print(f"---JOINT GRADING RETURNED {len(out.binary_scores)}/{len(documents)} SCORES, REGRADING---")
+            return self.evaluate_many(documents, question)
+        return list(out.binary_scores)
+
+    def grade(self, documents: List[str], question: str, mode: str = RETRIEVAL_EVAL_MODE) -> List[str]:
+        """'yes'/'no' per document, in input order, using the configured grading mode."""
+        if mode == "joint":
+            return self.evaluate_jointly(documents, question)
+        return self.evaluate_many(documents, question)
+
+    # -- async variants ----------------------------------------------------
+    async def aevaluate_many(
+        self,
+        documents: List[str],
+        question: str,
+        max_concurrency: int = RETRIEVAL_EVAL_CONCURRENCY,
+    ) -> List[str]:
+        if not documents:
+            return []
+        outs = await self.chain.abatch(
+            [{"document": d, "question": question} for d in documents],
+            config={"max_concurrency": max_concurrency},
+        )
+        return [o.binary_score for o in outs]
+
+    async def aevaluate_jointly(self, documents: List[str], question: str) -> List[str]:
+        if not documents:
+            return []
+        numbered = "\n\n".join(f"[{i + 1}]\n{d}" for i, d in enumerate(documents))
+        out = await self.joint_chain.ainvoke({"documents": numbered, "question": question})
+        if len(out.binary_scores) != len(documents):
+            print(f"---JOINT GRADING RETURNED {len(out.binary_scores)}/{len(documents)} SCORES, REGRADING---")
+            return await self.aevaluate_many(documents, question)
+        return list(out.binary_scores)
+
+    async def agrade(self, documents: List[str], question: str, mode: str = RETRIEVAL_EVAL_MODE) -> List[str]:
+        if mode == "joint":
+            return await self.aevaluate_jointly(documents, question)
+        return await self.aevaluate_many(documents, question)
+
     # Optional: convenience that returns plain 'yes'/'no'
     def score(self, document: str, question: str) -> str:
         return self.evaluate(document, question).binary_score
@@ -90,7 +172,6 @@ class RetrievalEvaluatorService:
 # CLI demo
 # ----------------------------
 def _demo():
-    load_dotenv()  # read env if present
     svc = RetrievalEvaluatorService()
 
     doc = "The EU and US discussed tariff de-escalation measures in 2024 around steel and aluminum."
@@ -1,41 +1,51 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()  
-
-
-import json,faiss, numpy as np
-from openai import OpenAI
-from ..tools.embed_texts import embed_texts
-
-# --- Config ---
-EMBED_MODEL = "text-embedding-3-large"  # good quality; or -small for cheaper
-DIM = 3072                               # 3072 for -large, 1536 for -small
-SOURCE_PATH = "/Users/rosydai/Desktop/intern/Agentic-RAG-Demo/newsapi.json"
-META_PATH = "/Users/rosydai/Desktop/intern/Agentic-RAG-Demo/agent/data/vector_store/events_fused.json"
-INDEX_PATH  = "/Users/rosydai/Desktop/intern/Agentic-RAG-Demo/agent/data/vector_store/events.faiss"
-
-
-def retrieve_docs(query: str, k: int = 10):
-    index = faiss.read_index(INDEX_PATH)
-    metas = json.load(open(META_PATH))["metas"]
-    q_emb = embed_texts([query])
-    q_emb = q_emb / (np.linalg.norm(q_emb, axis=1, keepdims=True) + 1e-12)
-
-    sims, ids = index.search(q_emb, k)  # overfetch a bit
-    ids = ids[0].tolist(); sims = sims[0].tolist()
-
-    results = []
-    for i, s in zip(ids, sims):
-        if i < 0: 
-            continue
-        m = metas[i]
-        results.append({"score": float(s), "text": m})
-        if len(results) >= k:
-            break
-    return results
+import asyncio
+import numpy as np
+from typing import List, Optional
+from ..tools.doc_filters import Filters
+from ..config import SEARCH_NPROBE, SEARCH_EF
+from ..tools.embed_texts import embed_texts, aembed_texts
+from .retriever import get_retriever
+
+
+def _normalize(q_emb: np.ndarray) -> np.ndarray:
+    # full-width query vectors; the retriever cuts them to the loaded index's KB_INDEX_DIM
+    # (and re-normalizes) against the same snapshot it searches, so a rebuild at another
+    # width never sees a mismatched query
+    return q_emb / (np.linalg.norm(q_emb, axis=1, keepdims=True) + 1e-12)
+
+def retrieve_docs(query: str, k: int = 10, nprobe: Optional[int] = SEARCH_NPROBE, ef_search: Optional[int] = SEARCH_EF,
+                  filters: Optional[Filters] = None):
+    """
+    filters: {"country", "city", "category", "date_from", "date_to"} applied inside the
+    search (FAISS id selector + masked BM25), so all k results match them.
+    """
+    q_emb = _normalize(embed_texts([query]))
+    # index + BM25 postings stay loaded in the shared retriever (reloaded when rebuilt);
+    # passing the text adds keyword hits (names, tickers, places) to the dense ones
+    return get_retriever().search(q_emb, k, nprobe=nprobe, ef_search=ef_search, query=query, filters=filters)
+
+async def aretrieve_docs(query: str, k: int = 10, nprobe: Optional[int] = SEARCH_NPROBE, ef_search: Optional[int] = SEARCH_EF,
+                         filters: Optional[Filters] = None):
+    q_emb = _normalize(await aembed_texts([query]))
+    # FAISS search is CPU-bound (and releases the GIL): run it in the default thread pool
+    return await asyncio.to_thread(get_retriever().search, q_emb, k, nprobe, ef_search, query, filters)
+
+def retrieve_docs_batch(queries: List[str], k: int = 10, nprobe: Optional[int] = SEARCH_NPROBE,
+                        ef_search: Optional[int] = SEARCH_EF, filters: Optional[List[Optional[Filters]]] = None):
+    """retrieve_docs for many queries: one embedding call, one multi-row FAISS search. One list per query."""
+    if not queries:
+        return []
+    q_embs = _normalize(embed_texts(queries))
+    return get_retriever().search_batch(q_embs, k, nprobe, ef_search, queries, filters)
+
+async def aretrieve_docs_batch(queries: List[str], k: int = 10, nprobe: Optional[int] = SEARCH_NPROBE,
+                               ef_search: Optional[int] = SEARCH_EF, filters: Optional[List[Optional[Filters]]] = None):
+    if not queries:
+        return []
+    q_embs = _normalize(await aembed_texts(queries))
+    return await asyncio.to_thread(get_retriever().search_batch, q_embs, k, nprobe, ef_search, queries, filters)
 
 # query = "What is the capital of France?"
 # res = retrieve_docs(query, 3)
 # for i in res:
-#     print(i)
\ No newline at end of file
+#     print(i)
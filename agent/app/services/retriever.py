@@ -0,0 +1,316 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from ..config import INDEX_PATH, DOCSTORE_PATH, INDEX_MMAP, INDEX_RELOAD_INTERVAL, SEARCH_NPROBE, SEARCH_EF
+from ..config import BM25_PATH, HYBRID_SEARCH, HYBRID_CANDIDATES, RRF_K, FILTERS_PATH, FILTER_EXACT_MAX
+from ..tools.bm25 import BM25Index, rrf_fuse
+from ..tools.doc_filters import FilterIndex, Filters
+from ..tools.doc_store import DocStore
+from ..tools.faiss_index import search_params, id_selector, widest_params, can_reconstruct, truncate
+
+
+# ----------------------------
+# Snapshot
+# ----------------------------
+@dataclass(frozen=True)
+class _Snapshot:
+    """An index and its document store, loaded together and never mutated."""
+    index: Any
+    docs: DocStore  # read-only; texts are read per search, not held in memory
+    bm25: Optional[BM25Index]  # None when the build wrote no BM25 file
+    filters: Optional[FilterIndex]  # None when the build wrote no filter bitmaps
+    signature: Tuple
+    version: int
+
+
+def _file_signature(*paths: str) -> Tuple:
+    sig = []
+    for p in paths:
+        st = os.stat(p)
+        sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _optional_signature(path: Optional[str]) -> Optional[Tuple]:
+    try:
+        return _file_signature(path) if path else None
+    except FileNotFoundError:
+        return None
+
+
+# ----------------------------
+# Service
+# ----------------------------
+class FaissRetriever:
+    """
+    Keeps the FAISS index in memory (and the document store open) across requests.
+
+    Searches always run against an immutable snapshot. When the files on disk
+    change (the builder replaces them atomically), a new snapshot is loaded and
+    swapped in; searches already running keep using the old one.
+    """
+
+    def __init__(
+        self,
+        index_path: str = INDEX_PATH,
+        docstore_path: str = DOCSTORE_PATH,
+        mmap: bool = INDEX_MMAP,
+        reload_interval: float = INDEX_RELOAD_INTERVAL,
+        bm25_path: Optional[str] = BM25_PATH,
+        filters_path: Optional[str] = FILTERS_PATH,
+    ):
+        self.index_path = index_path
+        self.docstore_path = docstore_path
+        self.bm25_path = bm25_path
+        self.filters_path = filters_path
+        self.mmap = mmap
+        self.reload_interval = reload_interval
+        self._snapshot: Optional[_Snapshot] = None
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+
+    # -- loading ---------------------------------------------------------
+    def _signature(self) -> Tuple:
+        return _file_signature(self.index_path, self.docstore_path) + (
+            _optional_signature(self.bm25_path), _optional_signature(self.filters_path))
+
+    def _load(self, version: int) -> _Snapshot:
+        signature = self._signature()
+        flags = (faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY) if self.mmap else 0
+        index = faiss.read_index(self.index_path, flags)
+        docs = DocStore(self.docstore_path, readonly=True)
+        bm25 = BM25Index.load(self.bm25_path) if signature[-2] is not None else None
+        filters = FilterIndex.load(self.filters_path) if signature[-1] is not None else None
+        return _Snapshot(index=index, docs=docs, bm25=bm25, filters=filters, signature=signature, version=version)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load the files again if they changed on disk (or always, with force=True).
+        Returns True if a new snapshot was swapped in.
+        """
+        with self._reload_lock:
+            return self._reload_locked(force)
+
+    def _reload_locked(self, force: bool) -> bool:
+        self._last_check = time.monotonic()
+        current = self._snapshot
+        if current is not None and not force:
+            try:
+                if self._signature() == current.signature:
+                    return False
+            except FileNotFoundError:
+                return False
+        try:
+            snapshot = self._load(current.version + 1 if current else 1)
+        except Exception as e:
+            if current is None:
+                raise
+            # Keep serving the old snapshot; a half-copied file will be retried later.
+            print(f"---INDEX RELOAD FAILED, KEEPING VERSION {current.version}: {e}---")
+            return False
+        self._snapshot = snapshot  # atomic reference swap
+        print(f"---INDEX LOADED: VERSION {snapshot.version}, {snapshot.index.ntotal} VECTORS---")
+        return True
+
+    def snapshot(self) -> _Snapshot:
+        """Return the current snapshot, loading or refreshing it when due."""
+        snap = self._snapshot
+        if snap is None:
+            self.reload()
+            return self._snapshot
+        if self.reload_interval >= 0 and time.monotonic() - self._last_check >= self.reload_interval:
+            # Only one caller checks the files; everyone else carries on with the current snapshot.
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._reload_locked(force=False)
+                finally:
+                    self._reload_lock.release()
+            return self._snapshot
+        return snap
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    # -- search ----------------------------------------------------------
+    def search(
+        self,
+        q_emb: np.ndarray,
+        k: int = 10,
+        nprobe: Optional[int] = SEARCH_NPROBE,
+        ef_search: Optional[int] = SEARCH_EF,
+        query: Optional[str] = None,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        q_emb: (1, DIM) float32 query embedding, L2-normalized; cut to the index's width
+               (KB_INDEX_DIM) and re-normalized here, so full embeddings can be passed.
+        nprobe / ef_search: IVF / HNSW search breadth (ignored by other index types).
+        query: the query text; when given (and a BM25 index is loaded), BM25 hits are
+               fused with the dense hits by reciprocal rank fusion.
+        filters: {"country", "city", "category", "date_from", "date_to"} (see FilterIndex.bitmap);
+               only matching documents are searched, so all k results are eligible.
+        Returns [{"id": int, "score": float | None, "dense": bool, "text": str}, ...] best first;
+        "score" is the cosine similarity (None if the vector could not be read back), "dense"
+        False for keyword-only hits that BM25 found and the dense search did not.
+        """
+        return self.search_batch(q_emb, k, nprobe, ef_search, [query], [filters])[0]
+
+    def search_batch(
+        self,
+        q_embs: np.ndarray,
+        k: int = 10,
+        nprobe: Optional[int] = SEARCH_NPROBE,
+        ef_search: Optional[int] = SEARCH_EF,
+        queries: Optional[List[Optional[str]]] = None,
+        filters: Optional[List[Optional[Filters]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        search() for many queries against one snapshot: q_embs is (n, DIM), queries / filters
+        one per row. Unfiltered rows share a single multi-row index.search and all texts
+        come from one doc-store read. Returns one result list per row, in order.
+        """
+        snap = self.snapshot()
+        if q_embs.shape[1] != snap.index.d:  # Matryoshka-truncated index: same prefix as the build
+            q_embs = truncate(q_embs, snap.index.d)
+        n = len(q_embs)
+        queries = list(queries) if queries is not None else [None] * n
+        filters = list(filters) if filters is not None else [None] * n
+        hybrid = HYBRID_SEARCH and snap.bm25 is not None
+        n_dense = max(k, HYBRID_CANDIDATES) if hybrid and any(q is not None for q in queries) else k
+
+        masks = [self._allowed(snap, f) for f in filters]
+        dense: List[Dict[int, float]] = [{} for _ in range(n)]
+        plain = [i for i, m in enumerate(masks) if m is None]
+        if plain:
+            # per-call SearchParameters: nothing is mutated on the shared index
+            params = search_params(snap.index, nprobe=nprobe, ef_search=ef_search)
+            for i, hits in zip(plain, _dense_many(snap.index, q_embs[plain], n_dense, params)):
+                dense[i] = hits
+
+        rankings: List[List[int]] = []
+        keyword: List[Dict[int, float]] = [{} for _ in range(n)]  # cosines of keyword-only hits
+        for i, mask in enumerate(masks):
+            q_emb = q_embs[i:i + 1]
+            allowed = None
+            if mask is not None:
+                bitmap, allowed = mask
+                if not allowed.any():
+                    rankings.append([])
+                    continue
+                dense[i] = self._dense_filtered(snap, q_emb, n_dense, nprobe, ef_search, bitmap, allowed)
+            if hybrid and queries[i] is not None:
+                sparse = [j for j, _ in snap.bm25.search(queries[i], HYBRID_CANDIDATES, mask=_bm25_mask(snap, allowed))]
+                ranked = rrf_fuse([list(dense[i]), sparse], k, RRF_K)
+                keyword[i] = _cosine(snap.index, q_emb, [j for j in ranked if j not in dense[i]])
+            else:
+                ranked = list(dense[i])
+            rankings.append(ranked)
+
+        # primary-key reads from the doc store, for every row at once
+        texts = snap.docs.texts(sorted({j for ranked in rankings for j in ranked}))
+        out = []
+        for ranked, hits, extra in zip(rankings, dense, keyword):
+            results = []
+            for j in ranked:
+                if j not in texts:
+                    continue
+                results.append({"id": j, "score": hits[j] if j in hits else extra.get(j), "dense": j in hits,
+                                "text": texts[j]})
+                if len(results) >= k:
+                    break
+            out.append(results)
+        return out
+
+    def vectors(self, ids: List[int]) -> Optional[np.ndarray]:
+        """(len(ids), index dims) stored vectors of search results, None if the index cannot return them."""
+        snap = self.snapshot()
+        if not ids or not can_reconstruct(snap.index):
+            return None
+        try:
+            return snap.index.reconstruct_batch(np.array(ids, dtype="int64"))
+        except RuntimeError:  # id gone after a rebuild
+            return None
+
+    @staticmethod
+    def _allowed(snap: _Snapshot, filters: Optional[Filters]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(bitmap, allowed mask) for a filtered search, None for an unfiltered one."""
+        if not filters or not any(filters.values()):
+            return None
+        if snap.filters is None:
+            print("---NO FILTER INDEX (REBUILD THE KNOWLEDGE BASE), SEARCHING UNFILTERED---")
+            return None
+        bitmap = snap.filters.bitmap(filters)
+        if bitmap is None:
+            return None
+        return bitmap, snap.filters.allowed(bitmap)
+
+    @staticmethod
+    def _dense_filtered(snap: _Snapshot, q_emb: np.ndarray, n: int, nprobe, ef_search,
+                        bitmap: np.ndarray, allowed: np.ndarray) -> Dict[int, float]:
+        eligible = np.flatnonzero(allowed)
+        if len(eligible) <= FILTER_EXACT_MAX and can_reconstruct(snap.index):
+            # small subset: score every eligible document exactly, no graph/list traversal
+            vecs = snap.index.reconstruct_batch(eligible.astype("int64"))
+            sims = vecs @ q_emb[0]
+            top = np.argsort(-sims, kind="stable")[:n]
+            return {int(eligible[t]): float(sims[t]) for t in top}
+
+        # IDSelector inside FAISS: non-matching ids are skipped during the search itself
+        sel = id_selector(bitmap, len(allowed))
+        dense = _dense(snap.index, q_emb, n, search_params(snap.index, nprobe=nprobe, ef_search=ef_search, sel=sel))
+        if len(dense) < min(n, len(eligible)):
+            # a selective filter can starve the probed IVF lists / HNSW beam: widen once
+            params = widest_params(snap.index, sel=sel, n_candidates=min(len(eligible), max(8 * n, 512)))
+            dense = _dense(snap.index, q_emb, n, params)
+        return dense
+
+
+def _dense(index, q_emb: np.ndarray, n: int, params) -> Dict[int, float]:
+    """{id: cosine} of the top n, best first."""
+    return _dense_many(index, q_emb, n, params)[0]
+
+
+def _dense_many(index, q_embs: np.ndarray, n: int, params) -> List[Dict[int, float]]:
+    """_dense for every row of q_embs, in one index.search call."""
+    sims, ids = index.search(np.ascontiguousarray(q_embs, dtype="float32"), n, params=params)
+    return [{i: float(s) for i, s in zip(row_ids, row_sims) if i >= 0}
+            for row_ids, row_sims in zip(ids.tolist(), sims.tolist())]
+
+
+def _bm25_mask(snap: _Snapshot, allowed: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """The filter's allowed mask in BM25 row order (None = unfiltered)."""
+    if allowed is None:
+        return None
+    ids = snap.bm25.doc_ids
+    mask = np.zeros(len(ids), dtype=bool)
+    inside = ids < len(allowed)
+    mask[inside] = allowed[ids[inside]]
+    return mask
+
+
+def _cosine(index, q_emb: np.ndarray, ids: List[int]) -> Dict[int, float]:
+    """Similarity of keyword-only hits, from their stored vectors where the index can return them."""
+    if not ids or not can_reconstruct(index):
+        return {}
+    vecs = index.reconstruct_batch(np.array(ids, dtype="int64"))
+    return {i: float(s) for i, s in zip(ids, vecs @ q_emb[0])}
+
+
+_retriever: FaissRetriever | None = None
+_retriever_lock = threading.Lock()
+
+def get_retriever() -> FaissRetriever:
+    """Process-wide retriever shared by all requests."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = FaissRetriever()
+    return _retriever
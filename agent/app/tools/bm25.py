@@ -0,0 +1,116 @@
+import re
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Keeps tickers and symbols whole: ^gspc, gc=f, s&p, u.s.
+_TOKEN = re.compile(r"\^?[a-z0-9]+(?:[=&.\-][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "what which who whom how why when where about event date headline summary location categories news".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Precomputed BM25 inverted index in CSR form:
+      terms    sorted vocabulary (np.str_)
+      indptr   postings of term t are [indptr[t], indptr[t+1])
+      postings document positions (int32), weights their BM25 impact (float32)
+      doc_ids  FAISS id of each document position (int64)
+
+    Impacts (idf * saturated tf) are computed at build time, so a query is a
+    gather over its terms' postings plus one sparse sum.
+    """
+
+    def __init__(self, terms: np.ndarray, indptr: np.ndarray, postings: np.ndarray,
+                 weights: np.ndarray, doc_ids: np.ndarray):
+        self.terms, self.indptr, self.postings, self.weights, self.doc_ids = terms, indptr, postings, weights, doc_ids
+
+    # -- build -----------------------------------------------------------
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, str]], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """docs: (FAISS id, text) pairs."""
+        vocab = {}
+        doc_ids, doc_lens, term_chunks, doc_chunks = [], [], [], []
+        for pos, (fid, text) in enumerate(docs):
+            toks = tokenize(text)
+            doc_ids.append(fid)
+            doc_lens.append(len(toks))
+            if toks:
+                term_chunks.append(np.fromiter((vocab.setdefault(t, len(vocab)) for t in toks), dtype="int64"))
+                doc_chunks.append(np.full(len(toks), pos, dtype="int64"))
+
+        n_docs = len(doc_ids)
+        terms = np.array(sorted(vocab), dtype=str)
+        if not term_chunks:
+            return cls(terms, np.zeros(len(terms) + 1, dtype="int64"), np.zeros(0, dtype="int32"),
+                       np.zeros(0, dtype="float32"), np.array(doc_ids, dtype="int64"))
+
+        # renumber terms in sorted order so lookups can use searchsorted
+        remap = np.empty(len(vocab), dtype="int64")
+        remap[np.fromiter(vocab.values(), dtype="int64")] = np.searchsorted(terms, np.array(list(vocab), dtype=str))
+        t = remap[np.concatenate(term_chunks)]
+        d = np.concatenate(doc_chunks)
+        keys, tf = np.unique(t * n_docs + d, return_counts=True)   # sorted by term, then doc
+        t, d = keys // n_docs, keys % n_docs
+
+        df = np.bincount(t, minlength=len(terms))
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        dl = np.asarray(doc_lens, dtype="float64")
+        avgdl = max(dl.mean(), 1e-9)
+        weights = idf[t] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl[d] / avgdl))
+        indptr = np.concatenate([[0], np.cumsum(df)]).astype("int64")
+        return cls(terms, indptr, d.astype("int32"), weights.astype("float32"), np.array(doc_ids, dtype="int64"))
+
+    # -- persistence -----------------------------------------------------
+    def save(self, path: str):
+        with open(path, "wb") as f:  # file object: np.savez would append ".npz" to a bare path
+            np.savez(f, terms=self.terms, indptr=self.indptr, postings=self.postings,
+                     weights=self.weights, doc_ids=self.doc_ids)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z["terms"], z["indptr"], z["postings"], z["weights"], z["doc_ids"])
+
+    # -- search ----------------------------------------------------------
+    def search(self, query: str, k: int = 10, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k (FAISS id, BM25 score), best first.
+        mask: optional bool array over document positions; False positions are skipped.
+        """
+        q = np.unique(np.array(tokenize(query), dtype=str))
+        if not len(q) or not len(self.terms):
+            return []
+        pos = np.minimum(np.searchsorted(self.terms, q), len(self.terms) - 1)
+        q_terms = pos[self.terms[pos] == q]  # drop out-of-vocabulary words
+        if not len(q_terms):
+            return []
+        spans = [(self.indptr[t], self.indptr[t + 1]) for t in q_terms]
+        docs = np.concatenate([self.postings[s:e] for s, e in spans])
+        w = np.concatenate([self.weights[s:e] for s, e in spans])
+        # one accumulator over all documents: linear in postings, no sort
+        scores = np.bincount(docs, weights=w, minlength=len(self.doc_ids))
+        if mask is not None:
+            scores[~mask] = 0.0
+        n_hits = int(np.count_nonzero(scores))
+        if not n_hits:
+            return []
+        k = min(k, n_hits)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.doc_ids[i]), float(scores[i])) for i in top]
+
+
+def rrf_fuse(rankings: List[List[int]], k: int, rrf_k: int = 60) -> List[int]:
+    """Reciprocal rank fusion: score(d) = sum over rankings of 1 / (rrf_k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[doc] = scores.get(doc, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda d: -scores[d])[:k]
@@ -0,0 +1,136 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+# Facets with one bitmap per distinct value (lower-cased), over the FAISS id space.
+FACETS = ("country", "city", "category")
+
+Filters = Dict[str, Union[str, List[str], None]]
+
+
+def _day(value: Optional[str]) -> int:
+    """Day ordinal of an ISO date ("2025-01-31" or a longer timestamp); 0 if missing/invalid."""
+    try:
+        return date.fromisoformat((value or "")[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def _as_list(value) -> List[str]:
+    if value is None or value == "":
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+class FilterIndex:
+    """
+    Bitmaps over FAISS ids for the structured event fields, built alongside the index:
+      <facet>_values  sorted distinct values (lower-cased)
+      <facet>_bits    one packed bitmap row per value (bit i set = document id i has it)
+      days            event date of each id as a day ordinal (0 = unknown / no document)
+
+    Packed in FAISS's bit order (bit i is byte i >> 3, bit i & 7), so a combined
+    filter can be handed to faiss.IDSelectorBitmap as is. Memory is
+    (distinct values) x (max id / 8) bytes per facet plus 4 bytes per id for dates.
+    """
+
+    def __init__(self, n_ids: int, facets: Dict[str, tuple], days: np.ndarray):
+        self.n_ids, self.facets, self.days = n_ids, facets, days
+
+    # -- build -----------------------------------------------------------
+    @classmethod
+    def build(cls, docs: Iterable[Dict[str, Any]]) -> "FilterIndex":
+        """docs: doc store rows ({"id", "date", "country", "city", "categories", ...})."""
+        ids, days, postings = [], [], {f: {} for f in FACETS}
+        for d in docs:
+            ids.append(d["id"])
+            days.append(_day(d.get("date")))
+            values = {"country": [d.get("country")], "city": [d.get("city")], "category": d.get("categories") or []}
+            for facet in FACETS:
+                for v in values[facet]:
+                    if v:
+                        postings[facet].setdefault(v.lower(), []).append(d["id"])
+
+        n_ids = (max(ids) + 1) if ids else 0
+        day_arr = np.zeros(n_ids, dtype="int32")
+        day_arr[np.array(ids, dtype="int64")] = days
+        facets = {}
+        for facet in FACETS:
+            values = sorted(postings[facet])
+            bits = np.zeros((len(values), (n_ids + 7) // 8), dtype="uint8")
+            for row, v in enumerate(values):
+                mask = np.zeros(n_ids, dtype=bool)
+                mask[np.array(postings[facet][v], dtype="int64")] = True
+                bits[row] = np.packbits(mask, bitorder="little")
+            facets[facet] = (np.array(values, dtype=str), bits)
+        return cls(n_ids, facets, day_arr)
+
+    # -- persistence -----------------------------------------------------
+    def save(self, path: str):
+        arrays = {"n_ids": np.array(self.n_ids), "days": self.days}
+        for facet, (values, bits) in self.facets.items():
+            arrays[f"{facet}_values"], arrays[f"{facet}_bits"] = values, bits
+        with open(path, "wb") as f:  # file object: np.savez would append ".npz" to a bare path
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FilterIndex":
+        with np.load(path, allow_pickle=False) as z:
+            facets = {f: (z[f"{f}_values"], z[f"{f}_bits"]) for f in FACETS}
+            return cls(int(z["n_ids"]), facets, z["days"])
+
+    # -- query -----------------------------------------------------------
+    def _facet_bits(self, facet: str, wanted: List[str]) -> np.ndarray:
+        """OR of the bitmaps of the wanted values; categories also match their sub-categories."""
+        values, bits = self.facets[facet]
+        rows = []
+        for w in wanted:
+            w = w.lower()
+            lo = np.searchsorted(values, w)
+            if lo < len(values) and values[lo] == w:
+                rows.append(lo)
+            if facet == "category":  # "news/Business" also selects "news/Business/..."
+                prefix = w + "/"
+                lo = np.searchsorted(values, prefix)
+                hi = np.searchsorted(values, prefix + "\uffff")
+                rows.extend(range(lo, hi))
+        if not rows:
+            return np.zeros((self.n_ids + 7) // 8, dtype="uint8")
+        return np.bitwise_or.reduce(bits[rows], axis=0)
+
+    def bitmap(self, filters: Optional[Filters]) -> Optional[np.ndarray]:
+        """
+        Packed bitmap of the ids matching `filters`, or None when nothing is filtered.
+
+        filters: {"country": str | [str], "city": ..., "category": ...,
+                  "date_from": "YYYY-MM-DD", "date_to": "YYYY-MM-DD"}
+        Values within a field are OR-ed, fields are AND-ed; the date range is inclusive.
+        """
+        filters = filters or {}
+        unknown = set(filters) - set(FACETS) - {"date_from", "date_to"}
+        if unknown:
+            raise ValueError(f"unknown filter field(s): {sorted(unknown)}")
+        out = None
+        for facet in FACETS:
+            wanted = _as_list(filters.get(facet))
+            if wanted:
+                b = self._facet_bits(facet, wanted)
+                out = b if out is None else out & b
+        lo, hi = _day(filters.get("date_from")), _day(filters.get("date_to"))
+        for key, day in (("date_from", lo), ("date_to", hi)):
+            if filters.get(key) and not day:
+                raise ValueError(f"{key} must be an ISO date (YYYY-MM-DD), got {filters[key]!r}")
+        if lo or hi:
+            in_range = self.days > 0
+            if lo:
+                in_range &= self.days >= lo
+            if hi:
+                in_range &= self.days <= hi
+            b = np.packbits(in_range, bitorder="little")
+            out = b if out is None else out & b
+        return out
+
+    def allowed(self, bitmap: np.ndarray) -> np.ndarray:
+        """Bool mask over ids (length n_ids) from a packed bitmap."""
+        return np.unpackbits(bitmap, count=self.n_ids, bitorder="little").astype(bool)
@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,            -- FAISS id
+    event_id TEXT NOT NULL UNIQUE,     -- id in the source data
+    hash TEXT NOT NULL,                -- sha256 of the fused text
+    text TEXT NOT NULL,                -- fused text (what is embedded and shown to the LLM)
+    title TEXT, date TEXT, country TEXT, city TEXT,
+    categories TEXT                    -- JSON list
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_FIELDS = ("id", "event_id", "text", "title", "date", "country", "city", "categories")
+
+
+class DocStore:
+    """
+    SQLite store of fused event texts and their structured fields, keyed by FAISS id.
+
+    Only the rows asked for are read, so resident memory does not grow with the corpus
+    and fetching the top-k documents is one primary-key lookup per id. The builder also
+    keeps its incremental-build state here (event id -> FAISS id + content hash, next id).
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        if readonly:
+            # opened once: after the builder swaps in a new file, this connection keeps
+            # reading the old one, which is what an in-flight snapshot needs
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            self._db.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    # -- reads -----------------------------------------------------------
+    def get_many(self, ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """{id: {"id", "event_id", "text", "title", "date", "country", "city", "categories"}}"""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM docs WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        out = {}
+        for row in rows:
+            doc = dict(zip(_FIELDS, row))
+            doc["categories"] = json.loads(doc["categories"] or "[]")
+            out[doc["id"]] = doc
+        return out
+
+    def texts(self, ids: Sequence[int]) -> Dict[int, str]:
+        return {i: d["text"] for i, d in self.get_many(ids).items()}
+
+    def iter_docs(self, batch_size: int = 1000) -> Iterable[Dict[str, Any]]:
+        """All documents in id order, fetched `batch_size` rows at a time."""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT {', '.join(_FIELDS)} FROM docs WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                doc = dict(zip(_FIELDS, row))
+                doc["categories"] = json.loads(doc["categories"] or "[]")
+                yield doc
+            last = rows[-1][0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    # -- builder ---------------------------------------------------------
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._db.commit()
+
+    def entries(self, event_ids: Sequence[str]) -> Dict[str, Tuple[int, str]]:
+        """{event_id: (faiss id, content hash)} for the event ids already stored."""
+        out = {}
+        with self._lock:
+            for j in range(0, len(event_ids), 500):  # stay under SQLite's variable limit
+                chunk = list(event_ids[j:j + 500])
+                rows = self._db.execute(
+                    f"SELECT event_id, id, hash FROM docs WHERE event_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                out.update({eid: (fid, h) for eid, fid, h in rows})
+        return out
+
+    def upsert(self, docs: List[Dict[str, Any]]):
+        """docs: {"id", "event_id", "hash", "text", "title", "date", "country", "city", "categories"}"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO docs (id, event_id, hash, text, title, date, country, city, categories)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (d["id"], d["event_id"], d["hash"], d["text"], d.get("title"), d.get("date"),
+                     d.get("country"), d.get("city"), json.dumps(d.get("categories") or []))
+                    for d in docs
+                ],
+            )
+            self._db.commit()
+
+    def mark_seen(self, event_ids: Iterable[str]):
+        """Record event ids present in the current source (kept in a temp table, not in Python)."""
+        with self._lock:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (event_id TEXT PRIMARY KEY)")
+            self._db.executemany("INSERT OR IGNORE INTO seen (event_id) VALUES (?)", [(e,) for e in event_ids])
+
+    def delete_unseen(self) -> List[int]:
+        """Delete documents whose event id was not marked seen; returns their FAISS ids."""
+        with self._lock:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (event_id TEXT PRIMARY KEY)")
+            ids = [r[0] for r in self._db.execute(
+                "SELECT id FROM docs WHERE event_id NOT IN (SELECT event_id FROM seen)"
+            ).fetchall()]
+            self._db.execute("DELETE FROM docs WHERE event_id NOT IN (SELECT event_id FROM seen)")
+            self._db.execute("DROP TABLE seen")
+            self._db.commit()
+        return ids
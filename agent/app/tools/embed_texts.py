@@ -1,26 +1,125 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
+import asyncio
+import random
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
-from openai import OpenAI
-
-# --- Config ---
-EMBED_MODEL = "text-embedding-3-large"  # good quality; or -small for cheaper
-DIM = 3072                               # 3072 for -large, 1536 for -small
-SOURCE_PATH = "/Users/rosydai/Desktop/intern/Agentic-RAG-Demo/newsapi.json"
-INDEX_PATH = "vector_store/events.faiss"
-META_PATH  = "vector_store/events_fused.json"
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def embed_texts(texts: List[str]) -> np.ndarray:
-    # chunk in batches to be safe
-    out = []
-    for i in range(0, len(texts), 128):
-        chunk = texts[i:i+128]
-        resp = client.embeddings.create(model=EMBED_MODEL, input=chunk)
-        out.extend([d.embedding for d in resp.data])
-    return np.array(out, dtype="float32")
\ No newline at end of file
+
+from ..config import EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_MAX_RETRIES, OPENAI_API_KEY
+from .embedding_cache import get_embedding_cache, normalize_text
+from .singleflight import SingleFlight
+from ..metrics import observe, record_usage
+
+# OpenAI clients on the shared connection pool, created on first use (importing openai is
+# slow); tests may assign their own.
+client = None
+aclient = None
+
+# identical misses in flight at once (a burst of the same question) share one request
+_flight = SingleFlight("embedding")
+
+def _client():
+    global client
+    if client is None:
+        from ..services.llm_clients import openai_client
+        client = openai_client(OPENAI_API_KEY)
+    return client
+
+def _aclient():
+    global aclient
+    if aclient is None:
+        from ..services.llm_clients import async_openai_client
+        aclient = async_openai_client(OPENAI_API_KEY)
+    return aclient
+
+def _retryable(e: Exception) -> bool:
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return isinstance(e, (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError))
+
+def _backoff(attempt: int) -> float:
+    # exponential with full jitter: 0.5s, 1s, 2s, ... capped at 30s
+    return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+def _embed_batch(chunk: List[str]) -> List[List[float]]:
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            with observe("embedding", EMBED_MODEL):
+                resp = _client().embeddings.create(model=EMBED_MODEL, input=chunk)
+            record_usage("embedding", EMBED_MODEL, resp.usage.prompt_tokens)
+            return [d.embedding for d in resp.data]
+        except Exception as e:
+            if not _retryable(e) or attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            print(f"---EMBEDDING BATCH FAILED ({type(e).__name__}), RETRY IN {delay:.1f}s---")
+            time.sleep(delay)
+
+async def _aembed_batch(chunk: List[str]) -> List[List[float]]:
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            with observe("embedding", EMBED_MODEL):
+                resp = await _aclient().embeddings.create(model=EMBED_MODEL, input=chunk)
+            record_usage("embedding", EMBED_MODEL, resp.usage.prompt_tokens)
+            return [d.embedding for d in resp.data]
+        except Exception as e:
+            if not _retryable(e) or attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            print(f"---EMBEDDING BATCH FAILED ({type(e).__name__}), RETRY IN {delay:.1f}s---")
+            await asyncio.sleep(delay)
+
+def _embed_uncached(texts: List[str], max_concurrency: int = 1) -> np.ndarray:
+    # chunk in batches to be safe; up to `max_concurrency` batches in flight
+    chunks = [texts[i:i+EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    if max_concurrency > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as pool:
+            results = list(pool.map(_embed_batch, chunks))  # map keeps input order
+    else:
+        results = [_embed_batch(c) for c in chunks]
+    return np.array([v for r in results for v in r], dtype="float32")
+
+async def _aembed_uncached(texts: List[str], max_concurrency: int = 1) -> np.ndarray:
+    chunks = [texts[i:i+EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(chunk):
+        async with sem:
+            return await _aembed_batch(chunk)
+
+    results = await asyncio.gather(*(run(c) for c in chunks))
+    return np.array([v for r in results for v in r], dtype="float32")
+
+def embed_texts(texts: List[str], max_concurrency: int = 1) -> np.ndarray:
+    """
+    Embed texts, serving repeats from the embedding cache and only sending misses to OpenAI.
+    Misses go out in EMBED_BATCH_SIZE batches, `max_concurrency` at a time, with retry + backoff.
+    """
+    cache = get_embedding_cache()
+    vecs = cache.get_many(EMBED_MODEL, texts)
+    # one request per distinct (normalized) text, even if it repeats within the batch
+    missing = {normalize_text(t): t for t, v in zip(texts, vecs) if v is None}
+    if missing:
+        def fetch():
+            fresh = _embed_uncached(list(missing.values()), max_concurrency)
+            cache.put_many(EMBED_MODEL, list(missing.values()), fresh)
+            return fresh
+        fresh = _flight.do((EMBED_MODEL, tuple(missing)), fetch)
+        by_norm = dict(zip(missing, fresh))
+        vecs = [v if v is not None else by_norm[normalize_text(t)] for t, v in zip(texts, vecs)]
+    return np.array(vecs, dtype="float32")
+
+async def aembed_texts(texts: List[str], max_concurrency: int = 1) -> np.ndarray:
+    """Async embed_texts: same cache, non-blocking OpenAI call for the misses."""
+    cache = get_embedding_cache()
+    # the cache's disk level is SQLite: keep its I/O off the event loop
+    vecs = await asyncio.to_thread(cache.get_many, EMBED_MODEL, texts)
+    missing = {normalize_text(t): t for t, v in zip(texts, vecs) if v is None}
+    if missing:
+        async def fetch():
+            fresh = await _aembed_uncached(list(missing.values()), max_concurrency)
+            await asyncio.to_thread(cache.put_many, EMBED_MODEL, list(missing.values()), fresh)
+            return fresh
+        fresh = await _flight.ado((EMBED_MODEL, tuple(missing)), fetch)
+        by_norm = dict(zip(missing, fresh))
+        vecs = [v if v is not None else by_norm[normalize_text(t)] for t, v in zip(texts, vecs)]
+    return np.array(vecs, dtype="float32")
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import EMBED_CACHE_PATH, EMBED_CACHE_MEMORY_ITEMS, EMBED_CACHE_DISK_ITEMS
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivially different inputs share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-level cache for embedding vectors:
+      1. in-memory LRU (OrderedDict), bounded by `max_memory_items`
+      2. on-disk SQLite store, bounded by `max_disk_items`, least-recently-used evicted
+
+    Keys are sha256(model + normalized text), so switching models never returns stale vectors.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = EMBED_CACHE_PATH,
+        max_memory_items: int = EMBED_CACHE_MEMORY_ITEMS,
+        max_disk_items: int = EMBED_CACHE_DISK_ITEMS,
+    ):
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL,"
+                " vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+            self._db.commit()
+        # rows on disk, counted once here and kept up to date by put_many / eviction
+        # (no COUNT(*) table scan per write)
+        self._disk_items = 0
+        if self._db is not None:
+            self._disk_items = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # -- memory level ----------------------------------------------------
+    def _mem_put(self, key: str, vec: np.ndarray):
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_memory_items:
+            self._mem.popitem(last=False)
+
+    # -- public API ------------------------------------------------------
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return one vector per text, or None where neither level has it."""
+        keys = [cache_key(model, t) for t in texts]
+        out: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._lock:
+            pending: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vec = self._mem.get(key)
+                if vec is not None:
+                    self._mem.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    out[i] = vec
+                else:
+                    pending.setdefault(key, []).append(i)
+
+            if pending and self._db is not None:
+                found = {}
+                pending_keys = list(pending)
+                for j in range(0, len(pending_keys), 500):  # stay under SQLite's variable limit
+                    chunk = pending_keys[j:j + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    found.update(rows)
+                if found:
+                    now = time.time()
+                    self._db.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found]
+                    )
+                    self._db.commit()
+                for key, blob in found.items():
+                    vec = np.frombuffer(blob, dtype="float32")
+                    self._mem_put(key, vec)
+                    for i in pending.pop(key):
+                        out[i] = vec
+                        self._counts["disk_hits"] += 1
+
+            self._counts["misses"] += sum(len(v) for v in pending.values())
+        return out
+
+    def _existing(self, keys: List[str]) -> set:
+        found = set()
+        for j in range(0, len(keys), 500):  # stay under SQLite's variable limit
+            chunk = keys[j:j + 500]
+            found.update(k for (k,) in self._db.execute(
+                f"SELECT key FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: np.ndarray):
+        keys = [cache_key(model, t) for t in texts]
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._lock:
+            for key, vec in zip(keys, vectors):
+                self._mem_put(key, vec)
+            if self._db is None:
+                return
+            rows = {key: vec for key, vec in zip(keys, vectors)}  # last vector per key
+            new = len(rows) - len(self._existing(list(rows)))
+            now = time.time()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(key, model, vec.tobytes(), now) for key, vec in rows.items()],
+            )
+            self._disk_items += new
+            if self._disk_items > self.max_disk_items:
+                # least recently used first, through the last_used index
+                cur = self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (self._disk_items - self.max_disk_items,),
+                )
+                self._disk_items -= cur.rowcount
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counts)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            stats["memory_items"] = len(self._mem)
+            stats["disk_items"] = self._disk_items
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._disk_items = 0
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide embedding cache shared by retrieval and the KB builder."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
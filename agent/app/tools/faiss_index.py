@@ -0,0 +1,124 @@
+from typing import Iterable, Optional
+
+import faiss
+import numpy as np
+
+
+def make_index(dim: int, factory: str = "Flat"):
+    """
+    Empty inner-product index with explicit int64 ids, from a FAISS factory string
+    ("Flat", "HNSW32", "IVF1024,Flat", "IVF1024,PQ64", ...). Compressed storage:
+    "SQfp16" (2 bytes / dim), "SQ8" (1 byte / dim), "PQ64" (64 bytes / vector).
+    Vectors are L2-normalized upstream, so inner product == cosine.
+
+    IVF indexes keep the ids in their inverted lists (native add_with_ids / remove_ids);
+    everything else is wrapped in IDMap2. An IDMap2 around IVF must not be used: its
+    remove_ids compacts the id map but not the IVF's sequential labels, so every label
+    after a removed one resolves to the wrong id.
+    """
+    index = faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT)
+    if isinstance(inner_index(index), faiss.IndexIVF):
+        return index
+    return faiss.index_factory(dim, f"IDMap2,{factory}", faiss.METRIC_INNER_PRODUCT)
+
+
+def idmap_over_ivf(index) -> bool:
+    """The broken IDMap2-over-IVF layout of earlier builds (see make_index): rebuild those."""
+    return (isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2))
+            and isinstance(inner_index(index), faiss.IndexIVF))
+
+
+def truncate(vecs: np.ndarray, dim: int) -> np.ndarray:
+    """
+    First `dim` components of each row, L2-normalized again (Matryoshka truncation:
+    text-embedding-3 vectors keep most of their ranking quality in a prefix).
+    Rows already `dim` wide are only normalized.
+    """
+    vecs = np.asarray(vecs, dtype="float32")[:, :dim]
+    return vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
+
+
+def inner_index(index):
+    """The index behind an IDMap/IDMap2 wrapper, downcast to its concrete type."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None, sel=None):
+    """
+    SearchParameters for this index type, or None when nothing applies.
+    sel: optional faiss.IDSelector; only ids it accepts are returned (see id_selector).
+    """
+    inner = inner_index(index)
+    if isinstance(inner, faiss.IndexIVF) and (nprobe or sel is not None):
+        params = faiss.SearchParametersIVF(nprobe=nprobe or inner.nprobe)
+    elif isinstance(inner, faiss.IndexHNSW) and (ef_search or sel is not None):
+        params = faiss.SearchParametersHNSW(efSearch=ef_search or inner.hnsw.efSearch)
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if sel is not None:
+        params.sel = sel
+        params.referenced_objects = [sel]  # keep the selector alive as long as the params
+    return params
+
+
+def id_selector(bitmap: np.ndarray, n_ids: int):
+    """IDSelector over a packed little-endian bitmap (bit i set = id i allowed)."""
+    bitmap = np.ascontiguousarray(bitmap, dtype="uint8")
+    sel = faiss.IDSelectorBitmap(n_ids, faiss.swig_ptr(bitmap))
+    sel.referenced_objects = [bitmap]  # FAISS only keeps a pointer to the bits
+    return sel
+
+
+def widest_params(index, sel=None, n_candidates: int = 0):
+    """
+    Search parameters that visit (nearly) everything: all IVF lists, or an HNSW beam of
+    `n_candidates`. Used to top up a filtered search that came back short of k.
+    """
+    inner = inner_index(index)
+    if isinstance(inner, faiss.IndexIVF):
+        return search_params(index, nprobe=inner.nlist, sel=sel)
+    if isinstance(inner, faiss.IndexHNSW):
+        return search_params(index, ef_search=max(n_candidates, inner.hnsw.efSearch), sel=sel)
+    return search_params(index, sel=sel)
+
+
+def can_reconstruct(index) -> bool:
+    # IVF indexes keep no id -> vector map
+    return not isinstance(inner_index(index), faiss.IndexIVF)
+
+
+def supports_remove(index) -> bool:
+    # HNSW graphs cannot delete nodes; everything else we build can
+    return not isinstance(inner_index(index), faiss.IndexHNSW)
+
+
+def index_ids(index) -> np.ndarray:
+    """Every stored id (IDMap2: its id map; IVF: the ids in its inverted lists)."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.vector_to_array(index.id_map)
+    invlists = inner_index(index).invlists
+    sizes = [invlists.list_size(l) for l in range(invlists.nlist)]
+    return np.concatenate([np.array(faiss.rev_swig_ptr(invlists.get_ids(l), n), dtype="int64")
+                           for l, n in enumerate(sizes) if n] or [np.empty(0, dtype="int64")])
+
+
+def compact(index, factory: str, drop_ids: Iterable[int] = ()):
+    """
+    Rebuild `index` without `drop_ids`, keeping the most recently added vector for any
+    id added more than once. Used for index types that cannot remove ids (HNSW).
+    """
+    drop = np.fromiter(drop_ids, dtype="int64")
+    ids = np.unique(index_ids(index))
+    ids = ids[~np.isin(ids, drop)]
+    fresh = make_index(index.d, factory)
+    if len(ids) == 0:
+        return fresh
+    vecs = np.vstack([index.reconstruct(int(i)) for i in ids]).astype("float32")
+    if not fresh.is_trained:
+        fresh.train(vecs)
+    fresh.add_with_ids(vecs, ids)
+    return fresh
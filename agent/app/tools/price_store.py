@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import PRICE_STORE_PATH, PRICE_STORE_TODAY_TTL, PRICE_STORE_FETCH_DAYS
+from ..metrics import observe
+
+
+def yfinance_downloader(symbol: str, start: date, end: date):
+    """Daily OHLC bars in [start, end) as a pandas DataFrame (yfinance layout)."""
+    import yfinance as yf
+    return yf.Ticker(symbol).history(interval="1d", start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"))
+
+
+class PriceStore:
+    """
+    Local SQLite store of daily OHLC bars, filled from Yahoo Finance on demand.
+
+    - Past dates never change: once a range has been fetched (and returned bars), any
+      date inside it is answered locally (a missing bar there means no trading that day).
+    - A miss fetches a wide range around the date in one call.
+    - Today's bar is refetched when older than `today_ttl` seconds. It is stored as
+      provisional (final = 0) and, once its date is past, fetched again like a miss, so an
+      intraday value is never served as the close.
+
+    The lock only guards SQLite; downloads run outside it, so a slow call for one symbol
+    does not hold up others (identical lookups are coalesced by yahoo_finance_api).
+
+    `downloader(symbol, start, end)` must return a DataFrame indexed by timestamp with
+    Open/High/Low/Close/Volume columns; pass a stub to test without the network.
+    """
+
+    def __init__(
+        self,
+        path: str = PRICE_STORE_PATH,
+        downloader: Callable[[str, date, date], Any] = yfinance_downloader,
+        today_ttl: float = PRICE_STORE_TODAY_TTL,
+        fetch_days: int = PRICE_STORE_FETCH_DAYS,
+        today: Callable[[], date] = lambda: datetime.today().date(),
+    ):
+        self.downloader = downloader
+        self.today_ttl = today_ttl
+        self.fetch_days = fetch_days
+        self.today = today
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL, date TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                asof TEXT, fetched_at REAL NOT NULL, final INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (symbol, date)
+            );
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS coverage_symbol ON coverage(symbol, start);
+            """
+        )
+        if "final" not in {row[1] for row in self._db.execute("PRAGMA table_info(bars)")}:
+            # older stores: their bars may be intraday values, refetch each one once
+            self._db.execute("ALTER TABLE bars ADD COLUMN final INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+
+    # -- storage (callers hold self._lock) -------------------------------
+    def _lookup(self, symbol: str, day: date) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT date, open, high, low, close, volume, asof, fetched_at, final FROM bars"
+            " WHERE symbol = ? AND date = ?",
+            (symbol, day.isoformat()),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("date", "open", "high", "low", "close", "volume", "asof", "fetched_at", "final")
+        return dict(zip(keys, row))
+
+    def _covered(self, symbol: str, day: date) -> bool:
+        d = day.isoformat()
+        return self._db.execute(
+            "SELECT 1 FROM coverage WHERE symbol = ? AND start <= ? AND end > ? LIMIT 1", (symbol, d, d)
+        ).fetchone() is not None
+
+    def _write(self, symbol: str, rows: List[Tuple], start: date, end: date, final: bool):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO bars (symbol, date, open, high, low, close, volume, asof, fetched_at, final)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [row + (int(final),) for row in rows],
+        )
+        if final and rows:
+            # an empty answer is often a transient error / rate limit: leave the range
+            # uncovered so the next lookup retries instead of trusting "no trading"
+            self._db.execute(
+                "INSERT INTO coverage (symbol, start, end) VALUES (?, ?, ?)",
+                (symbol, start.isoformat(), end.isoformat()),
+            )
+        self._db.commit()
+
+    # -- network (no lock held) ------------------------------------------
+    def _download(self, symbol: str, start: date, end: date) -> List[Tuple]:
+        with observe("yfinance", "history"):
+            df = self.downloader(symbol, start, end)
+        now = time.time()
+        rows = []
+        if df is not None and not df.empty:
+            for ts, bar in df.iterrows():
+                rows.append((
+                    symbol, ts.date().isoformat(),
+                    float(bar["Open"]), float(bar["High"]), float(bar["Low"]), float(bar["Close"]),
+                    float(bar.get("Volume", 0.0) or 0.0), ts.isoformat(), now,
+                ))
+        return rows
+
+    # -- public API ------------------------------------------------------
+    def get_bar(self, symbol: str, day: date) -> Optional[Dict[str, Any]]:
+        """The daily bar for `symbol` on `day`, or None if there was no trading."""
+        today = self.today()
+        if day >= today:
+            with self._lock:
+                bar = self._lookup(symbol, today)
+            if bar is None or time.time() - bar["fetched_at"] > self.today_ttl:
+                # today's bar is provisional and its range stays uncovered: re-checked after the TTL
+                rows = self._download(symbol, today, today + timedelta(days=1))
+                with self._lock:
+                    self._write(symbol, rows, today, today + timedelta(days=1), final=False)
+                    bar = self._lookup(symbol, today)
+            return bar
+
+        with self._lock:
+            bar = self._lookup(symbol, day)
+            if bar is not None and bar["final"]:
+                return bar
+            if bar is None and self._covered(symbol, day):
+                return None
+        # a miss, or an intraday bar stored while `day` was today: past dates are final,
+        # pull a wide window once, stopping before today's open bar
+        start = day - timedelta(days=self.fetch_days)
+        end = min(day + timedelta(days=30), today)
+        rows = self._download(symbol, start, end)
+        with self._lock:
+            self._write(symbol, rows, start, end, final=True)
+            return self._lookup(symbol, day)
+
+
+_store: PriceStore | None = None
+_store_lock = threading.Lock()
+
+def get_price_store() -> PriceStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceStore()
+    return _store
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from ..metrics import SINGLEFLIGHT
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls: while a call for `key` is running, further calls
+    with the same key wait for it and get its result (or its exception) instead of
+    running again. Nothing is kept once the call finishes; this is not a cache.
+
+    do(key, fn)    blocking callers, across threads
+    ado(key, fn)   coroutines on one event loop; the call runs as its own task, so a caller
+                   that is cancelled (client gone) does not cancel it for the others
+    Callers share the result object: treat it as read-only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    # -- threads -------------------------------------------------------------
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        SINGLEFLIGHT.inc(group=self.name, role="led" if leader else "shared")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    # -- asyncio -------------------------------------------------------------
+    def ashare(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple["asyncio.Task[T]", bool]:
+        """
+        (task, leader): the running task for `key`, started from fn() if there was none
+        (leader=True). Await it through asyncio.shield.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        leader = task is None or task.get_loop() is not loop
+        if leader:
+            task = loop.create_task(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t, key=key: self._finished(key, t))
+        SINGLEFLIGHT.inc(group=self.name, role="led" if leader else "shared")
+        return task, leader
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task, _ = self.ashare(key, fn)
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here too, in case every caller went away
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._tasks)
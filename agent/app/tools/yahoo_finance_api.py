@@ -1,8 +1,11 @@
-import yfinance as yf
-import pandas as pd
 from datetime import datetime, timedelta, date
 import time
 
+from .price_store import get_price_store
+from .singleflight import SingleFlight
+
+# identical (ticker, date) lookups in flight at once share one store lookup / download
+_flight = SingleFlight("price")
 
 
 def _to_date(d):
@@ -29,21 +32,15 @@ def get_yahoo_finance_price(ticker, retrieved_date, ticker_name=None):
         return {"error": f"{retrieved_date} is a weekend, no data available"}
     else:
         d = _to_date(retrieved_date)
-        ticker_data = yf.Ticker(ticker)
-        start = d
-        end = start + timedelta(days=1)  # exclusive end -> fetch only that calendar day
-        df = ticker_data.history(interval="1d", start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"))
-        # print(f"Trying date {start} (requested {d}), data:\n{df}")
-        if not df.empty:
-            # daily bar -> use Close of the first/only row
-            close = df["Close"].iloc[0]
-            ts = df.index[0]
+        # served from the local OHLC store; only misses (and a stale today's bar) hit Yahoo
+        bar = _flight.do((ticker, d), lambda: get_price_store().get_bar(ticker, d))
+        if bar is not None:
             return {
                 "source": "yahoo_finance",
                 "ticker": ticker,
-                "price": float(close),
+                "price": float(bar["close"]),
                 "currency": "USD",
-                "asof": ts.isoformat(),
+                "asof": bar["asof"],
                 "display_name": ticker_name if ticker_name else "None",
             }
 
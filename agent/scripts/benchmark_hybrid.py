@@ -0,0 +1,89 @@
+"""
+Known-item recall benchmark: dense vs BM25 vs hybrid (RRF) retrieval on the built knowledge base.
+
+    python -m agent.scripts.benchmark_hybrid
+    python -m agent.scripts.benchmark_hybrid --n 500 --k 5 --queries entities
+
+Each query is derived from one stored event's headline and the event itself is the
+item to find: "headline" uses the headline as is, "entities" keeps only its names,
+tickers and numbers (capitalized / digit tokens), the kind of query dense search
+tends to blur. Recall@k counts queries whose event is in the top k; MRR is the mean
+reciprocal rank of that event. Query embeddings go through embed_texts, so repeated
+runs are served from the embedding cache.
+"""
+import argparse
+import random
+import re
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from agent.app.config import HYBRID_CANDIDATES, RRF_K
+from agent.app.services.retriever import get_retriever
+from agent.app.tools.bm25 import rrf_fuse
+from agent.app.tools.embed_texts import embed_texts
+from agent.app.tools.faiss_index import truncate
+
+_ENTITY = re.compile(r"\b(?:[A-Z][\w&.\-]*|\^?[A-Z0-9=.\-]*\d[\w=.\-]*)")
+
+
+def entities(headline: str) -> str:
+    return " ".join(_ENTITY.findall(headline))
+
+
+def _rank(found: List[int], target: int, k: int) -> Optional[int]:
+    return found.index(target) + 1 if target in found[:k] else None
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=200, help="events sampled as queries")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", choices=["headline", "entities"], default="headline")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    snap = get_retriever().snapshot()
+    if snap.bm25 is None:
+        raise SystemExit("No BM25 index found: rebuild the knowledge base first.")
+    docs = [d for d in snap.docs.iter_docs() if d["title"]]
+    random.Random(args.seed).shuffle(docs)
+    items = []
+    for d in docs:
+        q = d["title"] if args.queries == "headline" else entities(d["title"])
+        if q:
+            items.append((q, d["id"]))
+        if len(items) >= args.n:
+            break
+
+    q_embs = truncate(embed_texts([q for q, _ in items]), snap.index.d)  # index may be KB_INDEX_DIM wide
+    n = max(args.k, HYBRID_CANDIDATES)
+    ranks = {"dense": [], "bm25": [], "hybrid": []}
+    lat = {"dense": [], "bm25": []}
+    for (q, target), q_emb in zip(items, q_embs):
+        t0 = time.perf_counter()
+        _, ids = snap.index.search(q_emb[None, :], n)
+        lat["dense"].append(time.perf_counter() - t0)
+        dense = [i for i in ids[0].tolist() if i >= 0]
+        t0 = time.perf_counter()
+        sparse = [i for i, _ in snap.bm25.search(q, HYBRID_CANDIDATES)]
+        lat["bm25"].append(time.perf_counter() - t0)
+        hybrid = rrf_fuse([dense, sparse], args.k, RRF_K)
+        for name, found in (("dense", dense), ("bm25", sparse), ("hybrid", hybrid)):
+            ranks[name].append(_rank(found, target, args.k))
+
+    print(f"{len(items)} {args.queries} queries, {snap.index.ntotal} documents, k={args.k}, "
+          f"candidates={HYBRID_CANDIDATES}, rrf_k={RRF_K}")
+    header = f"{'retriever':10s} {'recall@k':>9s} {'MRR':>6s} {'p50 ms':>8s} {'p99 ms':>8s}"
+    print(header)
+    print("-" * len(header))
+    for name, rs in ranks.items():
+        recall = np.mean([r is not None for r in rs])
+        mrr = np.mean([1.0 / r if r else 0.0 for r in rs])
+        t = lat.get(name) or [a + b for a, b in zip(lat["dense"], lat["bm25"])]
+        print(f"{name:10s} {recall:9.3f} {mrr:6.3f} {np.percentile(t, 50) * 1e3:8.3f} {np.percentile(t, 99) * 1e3:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
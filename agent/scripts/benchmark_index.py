@@ -0,0 +1,150 @@
+"""
+Recall / latency / size benchmark for FAISS index types and compressed storage.
+
+    python -m agent.scripts.benchmark_index
+    python -m agent.scripts.benchmark_index --n 100000 --dim 3072 --specs "Flat" "HNSW32" "IVF1024,Flat" "IVF1024,PQ64"
+    python -m agent.scripts.benchmark_index --nprobe 1 8 32 --ef-search 16 64 128
+    python -m agent.scripts.benchmark_index --from-index --dims 3072 1024 512 256 --specs Flat SQfp16 SQ8 PQ64
+
+Every index type in --specs is built at every width in --dims: vectors (and queries) are cut
+to their first `dim` components and re-normalized, as the knowledge-base build does with
+KB_INDEX_DIM. Recall@k is always measured against the exact top-k of the full-precision,
+full-width vectors (Flat at --dim), so it shows the recall lost to quantization and
+truncation together; latency is per single-query search, as in retrieve_docs; size is the
+serialized index and its bytes per vector.
+
+By default vectors are drawn around random cluster centres and L2-normalized, like the
+embedding space the knowledge base searches; --decay > 0 shrinks later components, like
+text-embedding-3's Matryoshka-trained prefix (with isotropic vectors, truncation throws away
+information evenly and looks worse than it is on real embeddings). --from-index takes the
+vectors of the built knowledge base instead (it must be an index that returns its vectors,
+e.g. Flat); --queries of them are held out as queries.
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from agent.app.config import INDEX_PATH
+from agent.app.tools.faiss_index import make_index, search_params, truncate, can_reconstruct, index_ids
+
+
+def synthetic(n: int, dim: int, n_queries: int, clusters: int = 256, seed: int = 0, decay: float = 0.0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype("float32")
+    scale = (np.arange(1, dim + 1, dtype="float32") ** -decay)[None, :]
+    def draw(m):
+        x = centres[rng.integers(0, clusters, m)] + 1.5 * rng.standard_normal((m, dim)).astype("float32")
+        x *= scale
+        faiss.normalize_L2(x)
+        return x
+    return draw(n), draw(n_queries)
+
+
+def from_index(path: str, n: int, n_queries: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Up to n + n_queries stored vectors of the built index, split into database / queries."""
+    index = faiss.read_index(path)
+    if not can_reconstruct(index):
+        raise SystemExit(f"{path}: this index type cannot return its vectors; rebuild it as Flat to benchmark")
+    ids = np.unique(index_ids(index))
+    rng = np.random.default_rng(seed)
+    ids = rng.permutation(ids)[: n + n_queries]
+    vecs = index.reconstruct_batch(ids.astype("int64"))
+    return truncate(vecs[n_queries:], index.d), truncate(vecs[:n_queries], index.d)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1e3
+
+
+def evaluate(spec: str, xb: np.ndarray, xq: np.ndarray, truth: np.ndarray, k: int,
+             nprobes: List[int], ef_searches: List[int], train_size: int = 10000) -> List[dict]:
+    """Build `spec` once, then search it with every applicable nprobe / efSearch value."""
+    index = make_index(xb.shape[1], spec)
+    t0 = time.perf_counter()
+    if not index.is_trained:
+        index.train(xb[: min(len(xb), train_size)])
+    index.add_with_ids(xb, np.arange(len(xb), dtype="int64"))
+    build_s = time.perf_counter() - t0
+    size = faiss.serialize_index(index).nbytes
+
+    if isinstance(search_params(index, nprobe=1), faiss.SearchParametersIVF):
+        settings = [(p, None) for p in nprobes]
+    elif isinstance(search_params(index, ef_search=1), faiss.SearchParametersHNSW):
+        settings = [(None, e) for e in ef_searches]
+    else:
+        settings = [(None, None)]
+
+    rows = []
+    for nprobe, ef_search in settings:
+        params = search_params(index, nprobe=nprobe, ef_search=ef_search)
+        lat, found = [], []
+        for q in xq:
+            t0 = time.perf_counter()
+            _, ids = index.search(q[None, :], k, params=params)
+            lat.append(time.perf_counter() - t0)
+            found.append(ids[0])
+        recall = np.mean([len(set(f.tolist()) & set(t.tolist())) / k for f, t in zip(found, truth)])
+        rows.append({
+            "index": spec,
+            "dim": xb.shape[1],
+            "nprobe": nprobe or "-",
+            "efSearch": ef_search or "-",
+            "recall": float(recall),
+            "p50_ms": _percentile(lat, 50),
+            "p99_ms": _percentile(lat, 99),
+            "size_mb": size / 2**20,
+            "bytes_per_vec": size / len(xb),
+            "build_s": build_s,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=20000, help="database vectors")
+    ap.add_argument("--dim", type=int, default=256, help="width of the synthetic vectors")
+    ap.add_argument("--dims", type=int, nargs="+", default=None,
+                    help="truncated widths to build every spec at (default: the full width only)")
+    ap.add_argument("--decay", type=float, default=0.0, help="synthetic component j is scaled by (j + 1) ** -decay")
+    ap.add_argument("--from-index", action="store_true", help=f"use the vectors stored in {INDEX_PATH}")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--train", type=int, default=10000, help="training vectors for IVF/PQ/SQ8")
+    ap.add_argument("--specs", nargs="+", default=["Flat", "SQfp16", "SQ8", "HNSW32", "IVF256,Flat", "IVF256,PQ32"])
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[8, 32])
+    ap.add_argument("--ef-search", type=int, nargs="+", default=[32, 128])
+    args = ap.parse_args(argv)
+
+    if args.from_index:
+        xb, xq = from_index(INDEX_PATH, args.n, args.queries)
+    else:
+        xb, xq = synthetic(args.n, args.dim, args.queries, decay=args.decay)
+    full = xb.shape[1]
+    exact = make_index(full, "Flat")
+    exact.add_with_ids(xb, np.arange(len(xb), dtype="int64"))
+    _, truth = exact.search(xq, args.k)
+
+    rows = []
+    for dim in sorted({min(d, full) for d in (args.dims or [full])}, reverse=True):
+        xb_d, xq_d = (xb, xq) if dim == full else (truncate(xb, dim), truncate(xq, dim))
+        for spec in args.specs:
+            rows.extend(evaluate(spec, xb_d, xq_d, truth, args.k, args.nprobe, args.ef_search, args.train))
+
+    source = INDEX_PATH if args.from_index else f"synthetic, decay={args.decay}"
+    print(f"n={len(xb)} dim={full} queries={len(xq)} k={args.k} ({source}); "
+          f"recall vs. Flat at {full} dims, float32 = {4 * full} bytes/vector")
+    header = (f"{'index':16s} {'dim':>5s} {'nprobe':>6s} {'efS':>5s} {'recall@k':>9s} {'loss':>6s} "
+              f"{'p50 ms':>8s} {'p99 ms':>8s} {'size MB':>8s} {'B/vec':>7s} {'build s':>8s}")
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['index']:16s} {r['dim']:5d} {str(r['nprobe']):>6s} {str(r['efSearch']):>5s} {r['recall']:9.3f} "
+              f"{1 - r['recall']:6.3f} {r['p50_ms']:8.3f} {r['p99_ms']:8.3f} {r['size_mb']:8.1f} "
+              f"{r['bytes_per_vec']:7.0f} {r['build_s']:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
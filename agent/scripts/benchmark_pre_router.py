@@ -0,0 +1,132 @@
+"""
+Accuracy / latency report for the local pre-router (services/pre_router.py)
+against the LLM router (services/query_evaluator.py).
+
+    python -m agent.scripts.benchmark_pre_router                 # reference = LLM router decisions
+    python -m agent.scripts.benchmark_pre_router --labels-only   # reference = hand labels below, no API calls
+    python -m agent.scripts.benchmark_pre_router --questions my.jsonl --centroids
+
+--questions takes JSONL lines {"question": "...", "label": "yes"|"no"} ("label" optional when the LLM is the reference).
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from agent.app.services.pre_router import PreRouter, rule_route
+
+# Hand-labelled questions, following the examples in the LLM router's prompt.
+SAMPLE_QUESTIONS: List[Dict[str, str]] = [
+    {"question": "What is the price of gold yesterday?", "label": "yes"},
+    {"question": "price of wheat on 2024-12-31", "label": "yes"},
+    {"question": "Close of ^GSPC on 2024-12-31?", "label": "yes"},
+    {"question": "How much is crude oil per barrel today?", "label": "yes"},
+    {"question": "What did AAPL close at yesterday?", "label": "yes"},
+    {"question": "Silver price now", "label": "yes"},
+    {"question": "What was the Dow Jones index at on 2025-01-02?", "label": "yes"},
+    {"question": "Quote for GC=F today", "label": "yes"},
+    {"question": "How much did corn futures cost last Friday?", "label": "yes"},
+    {"question": "Current price of Tesla stock", "label": "yes"},
+    {"question": "Where did the S&P 500 close yesterday?", "label": "yes"},
+    {"question": "Gold yesterday?", "label": "yes"},
+    {"question": "MSFT on 2025-06-30", "label": "yes"},
+    {"question": "What's SPY trading at?", "label": "yes"},
+    {"question": "Price of natural gas today", "label": "yes"},
+    {"question": "What is the tariff situation between the US and the EU?", "label": "no"},
+    {"question": "Summarize wheat export bans in 2024.", "label": "no"},
+    {"question": "What is the city of Zurich like?", "label": "no"},
+    {"question": "Why did oil prices fall last month?", "label": "no"},
+    {"question": "How do sanctions affect Russian gas exports?", "label": "no"},
+    {"question": "Which countries restricted rice exports?", "label": "no"},
+    {"question": "What happened at the G7 summit?", "label": "no"},
+    {"question": "Explain the impact of drought on coffee harvests.", "label": "no"},
+    {"question": "How do I look today?", "label": "no"},
+    {"question": "What is the outlook for gold mining in Ghana?", "label": "no"},
+    {"question": "Tell me about NVDA earnings news", "label": "no"},
+    {"question": "Are there strikes at Chilean copper mines?", "label": "no"},
+    {"question": "Who won the election in Argentina?", "label": "no"},
+    {"question": "What did OPEC decide about production quotas?", "label": "no"},
+    {"question": "Any news on the Suez canal disruptions?", "label": "no"},
+]
+
+
+def _ms(values: List[float]) -> str:
+    if not values:
+        return "-"
+    return f"p50 {statistics.median(values) * 1e3:.3f} ms / max {max(values) * 1e3:.3f} ms"
+
+
+def run(items: List[Dict[str, str]], labels_only: bool, centroids: bool) -> Dict:
+    pre = PreRouter(use_centroids=centroids)
+    llm = None
+    if not labels_only:
+        from agent.app.services.query_evaluator import QueryEvaluatorService
+        llm = QueryEvaluatorService()
+
+    rows = []
+    for item in items:
+        q = item["question"]
+        t0 = time.perf_counter(); rule = rule_route(q); t_rule = time.perf_counter() - t0
+        t0 = time.perf_counter(); local = pre.decide(q); t_local = time.perf_counter() - t0
+        if llm is not None:
+            t0 = time.perf_counter(); ref = llm.score(q); t_llm = time.perf_counter() - t0
+        else:
+            ref, t_llm = item["label"], None
+        rows.append({"question": q, "rule": rule, "local": local, "reference": ref,
+                     "t_rule": t_rule, "t_local": t_local, "t_llm": t_llm})
+
+    decided = [r for r in rows if r["local"] is not None]
+    by_rule = [r for r in rows if r["rule"] is not None]
+    agree = [r for r in decided if r["local"] == r["reference"]]
+    llm_times = [r["t_llm"] for r in rows if r["t_llm"] is not None]
+    report = {
+        "questions": len(rows),
+        "decided_locally": len(decided),
+        "decided_by_rules": len(by_rule),
+        "decided_by_centroids": len(decided) - len(by_rule),
+        "coverage": len(decided) / len(rows) if rows else 0.0,
+        "accuracy_on_decided": len(agree) / len(decided) if decided else None,
+        "rule_latency": _ms([r["t_rule"] for r in rows]),
+        "pre_router_latency": _ms([r["t_local"] for r in rows]),
+        "llm_latency": _ms(llm_times),
+        "disagreements": [
+            {"question": r["question"], "local": r["local"], "reference": r["reference"]}
+            for r in decided if r["local"] != r["reference"]
+        ],
+    }
+    if llm_times:
+        mean_llm = statistics.mean(llm_times)
+        mean_local = statistics.mean(r["t_local"] for r in rows)
+        # with the pre-router, the LLM is only paid for undecided questions
+        report["mean_routing_latency_without_ms"] = mean_llm * 1e3
+        report["mean_routing_latency_with_ms"] = (mean_local + mean_llm * (1 - report["coverage"])) * 1e3
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--questions", help="JSONL file of {question, label}")
+    ap.add_argument("--labels-only", action="store_true", help="compare against labels instead of calling the LLM")
+    ap.add_argument("--centroids", action="store_true", help="enable the nearest-centroid tier")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    items = SAMPLE_QUESTIONS
+    if args.questions:
+        with open(args.questions) as f:
+            items = [json.loads(line) for line in f if line.strip()]
+
+    report = run(items, labels_only=args.labels_only, centroids=args.centroids)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        if key != "disagreements":
+            print(f"{key:32s} {value}")
+    for d in report["disagreements"]:
+        print(f"  MISMATCH local={d['local']} reference={d['reference']}: {d['question']}")
+
+
+if __name__ == "__main__":
+    main()
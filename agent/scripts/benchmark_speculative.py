@@ -0,0 +1,111 @@
+"""
+Critical-path latency with and without speculative retrieval (nodes/evaluate_query.py),
+against the local fakes (agent/scripts/fakes.py): no OpenAI or Yahoo Finance calls.
+
+    python -m agent.scripts.benchmark_speculative
+    python -m agent.scripts.benchmark_speculative --router-latency 0.8 --embed-latency 0.3 --questions 200
+    python -m agent.scripts.benchmark_speculative --pre-router --json
+
+The same seeded questions go through build_app(speculative_retrieval=False) and (=True),
+with the embedding cache cleared before each mode. Per route it reports p50 / p95 of
+  to context   start -> documents ready for grading (knowledge) / price fetched (finance)
+  end to end   start -> answer
+and how many speculative retrievals were used or discarded (wasted embedding + search).
+By default the pre-router is off, so every question waits for the LLM router, as the
+questions the pre-router cannot decide do.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.scripts.load_test import _pcts, setup_workspace, workload
+
+# node whose update means the generation context is ready
+_CONTEXT_NODE = {"knowledge": "retrieve", "finance": "yahoo_search"}
+
+
+async def _one(graph, kind: str, question: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    to_context = None
+    async for chunk in graph.astream({"question": question}, stream_mode="updates"):
+        if _CONTEXT_NODE[kind] in chunk and to_context is None:
+            to_context = time.perf_counter() - t0
+    return {"kind": kind, "to_context": to_context, "end_to_end": time.perf_counter() - t0}
+
+
+async def run_mode(speculative: bool, questions: List[Tuple[str, str]], concurrency: int) -> Dict[str, Any]:
+    from agent.app.graph.build import build_app
+    from agent.app.metrics import REGISTRY, SPECULATIVE
+    from agent.app.tools.embedding_cache import get_embedding_cache
+
+    graph = build_app(speculative_retrieval=speculative)
+    get_embedding_cache().clear()
+    REGISTRY.clear()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def guarded(kind, q):
+        async with sem:
+            return await _one(graph, kind, q)
+
+    results = await asyncio.gather(*(guarded(k, q) for k, q in questions))
+    out: Dict[str, Any] = {"speculative": {o: int(SPECULATIVE.value(outcome=o)) for o in ("used", "discarded", "failed")}}
+    for kind in ("knowledge", "finance"):
+        rows = [r for r in results if r["kind"] == kind]
+        out[kind] = {
+            "to_context": _pcts([r["to_context"] for r in rows if r["to_context"] is not None]),
+            "end_to_end": _pcts([r["end_to_end"] for r in rows]),
+        }
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--questions", type=int, default=100)
+    ap.add_argument("--finance-ratio", type=float, default=0.3)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--docs", type=int, default=2000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--router-latency", type=float, default=0.5, help="LLM router call seconds")
+    ap.add_argument("--embed-latency", type=float, default=0.15)
+    ap.add_argument("--llm-latency", type=float, default=0.2, help="extractor / grader call seconds")
+    ap.add_argument("--generator-latency", type=float, default=0.5)
+    ap.add_argument("--pre-router", action="store_true", help="keep the local pre-router on")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    os.environ.update({"ANSWER_CACHE": "0", "PRE_ROUTER_ENABLED": "1" if args.pre_router else "0"})
+    with contextlib.redirect_stdout(io.StringIO()):
+        latency, events = setup_workspace(args.docs, args.dim, args.seed)
+        latency.router = args.router_latency
+        latency.extractor = latency.grader = args.llm_latency
+        latency.generator, latency.embedding = args.generator_latency, args.embed_latency
+        questions = workload(args.questions, args.finance_ratio, events, args.seed)
+        report = {mode: asyncio.run(run_mode(mode == "speculative", questions, args.concurrency))
+                  for mode in ("sequential", "speculative")}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{args.questions} questions, concurrency {args.concurrency}, router {args.router_latency}s, "
+          f"embedding {args.embed_latency}s, pre-router {'on' if args.pre_router else 'off'}")
+    print(f"\n{'':24s} {'to context p50/p95 ms':>24s} {'end to end p50/p95 ms':>24s}")
+    print("-" * 74)
+    for kind in ("knowledge", "finance"):
+        for mode, r in report.items():
+            c, e = r[kind]["to_context"], r[kind]["end_to_end"]
+            print(f"{kind + ' / ' + mode:24s} {c['p50'] * 1e3:11.1f} /{c['p95'] * 1e3:9.1f}  "
+                  f"{e['p50'] * 1e3:11.1f} /{e['p95'] * 1e3:9.1f}")
+    s = report["speculative"]["speculative"]
+    print(f"\nspeculative retrievals: {s['used']} used, {s['discarded']} discarded, {s['failed']} failed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
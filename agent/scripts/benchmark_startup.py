@@ -0,0 +1,139 @@
+"""
+Startup guard: time `import agent.app.server` in fresh interpreters with the network
+disabled and no OPENAI_API_KEY, and list the slowest imports (python -X importtime).
+
+    python -m agent.scripts.benchmark_startup
+    python -m agent.scripts.benchmark_startup --runs 10 --top 25
+    python -m agent.scripts.benchmark_startup --max-seconds 2.0 --json   # CI gate: exit 1 on regression
+
+Fails (exit 1) when the import touches the network, raises, loads a module that must stay
+lazy (--forbid; LLM client libraries by default), or is slower than --max-seconds (median).
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Loaded on first use (services/registry.py), never at import.
+DEFAULT_FORBIDDEN = ["langchain_openai", "openai", "langchain.hub", "IPython", "yfinance"]
+
+# Runs in the child: block DNS / connects, import the module, report as JSON on stdout.
+_CHILD = r"""
+import importlib, json, socket, sys, time
+attempts = []
+def _blocked(what):
+    def fail(*args, **kwargs):
+        attempts.append(f"{what}{args[1:2] if what == 'connect' else args[:1]}")
+        raise OSError("network disabled by benchmark_startup")
+    return fail
+socket.getaddrinfo = _blocked("getaddrinfo")
+socket.socket.connect = _blocked("connect")
+socket.socket.connect_ex = _blocked("connect")
+t0 = time.perf_counter()
+error = None
+try:
+    importlib.import_module(sys.argv[1])
+except BaseException as e:
+    error = f"{type(e).__name__}: {e}"
+seconds = time.perf_counter() - t0
+print("@@" + json.dumps({"seconds": seconds, "error": error, "network": attempts,
+                         "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))
+"""
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append({"module": m.group(4), "self_s": int(m.group(1)) / 1e6,
+                         "cumulative_s": int(m.group(2)) / 1e6, "depth": len(m.group(3)) // 2})
+    return rows
+
+
+def run_once(module: str, forbidden: List[str], keep_key: bool) -> Dict[str, Any]:
+    env = dict(os.environ)
+    if not keep_key:
+        env.pop("OPENAI_API_KEY", None)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, module, json.dumps(forbidden)],
+        capture_output=True, text=True, cwd=str(REPO_ROOT), env=env, timeout=300,
+    )
+    marker = [l for l in proc.stdout.splitlines() if l.startswith("@@")]
+    if not marker:
+        return {"seconds": None, "error": f"child exited {proc.returncode}: {proc.stderr[-500:]}",
+                "network": [], "loaded": [], "imports": []}
+    out = json.loads(marker[-1][2:])
+    out["imports"] = _parse_importtime(proc.stderr)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--module", default="agent.app.server")
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters; the median is reported")
+    ap.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    ap.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN),
+                    help="comma-separated modules that must not be imported at startup")
+    ap.add_argument("--keep-key", action="store_true", help="pass OPENAI_API_KEY through to the child")
+    ap.add_argument("--max-seconds", type=float, help="fail if the median import time exceeds this")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    forbidden = [m for m in args.forbid.split(",") if m]
+
+    runs = [run_once(args.module, forbidden, args.keep_key) for _ in range(args.runs)]
+    ok = [r for r in runs if r["seconds"] is not None and not r["error"]]
+    median = statistics.median(r["seconds"] for r in ok) if ok else None
+
+    # slowest imports of the median run by cumulative time: first-level dependencies and our
+    # own modules only (nested third-party detail is noise)
+    ref = min(ok, key=lambda r: abs(r["seconds"] - median)) if ok else {"imports": []}
+    rows = [r for r in ref["imports"] if r["depth"] <= 1 or r["module"].startswith("agent.")]
+    rows = sorted(rows, key=lambda r: -r["cumulative_s"])[: args.top]
+
+    failures = sorted({r["error"] for r in runs if r["error"]})
+    network = sorted({a for r in runs for a in r["network"]})
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "median_s": median,
+        "min_s": min((r["seconds"] for r in ok), default=None),
+        "errors": failures,
+        "network_attempts": network,
+        "forbidden_loaded": loaded,
+        "slowest": [{k: r[k] for k in ("module", "cumulative_s", "self_s")} for r in rows],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        if median is not None:
+            print(f"import {args.module}: median {median:.3f}s, min {report['min_s']:.3f}s over {len(ok)} runs")
+        print(f"\n{'module':48s} {'cumulative ms':>14s} {'self ms':>9s}")
+        print("-" * 73)
+        for r in rows:
+            print(f"{r['module']:48s} {r['cumulative_s'] * 1e3:14.1f} {r['self_s'] * 1e3:9.1f}")
+
+    problems = [f"import failed: {e}" for e in failures]
+    problems += [f"network used at import: {a}" for a in network]
+    problems += [f"imported at startup (should be lazy): {m}" for m in loaded]
+    if args.max_seconds is not None and median is not None and median > args.max_seconds:
+        problems.append(f"median import {median:.3f}s > {args.max_seconds}s")
+    for p in problems:
+        print(f"FAIL: {p}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
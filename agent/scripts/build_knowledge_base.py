@@ -1,22 +1,16 @@
 import os
-from dotenv import load_dotenv
-
-load_dotenv()  
-
-
-import json, re, faiss, numpy as np
+import json, re, hashlib, shutil, faiss, numpy as np
 from datetime import datetime
-from typing import List, Dict, Any
-from openai import OpenAI
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-# --- Config ---
-EMBED_MODEL = "text-embedding-3-large"  # good quality; or -small for cheaper
-DIM = 3072                               # 3072 for -large, 1536 for -small
-SOURCE_PATH = "/Users/rosydai/Desktop/intern/Agentic-RAG-Demo/newsapi.json"
-INDEX_PATH = "vector_store/events.faiss"
-META_PATH  = "vector_store/events_fused.json"
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from agent.app.config import INDEX_DIM, SOURCE_PATH, INDEX_PATH, DOCSTORE_PATH, EMBED_CONCURRENCY
+from agent.app.config import INDEX_FACTORY, INDEX_TRAIN_SIZE, BM25_PATH, FILTERS_PATH, CHUNK_SIZE
+from agent.app.tools.bm25 import BM25Index
+from agent.app.tools.doc_filters import FilterIndex
+from agent.app.tools.doc_store import DocStore
+from agent.app.tools.embed_texts import embed_texts  # cached: unchanged events are not re-sent
+from agent.app.tools.embedding_cache import get_embedding_cache
+from agent.app.tools.faiss_index import make_index, supports_remove, compact, truncate, idmap_over_ivf
 
 
 def _norm_space(s: str) -> str:
@@ -42,40 +36,300 @@ def fuse_event(e: Dict[str, Any]) -> str:
     text = "\n".join(p for p in parts if p)
     return text
 
-def embed_texts(texts: List[str]) -> np.ndarray:
-    # chunk in batches to be safe
-    out = []
-    for i in range(0, len(texts), 128):
-        chunk = texts[i:i+128]
-        resp = client.embeddings.create(model=EMBED_MODEL, input=chunk)
-        out.extend([d.embedding for d in resp.data])
-    return np.array(out, dtype="float32")
-
-def build_index(json_path: str):
-    data = json.load(open(json_path, "r"))
-    # If file holds a list directly; if it holds {"events":[...]} adjust accordingly.
-    events = data if isinstance(data, list) else data.get("events", [])
-    # Dedup on id
-    docs, metas =  [], []
-    for e in events:
-        eid = e.get("id")
-        text = fuse_event(e)
-        docs.append(text)
-
-    emb = embed_texts(docs)
-    # L2-normalize for cosine via inner product
-    norms = np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12
-    emb = emb / norms
-
-    index = faiss.index_factory(DIM, "IDMap,Flat")  # simple & local; switch to IVF/HNSW if big
-    index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))  # cosine via dot since we normalized
-    ids = np.arange(len(emb), dtype="int64")
-    index.add_with_ids(emb, ids)
-    faiss.write_index(index, INDEX_PATH)
-    json.dump({"metas": docs}, open(META_PATH, "w"))
+def event_fields(e: Dict[str, Any]) -> Dict[str, Any]:
+    """Structured fields stored next to the fused text (same sources as fuse_event)."""
+    return {
+        "title": _norm_space(e.get("title", {}).get("eng", "")),
+        "date": e.get("eventDate", "") or "",
+        "country": _norm_space(e.get("location", {}).get("country", "")),
+        "city": _norm_space(e.get("location", {}).get("city", "")),
+        "categories": list(e.get("categories", []) or []),
+    }
 
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-# --- Example usage ---
-# build_index(SOURCE_PATH)
 
+# --- Streaming JSON ---
+class _JsonReader:
+    """Decodes one JSON value at a time from a file, reading it in fixed-size blocks."""
+
+    def __init__(self, f, block_size: int = 1 << 20):
+        self.f, self.block_size = f, block_size
+        self.buf, self.pos, self.eof = "", 0, False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        block = self.f.read(self.block_size)
+        if not block:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a value ending exactly at the buffer edge may be truncated (e.g. a number)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array_items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def iter_events(json_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield events one by one from either a top-level list or {"events": [...]},
+    without loading the whole file.
+    """
+    with open(json_path, "r") as f:
+        r = _JsonReader(f)
+        if r.peek() == "[":
+            yield from r.array_items()
+            return
+        r.expect("{")
+        while r.peek() != "}":
+            key = r.value()
+            r.expect(":")
+            if key == "events":
+                yield from r.array_items()
+            else:
+                r.value()  # skip other (small) top-level fields
+            if r.peek() == ",":
+                r.pos += 1
+        return
+
+
+def _chunks(it: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in it:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _IndexWriter:
+    """
+    Adds vectors to the index chunk by chunk and hides per-type differences:
+    IVF/PQ/SQ8 indexes are trained on the first `train_size` vectors (buffered until then),
+    and HNSW, which cannot remove ids, is compacted once at the end instead.
+    """
+
+    def __init__(self, index, factory: str, train_size: int = INDEX_TRAIN_SIZE):
+        self.index, self.factory, self.train_size = index, factory, train_size
+        self.pending_ids, self.pending_vecs = [], []
+        self.dropped, self.needs_compaction = [], False
+
+    def _drop(self, ids: List[int]):
+        if not ids:
+            return
+        if supports_remove(self.index):
+            self.index.remove_ids(np.array(ids, dtype="int64"))
+        else:
+            self.needs_compaction = True  # duplicates resolve to the newest vector in compact()
 
+    def add(self, vecs: np.ndarray, ids: np.ndarray, replaces: List[int] = ()):
+        """Add vectors; `replaces` are ids already in the index whose old vectors must go."""
+        self._drop(list(replaces))
+        if not self.index.is_trained:
+            self.pending_vecs.append(vecs); self.pending_ids.append(ids)
+            if sum(len(v) for v in self.pending_vecs) >= self.train_size:
+                self._train()
+            return
+        self.index.add_with_ids(vecs, ids)
+
+    def _train(self):
+        vecs, ids = np.vstack(self.pending_vecs), np.concatenate(self.pending_ids)
+        self.pending_vecs, self.pending_ids = [], []
+        # remove_ids cannot reach buffered vectors: an id updated in a later chunk keeps only
+        # its last vector, and ids removed meanwhile are dropped
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        keep = keep[~np.isin(ids[keep], np.array(self.dropped, dtype="int64"))]
+        vecs, ids = vecs[keep], ids[keep]
+        if not len(ids):
+            return
+        print(f"  ...training {self.factory} on {len(vecs)} vectors")
+        self.index.train(vecs)
+        self.index.add_with_ids(vecs, ids)
+
+    def remove(self, ids: List[int]):
+        self.dropped.extend(ids)
+        self._drop(ids)
+
+    def finish(self):
+        if self.pending_vecs:
+            self._train()  # corpus smaller than train_size: train on everything we have
+        if self.needs_compaction:
+            print(f"  ...compacting {self.factory} index")
+            self.index = compact(self.index, self.factory, self.dropped)
+        return self.index
+
+
+def _open_previous(index_factory: str, store_path: str) -> Optional[Tuple[Any, DocStore]]:
+    """
+    Previous build (index, writable copy of its doc store at `store_path`), or None if
+    there is none or it uses another (truncated) dimension, index type or id layout
+    (-> full rebuild).
+    """
+    if not (os.path.exists(INDEX_PATH) and os.path.exists(DOCSTORE_PATH)):
+        return None
+    index = faiss.read_index(INDEX_PATH)
+    shutil.copyfile(DOCSTORE_PATH, store_path)
+    store = DocStore(store_path)
+    if (index.d != INDEX_DIM or store.get_meta("index_factory", "Flat") != index_factory
+            or idmap_over_ivf(index)):  # ids of earlier IVF builds may already be scrambled
+        store.close()
+        return None
+    return index, store
+
+def build_index(
+    json_path: str,
+    chunk_size: int = CHUNK_SIZE,
+    max_concurrency: int = EMBED_CONCURRENCY,
+    index_factory: str = INDEX_FACTORY,
+):
+    """
+    Incremental, streaming build. Events are parsed from the source file incrementally
+    and processed `chunk_size` at a time: each chunk is diffed against the doc store,
+    its new/changed events are embedded (up to `max_concurrency` batches in flight),
+    and the vectors and documents are written before the next chunk is read.
+
+    Every event keeps a stable FAISS id (the doc store maps event id -> FAISS id +
+    content hash); events whose fused text is unchanged keep their vectors, and
+    events gone from the source are removed.
+
+    `index_factory` picks the FAISS index type (config KB_INDEX_FACTORY: Flat, HNSW32,
+    IVF1024,Flat, IVF1024,PQ64, SQfp16, SQ8, ...); IVF/PQ/SQ8 types are trained on the
+    first vectors. Embeddings are cut to their first KB_INDEX_DIM components (Matryoshka
+    truncation) and re-normalized before they are stored.
+
+    The BM25 keyword index and the metadata filter bitmaps need no embeddings, so they
+    are rebuilt from the doc store in full each time.
+    """
+    # Work on a copy of the doc store; it is swapped in together with the index at the end
+    store_tmp = f"{DOCSTORE_PATH}.tmp"
+    if os.path.exists(store_tmp):
+        os.remove(store_tmp)
+    previous = _open_previous(index_factory, store_tmp)
+    if previous is None:
+        print(f"No compatible previous build: indexing everything into {index_factory}")
+        if os.path.exists(store_tmp):
+            os.remove(store_tmp)
+        index, store = make_index(INDEX_DIM, index_factory), DocStore(store_tmp)
+        store.set_meta("index_factory", index_factory)
+    else:
+        index, store = previous
+    writer = _IndexWriter(index, index_factory)
+    next_id = int(store.get_meta("next_id", "0"))
+
+    read = added = updated = unchanged = 0
+    for events in _chunks(iter_events(json_path), chunk_size):
+        # Dedup on id within the chunk (last occurrence wins; a later chunk counts as an update)
+        parsed: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for e in events:
+            text = fuse_event(e)
+            eid = str(e.get("id") or f"sha256:{content_hash(text)}")
+            parsed[eid] = (text, e)
+        read += len(events)
+        store.mark_seen(parsed)
+        known = store.entries(list(parsed))
+
+        docs, replaced = [], []           # new or changed events; ids whose old vector goes
+        for eid, (text, e) in parsed.items():
+            h = content_hash(text)
+            if eid in known:
+                fid, old_hash = known[eid]
+                if old_hash == h:
+                    unchanged += 1
+                    continue
+                updated += 1
+                replaced.append(fid)
+            else:
+                fid, next_id = next_id, next_id + 1
+                added += 1
+            docs.append({"id": fid, "event_id": eid, "hash": h, "text": text, **event_fields(e)})
+        if not docs:
+            continue
+
+        emb = embed_texts([d["text"] for d in docs], max_concurrency=max_concurrency)
+        # truncate to the index width and L2-normalize for cosine via inner product
+        emb = truncate(emb, INDEX_DIM)
+        writer.add(emb, np.array([d["id"] for d in docs], dtype="int64"), replaced)
+        store.upsert(docs)
+        store.set_meta("next_id", str(next_id))
+        print(f"  ...{read} events read, {writer.index.ntotal} vectors")
+
+    gone = store.delete_unseen()
+    if gone:
+        writer.remove(gone)
+    index = writer.finish()
+
+    print(f"Build: {added} added, {updated} updated, {len(gone)} removed, {unchanged} unchanged; "
+          f"{index.ntotal} vectors")
+    print(f"Embedding cache: {get_embedding_cache().stats()}")
+    bm25 = BM25Index.build((d["id"], d["text"]) for d in store.iter_docs())
+    print(f"BM25: {len(bm25.doc_ids)} documents, {len(bm25.terms)} terms, {len(bm25.postings)} postings")
+    filters = FilterIndex.build(store.iter_docs())
+    print("Filters: " + ", ".join(f"{len(v)} {f} values" for f, (v, _) in filters.facets.items()))
+    store.close()
+    _publish(index, store_tmp, bm25, filters)
+
+
+def _publish(index, store_tmp: str, bm25: BM25Index, filters: FilterIndex):
+    """
+    Write the index, BM25 postings and filter bitmaps to temp files next to their
+    targets, then rename them and the doc store into place, so a running server
+    (services/retriever.py) never loads a half-written file.
+    """
+    for path in (INDEX_PATH, DOCSTORE_PATH, BM25_PATH, FILTERS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    index_tmp, bm25_tmp, filters_tmp = f"{INDEX_PATH}.tmp", f"{BM25_PATH}.tmp", f"{FILTERS_PATH}.tmp"
+    faiss.write_index(index, index_tmp)
+    bm25.save(bm25_tmp)
+    filters.save(filters_tmp)
+    os.replace(store_tmp, DOCSTORE_PATH)
+    os.replace(bm25_tmp, BM25_PATH)
+    os.replace(filters_tmp, FILTERS_PATH)
+    os.replace(index_tmp, INDEX_PATH)
+    size = os.path.getsize(INDEX_PATH)
+    print(f"Index: {index.d} dims, {size / 2**20:.1f} MB, {size / max(index.ntotal, 1):.0f} bytes per vector")
+
+
+# --- Example usage ---
+# build_index(SOURCE_PATH)
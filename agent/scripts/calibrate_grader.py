@@ -0,0 +1,167 @@
+"""
+Fit the grader's similarity bands (services/grade_bands.py) on recorded LLM verdicts.
+
+    GRADE_BANDS=0 GRADE_VERDICT_LOG=verdicts.jsonl uvicorn agent.app.server:app   # record while serving
+    python -m agent.scripts.calibrate_grader --log verdicts.jsonl
+    python -m agent.scripts.calibrate_grader --questions questions.txt --log verdicts.jsonl  # grade now (API calls)
+    python -m agent.scripts.calibrate_grader --log verdicts.jsonl --precision 0.99 --holdout 0.3 --dry-run
+
+accept = lowest cosine at and above which at least --precision of the verdicts are "yes";
+reject = highest cosine below which at least --precision are "no"; each side needs
+--min-support samples, otherwise it stays off (the LLM decides). Record with GRADE_BANDS=0:
+with bands active, only the ambiguous band reaches the LLM and gets logged.
+
+Writes GRADE_CALIBRATION_PATH (or --out) and reports, on held-out questions, the share of
+grader calls the bands save and how often they disagree with the LLM.
+"""
+import argparse
+import json
+import sys
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.app.config import EMBED_MODEL, INDEX_DIM, GRADE_CALIBRATION_PATH, GRADE_VERDICT_LOG
+from agent.app.services.grade_bands import GradeBands, record_verdicts
+
+Sample = Tuple[float, bool, str]  # (cosine, LLM said relevant, question)
+
+
+def load_samples(path: str, embed_model: str = EMBED_MODEL, index_dim: int = INDEX_DIM) -> List[Sample]:
+    samples, other = [], 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            if r.get("score") is None:
+                continue
+            if r.get("embed_model") not in (None, embed_model) or r.get("index_dim") not in (None, index_dim):
+                other += 1
+                continue
+            samples.append((float(r["score"]), r["verdict"] == "yes", r.get("question", "")))
+    if other:
+        print(f"skipped {other} verdicts recorded with another embedding model or index width", file=sys.stderr)
+    return samples
+
+
+def grade_questions(questions: List[str], log: str, k: int) -> None:
+    """Retrieve k documents per question and have the LLM grade every one (appended to `log`)."""
+    from agent.app.services.registry import get_service
+    from agent.app.services.retrieve_docs import retrieve_docs
+    grader = get_service("retrieval_evaluator")
+    for n, q in enumerate(questions, 1):
+        docs = retrieve_docs(q, k)
+        record_verdicts(q, docs, grader.evaluate_many([d["text"] for d in docs], q), path=log)
+        print(f"graded {n}/{len(questions)}: {q[:60]}", file=sys.stderr)
+
+
+def _sweep(samples: List[Sample], relevant: bool, precision: float, min_support: int) -> Optional[float]:
+    """
+    Walk the samples from the clear end (highest scores for accept, lowest for reject) and
+    return the threshold of the longest run whose verdicts are `relevant` at least
+    `precision` of the time, midway to the next score (ties are always decided together).
+    """
+    ordered = sorted(samples, key=lambda s: -s[0] if relevant else s[0])
+    scores = [s[0] for s in ordered]
+    best, agree = None, 0
+    for i, (_, label, _) in enumerate(ordered):
+        agree += label == relevant
+        n = i + 1
+        if n < len(scores) and scores[n] == scores[i]:
+            continue
+        if n >= min_support and agree / n >= precision:
+            best = (scores[i] + scores[n]) / 2 if n < len(scores) else scores[i] + (0.0 if relevant else 1e-6)
+    return best
+
+
+def fit(samples: List[Sample], precision: float, min_support: int) -> GradeBands:
+    """The widest bands whose score-only verdicts agree with the LLM at least `precision` of the time."""
+    accept = _sweep(samples, True, precision, min_support)
+    reject = _sweep(samples, False, precision, min_support)
+    if accept is not None and reject is not None and reject > accept:
+        reject = accept  # overlapping sides: accept wins on [accept, reject)
+    return GradeBands(accept=accept, reject=reject)
+
+
+def evaluate(bands: GradeBands, samples: List[Sample]) -> Dict[str, Any]:
+    decided = [(bands.decide(s), label) for s, label, _ in samples]
+    hits = [(v, label) for v, label in decided if v is not None]
+    wrong = sum(1 for v, label in hits if (v == "yes") != label)
+    return {
+        "samples": len(samples),
+        "saved_share": len(hits) / len(samples) if samples else 0.0,  # grader calls avoided (concurrent mode)
+        "accepted": sum(1 for v, _ in hits if v == "yes"),
+        "rejected": sum(1 for v, _ in hits if v == "no"),
+        "disagreement": wrong / len(hits) if hits else 0.0,  # score-only verdicts the LLM would have flipped
+        "false_rejects": sum(1 for v, label in hits if v == "no" and label),
+    }
+
+
+def _split(samples: List[Sample], holdout: float) -> Tuple[List[Sample], List[Sample]]:
+    # by question, so the held-out questions were never seen while fitting
+    if holdout <= 0:
+        return samples, samples
+    test = lambda q: zlib.crc32(q.encode()) % 1000 < holdout * 1000
+    return [s for s in samples if not test(s[2])], [s for s in samples if test(s[2])]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--log", default=GRADE_VERDICT_LOG or None, help="verdict JSONL (default: GRADE_VERDICT_LOG)")
+    ap.add_argument("--questions", help="text file, one question per line: grade their documents first")
+    ap.add_argument("--k", type=int, default=10, help="documents retrieved per question (--questions)")
+    ap.add_argument("--precision", type=float, default=0.98, help="required agreement with the LLM per side")
+    ap.add_argument("--min-support", type=int, default=30, help="verdicts needed on a side to enable it")
+    ap.add_argument("--holdout", type=float, default=0.2, help="share of questions held out for the report")
+    ap.add_argument("--out", default=GRADE_CALIBRATION_PATH)
+    ap.add_argument("--dry-run", action="store_true", help="report only, do not write --out")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    if not args.log:
+        ap.error("--log (or GRADE_VERDICT_LOG) is required")
+
+    if args.questions:
+        with open(args.questions) as f:
+            grade_questions([l.strip() for l in f if l.strip()], args.log, args.k)
+
+    samples = load_samples(args.log)
+    if not samples:
+        print(f"no verdicts with a similarity score in {args.log}", file=sys.stderr)
+        return 1
+    train, test = _split(samples, args.holdout)
+    bands = fit(train, args.precision, args.min_support)
+    result = {
+        "accept": bands.accept,
+        "reject": bands.reject,
+        "embed_model": EMBED_MODEL,
+        "index_dim": INDEX_DIM,
+        "precision": args.precision,
+        "min_support": args.min_support,
+        "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "train": evaluate(bands, train),
+        "holdout": evaluate(bands, test) if args.holdout > 0 else None,
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        fmt = lambda v: "off" if v is None else f"{v:.4f}"
+        print(f"{len(samples)} verdicts ({sum(s[1] for s in samples)} relevant), "
+              f"train {len(train)} / holdout {len(test) if args.holdout > 0 else 0}")
+        print(f"accept >= {fmt(bands.accept)}   reject < {fmt(bands.reject)}")
+        for name in ("train", "holdout"):
+            r = result[name]
+            if r:
+                print(f"{name:8s} calls saved {r['saved_share']:.1%}  ({r['accepted']} accepted, "
+                      f"{r['rejected']} rejected)  disagreement {r['disagreement']:.2%}  "
+                      f"false rejects {r['false_rejects']}")
+    if not args.dry_run:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"wrote {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
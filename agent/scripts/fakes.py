@@ -0,0 +1,341 @@
+"""
+Deterministic local stand-ins for OpenAI and Yahoo Finance, for load tests and offline runs.
+
+    os.environ.update(...)            # config is read at import: set paths / EMBED_DIM first
+    from agent.scripts import fakes
+    fakes.install(fakes.FakeLatency(router=0.3, grader=0.2, generator=1.0, embedding=0.05))
+    from agent.app.server import app  # every LLM / embedding / yfinance call now stays local
+
+- FakeChatModel replaces ChatOpenAI. Structured outputs (router, extractor, grader) are
+  computed from the prompt with simple rules; free text (rag_chain) is a canned answer,
+  streamed word by word. Each role sleeps its configured latency and reports token usage.
+- FakeEmbeddingsClient replaces the OpenAI embeddings client: hashed bag-of-words vectors,
+  so texts sharing words are close, as with real embeddings.
+- fake_downloader replaces yfinance: a seeded random walk of daily bars per symbol.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+
+# ----------------------------
+# Latency
+# ----------------------------
+@dataclass
+class FakeLatency:
+    """Seconds per call for each role; token_delay is the pause between streamed answer words."""
+    router: float = 0.0
+    extractor: float = 0.0
+    grader: float = 0.0
+    generator: float = 0.0
+    token_delay: float = 0.0
+    embedding: float = 0.0
+    yfinance: float = 0.0
+
+
+# role of a chat call, by the structured-output schema it is bound to (None = free text)
+_ROLES = {
+    "QueryEvaluatorOutput": "router",
+    "QueryRouteOutput": "router",
+    "QueryExtractorOutput": "extractor",
+    "RetrievalEvaluatorOutput": "grader",
+    "RetrievalBatchEvaluatorOutput": "grader",
+    None: "generator",
+}
+
+
+# ----------------------------
+# Chat model
+# ----------------------------
+_PRICE = re.compile(r"\b(price|prices|quote|close|closed|trading at|cost|how much)\b", re.I)
+_WHY = re.compile(r"\b(why|explain|impact|outlook|news|summari[sz]e)\b", re.I)
+_ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_SYMBOLS = [
+    (r"\bgold\b", "GC=F", "Gold Futures"), (r"\bsilver\b", "SI=F", "Silver Futures"),
+    (r"\b(crude|oil)\b", "CL=F", "Crude Oil Futures"), (r"\bwheat\b", "ZW=F", "Wheat Futures"),
+    (r"\bcorn\b", "ZC=F", "Corn Futures"), (r"\bnatural gas\b", "NG=F", "Natural Gas Futures"),
+    (r"s&p|\^gspc", "^GSPC", "S&P 500 Index"), (r"\bdow\b", "^DJI", "Dow Jones Industrial Average"),
+    (r"\btesla\b|\btsla\b", "TSLA", "Tesla Inc."), (r"\bapple\b|\baapl\b", "AAPL", "Apple Inc."),
+    (r"\bmicrosoft\b|\bmsft\b", "MSFT", "Microsoft Corp."), (r"\bspy\b", "SPY", "SPDR S&P 500 ETF"),
+]
+_WORD = re.compile(r"[a-z0-9]{4,}")
+
+
+def _question(text: str) -> str:
+    m = re.search(r"User question:\s*(.*)", text, re.S)
+    return (m.group(1) if m else text).strip()
+
+
+def _relevant(document: str, question: str) -> bool:
+    return bool(set(_WORD.findall(question.lower())) & set(_WORD.findall(document.lower())))
+
+
+def _extract(question: str) -> Dict[str, str]:
+    q = question.lower()
+    symbol, name = "SPY", "SPDR S&P 500 ETF"
+    for pattern, sym, display in _SYMBOLS:
+        if re.search(pattern, q):
+            symbol, name = sym, display
+            break
+    m = _ISO_DATE.search(question)
+    day = m.group(1) if m else (date.today() - timedelta(days=1 if "yesterday" in q else 0)).isoformat()
+    return {"symbol": symbol, "date": day, "display_name": name}
+
+
+def _structured(schema_name: str, text: str) -> Dict[str, Any]:
+    """text: the last human message of the prompt."""
+    question = _question(text)
+    if schema_name == "QueryEvaluatorOutput":
+        return {"binary_score": "yes" if _PRICE.search(question) and not _WHY.search(question) else "no"}
+    if schema_name == "QueryExtractorOutput":
+        return _extract(question)
+    if schema_name == "QueryRouteOutput":  # combined router / extractor
+        if _PRICE.search(question) and not _WHY.search(question):
+            return {"binary_score": "yes", **_extract(question)}
+        return {"binary_score": "no"}
+    if schema_name == "RetrievalEvaluatorOutput":
+        m = re.search(r"Retrieved document:\s*(.*?)\s*User question:", text, re.S)
+        return {"binary_score": "yes" if _relevant(m.group(1) if m else text, question) else "no"}
+    if schema_name == "RetrievalBatchEvaluatorOutput":
+        m = re.search(r"Retrieved documents:\s*(.*?)\s*User question:", text, re.S)
+        docs = re.split(r"^\[\d+\]\n", m.group(1) if m else "", flags=re.M)[1:]
+        return {"binary_scores": ["yes" if _relevant(d, question) else "no" for d in docs]}
+    raise NotImplementedError(f"FakeChatModel has no rule for structured output {schema_name!r}")
+
+
+def _answer(text: str) -> str:
+    m = re.search(r"Question:\s*(.*?)\s*\nContext:", text, re.S)
+    question = m.group(1) if m else text[-200:]
+    return (f"Based on the retrieved context, here is a short answer to '{question}'. "
+            "The sources describe the main developments and the parties involved. "
+            "Figures and dates are taken from the documents provided.")
+
+
+class FakeChatModel(BaseChatModel):
+    """Drop-in for ChatOpenAI: deterministic answers after a configurable per-role latency."""
+
+    model: str = "fake"
+    latency: FakeLatency = FakeLatency()
+    schema_name: Optional[str] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model}
+
+    def with_structured_output(self, schema, **kwargs):
+        bound = self.model_copy(update={"schema_name": schema.__name__})
+        return bound | RunnableLambda(lambda m: schema.model_validate_json(m.content))
+
+    # -- content ---------------------------------------------------------
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        human = [m.content for m in messages if m.type == "human" and isinstance(m.content, str)]
+        text = human[-1] if human else ""
+        if self.schema_name:
+            return json.dumps(_structured(self.schema_name, text))
+        return _answer(text)
+
+    def _delay(self) -> float:
+        return getattr(self.latency, _ROLES.get(self.schema_name, "generator"))
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], reply: str) -> Dict[str, int]:
+        n_in = sum(len(str(m.content)) for m in messages) // 4
+        n_out = max(1, len(reply) // 4)
+        return {"input_tokens": n_in, "output_tokens": n_out, "total_tokens": n_in + n_out}
+
+    # -- sync ------------------------------------------------------------
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        reply = self._reply(messages)
+        msg = AIMessage(reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._delay())
+        reply = self._reply(messages)
+        for word in re.findall(r"\S+\s*", reply):
+            if self.latency.token_delay and not self.schema_name:
+                time.sleep(self.latency.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(word))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk("", usage_metadata=self._usage(messages, reply)))
+
+    # -- async -----------------------------------------------------------
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        reply = self._reply(messages)
+        msg = AIMessage(reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._delay())
+        reply = self._reply(messages)
+        for word in re.findall(r"\S+\s*", reply):
+            if self.latency.token_delay and not self.schema_name:
+                await asyncio.sleep(self.latency.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(word))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk("", usage_metadata=self._usage(messages, reply)))
+
+
+def fake_chat_openai(latency: FakeLatency):
+    """A ChatOpenAI(...) replacement that accepts (and ignores) the OpenAI-specific kwargs."""
+    def factory(*args, **kwargs) -> FakeChatModel:
+        return FakeChatModel(model=kwargs.get("model") or kwargs.get("model_name") or "fake", latency=latency)
+    return factory
+
+
+# ----------------------------
+# Embeddings
+# ----------------------------
+class _FakeEmbeddings:
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self._words: Dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _word(self, w: str, dim: int) -> np.ndarray:
+        key = (w, dim)
+        with self._lock:
+            v = self._words.get(key)
+            if v is None:
+                v = self._words[key] = np.random.default_rng(zlib.crc32(w.encode())).standard_normal(dim).astype("float32")
+        return v
+
+    def vectors(self, texts: List[str], dim: int) -> np.ndarray:
+        out = np.zeros((len(texts), dim), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in re.findall(r"\w+", t.lower()) or [""]:
+                out[i] += self._word(w, dim)
+        return out / (np.linalg.norm(out, axis=1, keepdims=True) + 1e-12)
+
+    def _response(self, model: str, texts: List[str]):
+        from agent.app.config import DIM
+        vecs = self.vectors(texts, DIM)
+        tokens = sum(len(t) for t in texts) // 4
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=v.tolist(), index=i) for i, v in enumerate(vecs)],
+            model=model,
+            usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens),
+        )
+
+
+class _SyncEmbeddings(_FakeEmbeddings):
+    def create(self, model: str, input: List[str], **kwargs):
+        time.sleep(self.latency.embedding)
+        return self._response(model, list(input))
+
+
+class _AsyncEmbeddings(_FakeEmbeddings):
+    async def create(self, model: str, input: List[str], **kwargs):
+        await asyncio.sleep(self.latency.embedding)
+        return self._response(model, list(input))
+
+
+class FakeEmbeddingsClient:
+    """Stands in for openai.OpenAI / AsyncOpenAI where only .embeddings.create is used."""
+
+    def __init__(self, latency: FakeLatency, asynchronous: bool = False):
+        self.embeddings = (_AsyncEmbeddings if asynchronous else _SyncEmbeddings)(latency)
+
+
+# ----------------------------
+# Yahoo Finance
+# ----------------------------
+def fake_downloader(latency: FakeLatency):
+    """yfinance_downloader replacement: business-day bars from a random walk seeded by the symbol."""
+    import pandas as pd
+
+    def download(symbol: str, start: date, end: date):
+        time.sleep(latency.yfinance)
+        days = pd.bdate_range(start, end - timedelta(days=1), tz="America/New_York")
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()) + start.toordinal())
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+        return pd.DataFrame(
+            {"Open": close * 0.995, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+             "Volume": rng.integers(1e5, 1e7, len(days)).astype(float)},
+            index=days,
+        )
+    return download
+
+
+# ----------------------------
+# Knowledge base
+# ----------------------------
+_COUNTRIES = [("Switzerland", "Zurich"), ("France", "Paris"), ("Germany", "Berlin"), ("Japan", "Tokyo"),
+              ("United States", "Washington"), ("Brazil", "Brasilia"), ("India", "New Delhi"), ("Kenya", "Nairobi")]
+_TOPICS = [("tariffs", "news/Business"), ("wheat exports", "news/Business"), ("elections", "news/Politics"),
+           ("central bank rates", "news/Business"), ("drought", "news/Environment"), ("oil output", "news/Business"),
+           ("chip factories", "news/Technology"), ("port strikes", "news/Business")]
+_VERBS = ["debates", "announces new", "faces pressure over", "reaches deal on", "reviews", "expands"]
+
+
+def synthetic_events(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Events in the newsapi.json layout read by build_knowledge_base."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1)
+    events = []
+    for i in range(n):
+        country, city = _COUNTRIES[rng.integers(len(_COUNTRIES))]
+        topic, category = _TOPICS[rng.integers(len(_TOPICS))]
+        verb = _VERBS[rng.integers(len(_VERBS))]
+        title = f"{country} {verb} {topic}"
+        events.append({
+            "id": f"fake-{i}",
+            "eventDate": (start + timedelta(days=int(rng.integers(0, 240)))).strftime("%Y-%m-%d"),
+            "title": {"eng": title},
+            "summary": {"eng": f"{title}. Officials in {city} said talks on {topic} continue (report {i})."},
+            "location": {"city": city, "country": country},
+            "categories": [category],
+        })
+    return events
+
+
+# ----------------------------
+# Install
+# ----------------------------
+def install(latency: Optional[FakeLatency] = None) -> FakeLatency:
+    """
+    Route every external call to the fakes. Call after setting the environment (paths,
+    EMBED_DIM, ...), which agent.app.config reads at import.
+    Returns the latency object; change its fields at any time to change the fakes' speed.
+    """
+    latency = latency or FakeLatency()
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+    import langchain_openai
+    langchain_openai.ChatOpenAI = fake_chat_openai(latency)
+
+    from agent.app.services import llm_clients, registry
+    from agent.app.tools import embed_texts, price_store
+    # services and chat models built before this point hold real clients
+    registry.reset()
+    llm_clients.reset()
+    embed_texts.client = FakeEmbeddingsClient(latency)
+    embed_texts.aclient = FakeEmbeddingsClient(latency, asynchronous=True)
+    price_store._store = price_store.PriceStore(":memory:", downloader=fake_downloader(latency))
+    return latency
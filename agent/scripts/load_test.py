@@ -0,0 +1,203 @@
+"""
+End-to-end load test of server.app against local fakes (agent/scripts/fakes.py): no OpenAI
+or Yahoo Finance calls, no API quota.
+
+    python -m agent.scripts.load_test
+    python -m agent.scripts.load_test --requests 500 --concurrency 32 --finance-ratio 0.3
+    python -m agent.scripts.load_test --llm-latency 0.4 --generator-latency 1.5 --endpoint stream
+    python -m agent.scripts.load_test --json --max-p95 2.0 --min-rps 5     # CI gate: exit 1 on regression
+
+A synthetic knowledge base (--docs events, --dim dimensional fake embeddings) is built in a
+temp dir, then a seeded mix of finance and knowledge questions is sent through the ASGI app
+in-process (httpx ASGITransport) with --concurrency requests in flight. Reported: requests/s,
+end-to-end p50/p95/p99 per question kind, and p50/p95/p99 per graph node and external call,
+read from the app's own metrics (agent/app/metrics.py).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _pcts(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def workload(n: int, finance_ratio: float, events: List[Dict[str, Any]], seed: int = 0) -> List[Tuple[str, str]]:
+    """[(kind, question)]: finance price questions and knowledge questions about the KB's events."""
+    from agent.scripts.benchmark_pre_router import SAMPLE_QUESTIONS
+    finance = [q["question"] for q in SAMPLE_QUESTIONS if q["label"] == "yes"]
+    knowledge = [q["question"] for q in SAMPLE_QUESTIONS if q["label"] == "no"]
+    knowledge += [f"What is happening with {e['title']['eng'].lower()}?" for e in events[:200]]
+    rng = random.Random(seed)
+    return [("finance", rng.choice(finance)) if rng.random() < finance_ratio else ("knowledge", rng.choice(knowledge))
+            for _ in range(n)]
+
+
+def setup_workspace(docs: int, dim: int, seed: int = 0):
+    """
+    Point the app at a throwaway workspace (its configuration is read at import, so call this
+    before importing agent.app), install the fakes and build a synthetic knowledge base.
+    Returns (FakeLatency to tune, the KB's events).
+    """
+    work = tempfile.mkdtemp(prefix="rag-load-")
+    os.environ.update({
+        "AGENT_DATA_DIR": work,
+        "VECTOR_STORE_DIR": os.path.join(work, "vector_store"),
+        "EMBED_DIM": str(dim),
+        "EMBED_CACHE_PATH": "",
+        "KB_RELOAD_INTERVAL": "-1",
+        "DEBUG_STATE": "0",
+    })
+    from agent.scripts import fakes
+    latency = fakes.install()
+    events = fakes.synthetic_events(docs, seed=seed)
+    from agent.scripts.build_knowledge_base import build_index
+    src = os.path.join(work, "events.json")
+    with open(src, "w") as f:
+        json.dump(events, f)
+    build_index(src)
+    return latency, events
+
+
+async def drive(app, questions: List[Tuple[str, str]], concurrency: int, endpoint: str) -> Tuple[List[dict], float]:
+    import httpx
+
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        async def one(kind: str, question: str) -> dict:
+            async with sem:
+                t0 = time.perf_counter()
+                ok = False
+                try:
+                    if endpoint == "chat":
+                        r = await client.post("/chat", json={"question": question})
+                        ok = r.status_code == 200 and bool(r.json().get("answer"))
+                    else:
+                        r = await client.post("/chat/stream", json={"question": question})
+                        ok = r.status_code == 200 and "event: done" in r.text and "event: error" not in r.text
+                except Exception as e:
+                    print(f"request failed: {e!r}", file=sys.stderr)
+                return {"kind": kind, "seconds": time.perf_counter() - t0, "ok": ok}
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(one(k, q) for k, q in questions))
+        return list(results), time.perf_counter() - t0
+
+
+def report(results: List[dict], wall: float) -> Dict[str, Any]:
+    from agent.app.metrics import NODE_LATENCY, CALL_LATENCY, CONTEXT_TOKENS, GRADER_DOCS, GRADER_CALLS_SAVED
+
+    ok = [r for r in results if r["ok"]]
+    out = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "wall_s": wall,
+        "rps": len(results) / wall if wall else 0.0,
+        "end_to_end": {"all": _pcts([r["seconds"] for r in ok])},
+        "nodes": {k[0]: _pcts(v) for k, v in sorted(NODE_LATENCY.samples().items())},
+        "calls": {f"{k[0]}:{k[1]}": _pcts(v) for k, v in sorted(CALL_LATENCY.samples().items())},
+        # generation context before / after assembly (dedup, MMR, token budget), summed over requests
+        "context_tokens": {stage: int(CONTEXT_TOKENS.value(stage=stage)) for stage in ("raw", "packed")},
+        # documents decided by the similarity bands vs. sent to the LLM grader
+        "grading": {**{d: int(GRADER_DOCS.value(decision=d)) for d in ("accepted", "rejected", "llm")},
+                    "calls_saved": int(GRADER_CALLS_SAVED.value())},
+    }
+    for kind in sorted({r["kind"] for r in results}):
+        out["end_to_end"][kind] = _pcts([r["seconds"] for r in ok if r["kind"] == kind])
+    return out
+
+
+def _print_table(title: str, rows: Dict[str, Dict[str, float]]):
+    print(f"\n{title:34s} {'n':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    print("-" * 71)
+    for name, p in rows.items():
+        print(f"{name:34s} {p['n']:6d} {p['p50'] * 1e3:9.1f} {p['p95'] * 1e3:9.1f} {p['p99'] * 1e3:9.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--warmup", type=int, default=5, help="requests sent (and not measured) first")
+    ap.add_argument("--finance-ratio", type=float, default=0.3, help="share of price questions")
+    ap.add_argument("--endpoint", choices=["chat", "stream"], default="chat")
+    ap.add_argument("--docs", type=int, default=2000, help="synthetic knowledge-base events")
+    ap.add_argument("--dim", type=int, default=256, help="fake embedding dimension")
+    ap.add_argument("--llm-latency", type=float, default=0.2, help="router / extractor / grader call seconds")
+    ap.add_argument("--generator-latency", type=float, default=0.8, help="rag_chain call seconds")
+    ap.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed answer words")
+    ap.add_argument("--embed-latency", type=float, default=0.05)
+    ap.add_argument("--yfinance-latency", type=float, default=0.3)
+    ap.add_argument("--no-answer-cache", action="store_true", help="run every request through the graph")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    ap.add_argument("--verbose", action="store_true", help="keep the app's per-node prints")
+    ap.add_argument("--max-p95", type=float, help="fail (exit 1) if end-to-end p95 exceeds this many seconds")
+    ap.add_argument("--min-rps", type=float, help="fail (exit 1) if throughput is below this")
+    args = ap.parse_args(argv)
+
+    if args.no_answer_cache:
+        os.environ["ANSWER_CACHE"] = "0"
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        latency, events = setup_workspace(args.docs, args.dim, args.seed)
+        latency.router = latency.extractor = latency.grader = args.llm_latency
+        latency.generator, latency.token_delay = args.generator_latency, args.token_delay
+        latency.embedding, latency.yfinance = args.embed_latency, args.yfinance_latency
+
+        from agent.app.metrics import REGISTRY
+        from agent.app.server import app
+        questions = workload(args.requests + args.warmup, args.finance_ratio, events, args.seed)
+        asyncio.run(drive(app, questions[: args.warmup], args.concurrency, args.endpoint))
+        REGISTRY.clear()
+        results, wall = asyncio.run(drive(app, questions[args.warmup:], args.concurrency, args.endpoint))
+    out = report(results, wall)
+    out["config"] = {k: v for k, v in vars(args).items() if k not in ("json", "verbose")}
+
+    if args.json:
+        print(json.dumps(out, indent=2))
+    else:
+        print(f"{out['requests']} requests ({args.endpoint}), concurrency {args.concurrency}, "
+              f"finance ratio {args.finance_ratio}: {out['rps']:.1f} req/s, {out['errors']} errors, "
+              f"{out['wall_s']:.1f}s")
+        _print_table("end to end", out["end_to_end"])
+        _print_table("graph node", out["nodes"])
+        _print_table("external call", out["calls"])
+        g = out["grading"]
+        if g["accepted"] + g["rejected"] + g["llm"]:
+            print(f"\ngrading: {g['accepted']} accepted / {g['rejected']} rejected by score, {g['llm']} by the LLM "
+                  f"({g['calls_saved']} grader calls saved)")
+        ctx = out["context_tokens"]
+        if ctx["raw"]:
+            print(f"\ngeneration context: {ctx['raw']} -> {ctx['packed']} tokens "
+                  f"({1 - ctx['packed'] / ctx['raw']:.0%} saved)")
+
+    failed = []
+    p95 = out["end_to_end"]["all"]["p95"]
+    if args.max_p95 is not None and p95 > args.max_p95:
+        failed.append(f"end-to-end p95 {p95:.3f}s > {args.max_p95}s")
+    if args.min_rps is not None and out["rps"] < args.min_rps:
+        failed.append(f"throughput {out['rps']:.2f} req/s < {args.min_rps}")
+    if out["errors"]:
+        failed.append(f"{out['errors']} failed requests")
+    for msg in failed:
+        print(f"FAIL: {msg}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from agent.app.services.answer_cache import AnswerCache
+
+
+def _cache(version):
+    return AnswerCache(max_items=4, similarity=1.0, kb_version=lambda: version["kb"])
+
+
+def test_aprobe_reads_the_index_version_off_the_event_loop():
+    seen = []
+
+    def kb_version():
+        seen.append(threading.get_ident())
+        return 1
+
+    async def probe():
+        cache = AnswerCache(max_items=4, similarity=1.0, kb_version=kb_version)
+        await cache.aprobe("What happened in Paris?")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(probe())
+    assert seen and loop_thread not in seen
+
+
+def test_exact_hit_until_the_index_version_changes():
+    version = {"kb": 1}
+    cache = _cache(version)
+    probe = cache.probe("What happened in Paris?")
+    cache.put(probe, "A summit.", "knowledge")
+
+    hit = asyncio.run(cache.aprobe("what happened in paris"))
+    assert (hit.hit, hit.answer) == ("exact", "A summit.")
+
+    version["kb"] = 2
+    assert cache.probe("What happened in Paris?").hit == "miss"
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,71 @@
+import numpy as np
+
+from agent.app.tools.bm25 import BM25Index, rrf_fuse, tokenize
+
+DOCS = [
+    (10, "Gold price hits record high"),
+    (11, "Oil price falls after OPEC meeting"),
+    (12, "S&P 500 and ^GSPC close higher on tech earnings"),
+    (13, "Gold and silver rally as the dollar weakens; gold demand grows"),
+    (14, ""),
+]
+
+
+def test_tokenize_keeps_symbols_whole_and_drops_stopwords():
+    assert tokenize("What is the price of GC=F and ^GSPC in the U.S.?") == ["price", "gc=f", "^gspc", "u.s"]
+
+
+def test_scores_follow_bm25():
+    index = BM25Index.build(DOCS)
+    hits = dict(index.search("gold", k=10))
+    assert set(hits) == {10, 13}
+
+    # idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)) with k1=1.2, b=0.75
+    lens = [len(tokenize(t)) for _, t in DOCS]
+    avgdl, n, df = np.mean(lens), len(DOCS), 2
+    idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+    for fid, tf in ((10, 1), (13, 2)):
+        dl = lens[fid - 10]
+        expected = idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * dl / avgdl))
+        assert np.isclose(hits[fid], expected, rtol=1e-5)
+
+
+def test_search_sums_terms_and_ignores_unknown_words():
+    index = BM25Index.build(DOCS)
+    ids = [fid for fid, _ in index.search("gold price zzz", k=10)]
+    assert ids[0] == 10  # only document matching both terms
+    assert set(ids) == {10, 11, 13}
+    assert [fid for fid, _ in index.search("^gspc", k=1)] == [12]
+    assert index.search("zzz unknown", k=5) == []
+    assert index.search("the of", k=5) == []
+
+
+def test_mask_skips_document_positions():
+    index = BM25Index.build(DOCS)
+    mask = np.ones(len(DOCS), dtype=bool)
+    mask[0] = False  # position of id 10
+    assert [fid for fid, _ in index.search("gold", k=10, mask=mask)] == [13]
+
+
+def test_round_trip(tmp_path):
+    index = BM25Index.build(DOCS)
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    assert BM25Index.load(path).search("oil opec", k=3) == index.search("oil opec", k=3)
+
+
+def test_empty_corpus():
+    index = BM25Index.build([(0, ""), (1, "the of")])
+    assert index.search("gold", k=5) == []
+
+
+def test_rrf_fuse_rewards_agreement():
+    dense, sparse = [1, 2, 3, 4], [5, 3, 1]
+    assert rrf_fuse([dense, sparse], k=3, rrf_k=60) == [1, 3, 5]
+
+
+def test_rrf_fuse_scores_are_reciprocal_ranks():
+    # 2 is 2nd and 1st: 1/(k+2) + 1/(k+1) beats 1 ranked 1st once
+    assert rrf_fuse([[1, 2], [2]], k=2, rrf_k=1) == [2, 1]
+    assert rrf_fuse([[7, 8, 9]], k=10) == [7, 8, 9]
+    assert rrf_fuse([[], []], k=5) == []
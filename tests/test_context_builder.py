@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from agent.app.services import context_builder
+from agent.app.services.context_builder import assemble_context, dedup, mmr, _pack
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+    # count tokens as chars / 4 instead of loading tiktoken
+    monkeypatch.setattr(context_builder, "_encoding", False)
+
+
+def _doc(i, text, score=0.5):
+    return {"id": i, "score": score, "text": text}
+
+
+def _unit(*rows):
+    x = np.array(rows, dtype="float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_dedup_drops_identical_texts_and_near_identical_vectors():
+    docs = [_doc(0, "Gold hits a record"), _doc(1, "gold  hits a RECORD"), _doc(2, "Oil falls"), _doc(3, "Oil drops")]
+    assert dedup(docs, None) == [0, 2, 3]
+    vecs = _unit([1, 0, 0], [1, 0, 0], [0, 1, 0], [0, 1, 0.1])
+    assert dedup(docs, vecs, threshold=0.95) == [0, 2]
+
+
+def test_mmr_trades_relevance_for_diversity():
+    vecs = _unit([1, 0], [1, 0.05], [0, 1])
+    relevance = np.array([0.9, 0.85, 0.6], dtype="float32")
+    assert mmr(relevance, vecs, 3, lam=1.0) == [0, 1, 2]
+    assert mmr(relevance, vecs, 3, lam=0.5) == [0, 2, 1]
+    assert mmr(relevance, vecs, 2, lam=0.5) == [0, 2]
+
+
+def test_pack_keeps_blocks_within_budget():
+    blocks = ["a" * 40, "b" * 400, "c" * 20]  # 10, 100 and 5 tokens, plus 4 each for the separator
+    packed, used = _pack(blocks, budget=40)
+    assert packed == ["a" * 40, "c" * 20]  # the long block is skipped, the later short one still fits
+    assert used == 23 <= 40
+
+
+def test_pack_cuts_the_first_block_to_fit():
+    packed, used = _pack(["x" * 400, "y" * 8], budget=24)
+    assert packed == ["x" * 80]  # cut to the whole budget: nothing else fits
+    assert used == 24
+
+
+def test_mmr_relevance_follows_the_fused_order(monkeypatch):
+    # hybrid order: a dense hit, a keyword-only hit without a cosine, then a dense hit with a higher cosine
+    docs = [_doc(0, "Fed raises rates", 0.5), _doc(1, "GC=F closes at 2300", None), _doc(2, "Markets rally", 0.6)]
+    monkeypatch.setattr(context_builder, "_vectors", lambda d: _unit([1, 0, 0], [0, 1, 0], [0, 0, 1]))
+    context, report = assemble_context(docs, budget=1000, max_docs=3)
+    assert context == "[1] Fed raises rates\n\n[2] GC=F closes at 2300\n\n[3] Markets rally"
+    assert (report["docs_in"], report["docs_out"]) == (3, 3)
+
+
+def test_budget_and_max_docs_limit_the_context(monkeypatch):
+    docs = [_doc(i, f"document {i} " + "w" * 60) for i in range(5)]
+    monkeypatch.setattr(context_builder, "_vectors", lambda d: np.eye(5, dtype="float32"))
+    _, report = assemble_context(docs, budget=1000, max_docs=3)
+    assert report["docs_out"] == 3
+    context, report = assemble_context(docs, budget=50, max_docs=5)  # 22 tokens per document
+    assert report["docs_out"] == 2 and context.startswith("[1] document 0")
+    assert report["context_tokens"] <= 50
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from agent.app.tools.doc_filters import FilterIndex
+
+DOCS = [
+    {"id": 0, "date": "2025-01-10", "country": "US", "city": "New York", "categories": ["news/Business"]},
+    {"id": 1, "date": "2025-02-01T09:00:00", "country": "United Kingdom", "city": "London",
+     "categories": ["news/Business/Markets"]},
+    {"id": 3, "date": "2025-03-15", "country": "us", "city": "Chicago", "categories": ["news/Politics"]},
+    {"id": 9, "date": None, "country": None, "city": None, "categories": []},
+]
+
+
+def _ids(index, filters):
+    return np.flatnonzero(index.allowed(index.bitmap(filters))).tolist()
+
+
+def test_no_filters_means_no_bitmap():
+    index = FilterIndex.build(DOCS)
+    assert index.bitmap(None) is None
+    assert index.bitmap({"country": None, "city": ""}) is None
+
+
+def test_bitmap_is_packed_in_faiss_bit_order():
+    index = FilterIndex.build(DOCS)
+    bits = index.bitmap({"country": "us"})
+    assert bits.dtype == np.uint8 and len(bits) == 2  # ids 0..9
+    assert bits.tolist() == [0b00001001, 0]
+    assert len(index.allowed(bits)) == 10
+
+
+def test_values_are_or_ed_and_fields_and_ed():
+    index = FilterIndex.build(DOCS)
+    assert _ids(index, {"country": "US"}) == [0, 3]  # case-insensitive
+    assert _ids(index, {"city": ["London", "Chicago"]}) == [1, 3]
+    assert _ids(index, {"country": "US", "city": ["London", "Chicago"]}) == [3]
+    assert _ids(index, {"country": "France"}) == []
+
+
+def test_category_selects_sub_categories():
+    index = FilterIndex.build(DOCS)
+    assert _ids(index, {"category": "news/Business"}) == [0, 1]
+    assert _ids(index, {"category": "news/Business/Markets"}) == [1]
+    assert _ids(index, {"category": "news/Bus"}) == []
+
+
+def test_date_range_is_inclusive_and_skips_undated():
+    index = FilterIndex.build(DOCS)
+    assert _ids(index, {"date_from": "2025-02-01"}) == [1, 3]
+    assert _ids(index, {"date_to": "2025-02-01"}) == [0, 1]
+    assert _ids(index, {"date_from": "2025-01-11", "date_to": "2025-03-14", "country": "United Kingdom"}) == [1]
+
+
+def test_invalid_filters_raise():
+    index = FilterIndex.build(DOCS)
+    with pytest.raises(ValueError):
+        index.bitmap({"topic": "oil"})
+    with pytest.raises(ValueError):
+        index.bitmap({"date_from": "last week"})
+
+
+def test_round_trip(tmp_path):
+    index = FilterIndex.build(DOCS)
+    path = str(tmp_path / "filters.npz")
+    index.save(path)
+    loaded = FilterIndex.load(path)
+    filters = {"country": "us", "date_to": "2025-12-31"}
+    assert loaded.n_ids == index.n_ids
+    assert loaded.bitmap(filters).tolist() == index.bitmap(filters).tolist()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from agent.app.tools.embedding_cache import EmbeddingCache
+from agent.app.tools.singleflight import SingleFlight
+
+
+def _vecs(n, dim=4):
+    return np.arange(n * dim, dtype="float32").reshape(n, dim)
+
+
+def test_memory_hit_and_normalized_key(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("m", ["Hello  world"], _vecs(1))
+
+    (vec,) = cache.get_many("m", ["Hello world"])  # whitespace collapsed
+    assert np.array_equal(vec, _vecs(1)[0])
+    assert cache.get_many("other-model", ["Hello world"]) == [None]
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_level_serves_after_memory_eviction_and_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path, max_memory_items=1)
+    cache.put_many("m", ["a", "b"], _vecs(2))
+
+    assert np.array_equal(cache.get_many("m", ["a"])[0], _vecs(2)[0])
+    assert cache.stats()["disk_hits"] == 1
+
+    reopened = EmbeddingCache(path)
+    assert reopened.stats()["disk_items"] == 2
+    assert np.array_equal(reopened.get_many("m", ["b"])[0], _vecs(2)[1])
+
+
+def test_disk_eviction_keeps_count_and_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_memory_items=0, max_disk_items=3)
+    cache.put_many("m", ["a", "b", "c"], _vecs(3))
+    time.sleep(0.01)
+    cache.get_many("m", ["a"])  # a is now more recent than b
+    time.sleep(0.01)
+    cache.put_many("m", ["d", "d", "a"], _vecs(3))  # one new key (d), a replaced
+
+    assert cache.stats()["disk_items"] == 3
+    assert cache.get_many("m", ["b"]) == [None]
+    assert all(v is not None for v in cache.get_many("m", ["a", "c", "d"]))
+    assert EmbeddingCache(str(tmp_path / "cache.sqlite")).stats()["disk_items"] == 3
+
+
+def test_singleflight_do_runs_once_for_concurrent_callers():
+    flight, calls, gate = SingleFlight("test"), [], threading.Event()
+
+    def fn():
+        calls.append(1)
+        gate.wait(1)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == ["result"] * 5 and len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_singleflight_ado_shares_result_and_survives_a_cancelled_caller():
+    flight, calls = SingleFlight("test"), []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        first = asyncio.create_task(flight.ado("k", fn))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.ado("k", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "result"
+    assert len(calls) == 1
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from agent.app.services.grade_bands import GradeBands, load_bands
+
+BANDS = GradeBands(accept=0.6, reject=0.3)
+
+
+@pytest.mark.parametrize("score, expected", [(0.75, "yes"), (0.6, "yes"), (0.45, None), (0.3, None), (0.1, "no")])
+def test_decide_by_band(score, expected):
+    assert BANDS.decide(score) == expected
+
+
+def test_keyword_only_hits_are_never_rejected_by_score():
+    assert BANDS.decide(0.1, dense=False) is None  # the LLM grades it
+    assert BANDS.decide(0.75, dense=False) == "yes"
+    assert BANDS.decide(None) is None
+
+
+def test_disabled_sides_leave_the_llm_to_decide():
+    assert GradeBands().decide(0.99) is None
+    assert GradeBands(accept=0.6).decide(0.0) is None
+    assert GradeBands(reject=0.3).decide(0.99) is None
+
+
+def _write(tmp_path, **cal):
+    path = tmp_path / "calibration.json"
+    path.write_text(json.dumps(cal))
+    return str(path)
+
+
+def test_load_bands_matching_model_and_width(tmp_path):
+    path = _write(tmp_path, accept=0.62, reject=0.31, embed_model="text-embedding-3-large", index_dim=3072)
+    assert load_bands(path, "text-embedding-3-large", 3072) == GradeBands(accept=0.62, reject=0.31)
+
+
+def test_load_bands_without_model_or_width_applies(tmp_path):
+    assert load_bands(_write(tmp_path, accept=0.5), "any-model", 256) == GradeBands(accept=0.5)
+
+
+@pytest.mark.parametrize("model, dim", [("text-embedding-3-small", 3072), ("text-embedding-3-large", 1024)])
+def test_load_bands_fitted_elsewhere_is_ignored(tmp_path, model, dim):
+    path = _write(tmp_path, accept=0.62, reject=0.31, embed_model="text-embedding-3-large", index_dim=3072)
+    assert load_bands(path, model, dim) == GradeBands()
+
+
+def test_load_bands_missing_file(tmp_path):
+    assert load_bands(str(tmp_path / "missing.json"), "m", 8) == GradeBands()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from agent.app.tools.faiss_index import make_index, index_ids, widest_params
+from agent.scripts.build_knowledge_base import _IndexWriter
+
+
+def _unit(rng, n, dim=32):
+    x = rng.standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _assert_self_search(index, expected):
+    """Every surviving vector finds itself under its own id."""
+    ids = np.array(sorted(expected), dtype="int64")
+    vecs = np.stack([expected[i] for i in ids])
+    _, found = index.search(vecs, 1, params=widest_params(index))
+    assert found[:, 0].tolist() == ids.tolist()
+
+
+@pytest.mark.parametrize("factory", ["SQ8", "IVF4,Flat", "Flat"])
+def test_pending_vectors_are_deduplicated_before_training(factory):
+    rng = np.random.default_rng(0)
+    writer = _IndexWriter(make_index(32, factory), factory, train_size=1000)
+    first, updated = _unit(rng, 50), _unit(rng, 2)
+    writer.add(first, np.arange(50))
+    writer.add(updated, np.array([3, 7]), replaces=[3, 7])  # updated in a later chunk
+    writer.remove([10])
+
+    index = writer.finish()
+    expected = {i: first[i] for i in range(50) if i != 10}
+    expected.update({3: updated[0], 7: updated[1]})  # last vector wins
+    assert sorted(index_ids(index).tolist()) == sorted(expected)
+    _assert_self_search(index, expected)
+
+
+@pytest.mark.parametrize("factory", ["SQ8", "IVF4,Flat", "Flat", "HNSW16"])
+def test_incremental_update_and_remove_keep_ids(factory):
+    rng = np.random.default_rng(1)
+    vecs = _unit(rng, 200)
+    writer = _IndexWriter(make_index(32, factory), factory, train_size=100)
+    writer.add(vecs, np.arange(200))  # trained and added
+    changed = _unit(rng, 1)
+    writer.add(changed, np.array([5]), replaces=[5])
+    writer.remove([17])
+
+    index = writer.finish()
+    expected = {i: vecs[i] for i in range(200) if i != 17}
+    expected[5] = changed[0]
+    assert sorted(index_ids(index).tolist()) == sorted(expected)
+    _assert_self_search(index, expected)
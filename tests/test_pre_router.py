@@ -0,0 +1,49 @@
+import pytest
+
+from agent.app.services.pre_router import rule_route
+from agent.scripts.benchmark_pre_router import SAMPLE_QUESTIONS
+
+
+@pytest.mark.parametrize("question", [
+    "What is the price of gold yesterday?",
+    "price of wheat on 2024-12-31",
+    "Close of ^GSPC on 2024-12-31?",
+    "How much is crude oil per barrel today?",
+    "How much did corn futures cost last Friday?",
+    "What did AAPL close at yesterday?",
+    "Where did the S&P 500 close yesterday?",
+    "What's SPY trading at?",
+    "Silver price now",
+    "Quote for GC=F today",
+    "MSFT on 2025-06-30",
+])
+def test_explicit_quote_requests_are_finance(question):
+    assert rule_route(question) == "yes"
+
+
+@pytest.mark.parametrize("question", [
+    "Are wheat prices high because of the drought?",
+    "AAPL earnings call highlights today",
+    "Is gold worth investing in?",
+    "How much did the gold price rise in 2024?",
+    "What's the price of oil doing after the OPEC meeting?",
+    "How much is the EU spending on wheat subsidies?",
+    "Why did oil prices fall last month?",
+    "What is the outlook for gold mining in Ghana?",
+])
+def test_price_adjacent_questions_go_to_the_llm(question):
+    assert rule_route(question) is None
+
+
+@pytest.mark.parametrize("question", [
+    "What is the tariff situation between the US and the EU?",
+    "Who won the election in Argentina?",
+    "What did OPEC decide about production quotas?",
+])
+def test_questions_without_price_or_instrument_are_knowledge(question):
+    assert rule_route(question) == "no"
+
+
+@pytest.mark.parametrize("item", SAMPLE_QUESTIONS, ids=lambda i: i["question"])
+def test_rules_never_contradict_the_hand_labels(item):
+    assert rule_route(item["question"]) in (None, item["label"])
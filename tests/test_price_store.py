@@ -0,0 +1,98 @@
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+from agent.app.tools.price_store import PriceStore
+
+TODAY = date(2025, 6, 2)
+DAY = date(2025, 5, 28)
+
+
+def _bars(*days):
+    index = pd.DatetimeIndex([pd.Timestamp(d) for d in days])
+    return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 10.0}, index=index)
+
+
+class StubDownloader:
+    """Returns the queued frames in order, then the last one forever."""
+
+    def __init__(self, *frames):
+        self.frames, self.calls = list(frames), 0
+
+    def __call__(self, symbol, start, end):
+        self.calls += 1
+        return self.frames.pop(0) if len(self.frames) > 1 else self.frames[0]
+
+
+def _store(downloader):
+    return PriceStore(":memory:", downloader=downloader, today=lambda: TODAY)
+
+
+def test_transient_empty_fetch_is_retried():
+    downloader = StubDownloader(pd.DataFrame(), _bars(DAY, date(2025, 5, 27)))
+    store = _store(downloader)
+
+    assert store.get_bar("GC=F", DAY) is None
+    bar = store.get_bar("GC=F", DAY)
+    assert bar is not None and bar["close"] == 1.5
+    assert store.get_bar("GC=F", date(2025, 5, 27)) is not None  # neighbour comes from the same fetch
+    assert downloader.calls == 2
+
+
+def test_none_fetch_is_retried():
+    downloader = StubDownloader(None, _bars(DAY))
+    store = _store(downloader)
+
+    assert store.get_bar("GC=F", DAY) is None
+    assert store.get_bar("GC=F", DAY) is not None
+    assert downloader.calls == 2
+
+
+def test_covered_range_is_answered_locally():
+    downloader = StubDownloader(_bars(DAY))
+    store = _store(downloader)
+
+    assert store.get_bar("GC=F", DAY) is not None
+    assert store.get_bar("GC=F", date(2025, 5, 25)) is None  # inside the fetched window: no trading
+    assert downloader.calls == 1
+
+
+def test_intraday_bar_is_refetched_once_its_date_is_past():
+    clock = {"today": TODAY}
+    downloader = StubDownloader(_bars(TODAY).assign(Close=1.0), _bars(TODAY).assign(Close=2.0))
+    store = PriceStore(":memory:", downloader=downloader, today=lambda: clock["today"])
+
+    assert store.get_bar("GC=F", TODAY)["close"] == 1.0  # provisional intraday value
+    clock["today"] = date(2025, 6, 5)
+    assert store.get_bar("GC=F", TODAY)["close"] == 2.0
+    assert store.get_bar("GC=F", TODAY)["close"] == 2.0  # final now: answered locally
+    assert downloader.calls == 2
+
+
+def test_download_runs_without_the_lock():
+    seen = []
+
+    def downloader(symbol, start, end):
+        seen.append(store._lock.locked())
+        return _bars(DAY)
+
+    store = _store(downloader)
+    store.get_bar("GC=F", DAY)
+    store.get_bar("GC=F", TODAY)
+    assert seen == [False, False]
+
+
+def test_store_without_final_column_is_migrated(tmp_path):
+    path = str(tmp_path / "prices.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE bars (symbol TEXT NOT NULL, date TEXT NOT NULL, open REAL, high REAL, low REAL,"
+               " close REAL, volume REAL, asof TEXT, fetched_at REAL NOT NULL, PRIMARY KEY (symbol, date))")
+    db.execute("INSERT INTO bars VALUES ('GC=F', ?, 1, 1, 1, 1.0, 0, '', 0)", (DAY.isoformat(),))
+    db.commit()
+    db.close()
+
+    downloader = StubDownloader(_bars(DAY))
+    store = PriceStore(path, downloader=downloader, today=lambda: TODAY)
+    assert store.get_bar("GC=F", DAY)["close"] == 1.5  # legacy bar may be intraday: refetched
+    assert downloader.calls == 1